@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""Add the idempotency key used by batch commission calculation to mlm_commissions.
+
+Safe to re-run.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import text
+from app.core.database import engine
+
+def add_commission_idempotency_key():
+    """Add the column and the unique index that batch inserts conflict on"""
+    alter_sql = """
+    ALTER TABLE mlm_commissions ADD COLUMN IF NOT EXISTS idempotency_key VARCHAR(150);
+    CREATE UNIQUE INDEX IF NOT EXISTS mlm_commissions_idempotency_key_key ON mlm_commissions (idempotency_key)
+    """
+    with engine.connect() as connection:
+        for statement in alter_sql.split(';'):
+            if statement.strip():
+                connection.execute(text(statement))
+        connection.commit()
+
+if __name__ == "__main__":
+    print("Adding MLM commission idempotency key...")
+    try:
+        add_commission_idempotency_key()
+        print("✅ mlm_commissions.idempotency_key ready")
+    except Exception as e:
+        print(f"❌ Error adding commission idempotency key: {e}")
+        sys.exit(1)
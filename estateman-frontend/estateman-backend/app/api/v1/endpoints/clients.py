@@ -1,17 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, BackgroundTasks, Body, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from app.api.deps import get_db, get_current_user
 from app.models.user import User
-from app.models.client import ClientStatus, LeadStatus, LeadTemperature
+from app.models.client import ClientStatus, LeadStatus, LeadTemperature, CampaignDelivery
 from app.schemas.client import (
     ClientCreate, ClientUpdate, ClientResponse,
     LeadCreate, LeadUpdate, LeadResponse,
     InteractionCreate, InteractionResponse,
     LoyaltyTransactionCreate, LoyaltyTransactionResponse,
-    ClientAnalytics, LeadPipeline
+    ClientAnalytics, LeadPipeline, ClientBulkMergeRequest
 )
 from app.services.client import ClientService, LeadService, LoyaltyService, CommunicationService, RewardService
+from app.services.client_matching import ClientMatchingService, TOP_N
+from app.services.client_dedupe import ClientDedupeService, run_client_dedupe_job
+from app.services.lead_scoring import LeadScoringService
+from app.services.client_merge import ClientMergeService
+from app.services.client_timeline import ClientTimelineService
+from app.services.campaign_delivery import CampaignExecutor, run_campaign_job
 
 router = APIRouter()
 
@@ -19,11 +25,12 @@ router = APIRouter()
 @router.post("/", response_model=ClientResponse)
 def create_client(
     client_data: ClientCreate,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     service = ClientService(db)
-    return service.create_client(client_data)
+    return service.create_client(client_data, background_tasks)
 
 @router.get("/", response_model=List[ClientResponse])
 def get_clients(
@@ -55,11 +62,12 @@ def get_client(
 def update_client(
     client_id: int,
     client_data: ClientUpdate,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     service = ClientService(db)
-    client = service.update_client(client_id, client_data)
+    client = service.update_client(client_id, client_data, background_tasks)
     if not client:
         raise HTTPException(status_code=404, detail="Client not found")
     return client
@@ -75,6 +83,31 @@ def delete_client(
         raise HTTPException(status_code=404, detail="Client not found")
     return {"message": "Client deleted successfully"}
 
+@router.get("/{client_id}/matches")
+def get_client_matches(
+    client_id: int,
+    limit: int = Query(TOP_N, ge=1, le=TOP_N),
+    refresh: bool = False,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    if not ClientService(db).get_client(client_id):
+        raise HTTPException(status_code=404, detail="Client not found")
+    service = ClientMatchingService(db)
+    if refresh:
+        service.refresh_client(client_id)
+    return {"client_id": client_id, "matches": service.get_matches(client_id, limit)}
+
+@router.get("/{client_id}/lead-score-history")
+def get_lead_score_history(
+    client_id: int,
+    days: int = Query(90, ge=1, le=730),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    service = LeadScoringService(db)
+    return {"client_id": client_id, "history": service.get_score_history(client_id, days)}
+
 @router.get("/analytics/overview", response_model=ClientAnalytics)
 def get_client_analytics(
     db: Session = Depends(get_db),
@@ -166,11 +199,13 @@ def get_client_interactions(
 @router.get("/{client_id}/timeline/")
 def get_client_timeline(
     client_id: int,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    service = CommunicationService(db)
-    return service.get_interaction_timeline(client_id)
+    service = ClientTimelineService(db)
+    return service.get_timeline(client_id, limit, cursor)
 
 # Loyalty endpoints
 @router.post("/{client_id}/loyalty/add-points/")
@@ -215,13 +250,34 @@ def get_loyalty_transactions(
 def detect_duplicates(
     email: Optional[str] = None,
     phone: Optional[str] = None,
+    first_name: Optional[str] = None,
+    last_name: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     service = CommunicationService(db)
-    duplicates = service.detect_duplicates(email, phone)
+    duplicates = service.detect_duplicates(email, phone, first_name, last_name)
     return {"duplicates": duplicates}
 
+@router.post("/duplicates/scan", status_code=202)
+def scan_duplicates(
+    background_tasks: BackgroundTasks,
+    current_user: User = Depends(get_current_user)
+):
+    background_tasks.add_task(run_client_dedupe_job)
+    return {"message": "Duplicate scan started"}
+
+@router.get("/duplicates/candidates")
+def get_duplicate_candidates(
+    status: str = Query("pending"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    service = ClientDedupeService(db)
+    return {"candidates": service.get_candidates(status, skip, limit)}
+
 @router.post("/duplicates/merge")
 def merge_clients(
     primary_id: int,
@@ -235,6 +291,15 @@ def merge_clients(
         return {"message": "Failed to merge clients"}
     return {"message": "Clients merged successfully"}
 
+@router.post("/duplicates/merge-bulk")
+def merge_client_clusters(
+    merge_request: ClientBulkMergeRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    service = ClientMergeService(db)
+    return service.merge_clusters([cluster.model_dump() for cluster in merge_request.clusters], current_user.id)
+
 # Communication endpoints
 @router.post("/{client_id}/send-email")
 def send_email(
@@ -292,26 +357,49 @@ def create_campaign(
     name: str,
     type: str,
     template_id: int,
+    segment_id: Optional[int] = None,
+    target_segment: Optional[Dict[str, Any]] = Body(None),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     service = CommunicationService(db)
+    criteria = dict(target_segment or {})
+    if segment_id is not None:
+        criteria["segment_id"] = segment_id
     campaign = service.create_campaign({
         "name": name,
         "type": type,
-        "template_id": template_id
+        "template_id": template_id,
+        "target_segment": criteria
     })
     return campaign
 
-@router.post("/campaigns/{campaign_id}/send")
+@router.post("/campaigns/{campaign_id}/send", status_code=202)
 def send_bulk_communication(
     campaign_id: int,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    service = CommunicationService(db)
-    result = service.send_bulk_communication(campaign_id)
-    return result
+    # Validates the segment, template and provider now, so a 202 means the send can start
+    if not CampaignExecutor(db).claim(campaign_id):
+        raise HTTPException(status_code=409, detail="Campaign is already being sent")
+    background_tasks.add_task(run_campaign_job, campaign_id, current_user.id)
+    return {"campaign_id": campaign_id, "status": "queued"}
+
+@router.get("/campaigns/{campaign_id}/deliveries")
+def get_campaign_deliveries(
+    campaign_id: int,
+    status: Optional[str] = Query(None),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    query = db.query(CampaignDelivery).filter(CampaignDelivery.campaign_id == campaign_id)
+    if status:
+        query = query.filter(CampaignDelivery.status == status)
+    return {"deliveries": query.order_by(CampaignDelivery.id).offset(skip).limit(limit).all()}
 
 # Reward Catalog endpoints
 @router.get("/rewards/")
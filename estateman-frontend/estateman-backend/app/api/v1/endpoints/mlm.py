@@ -1,17 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
+from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional
+import os
 from app.api.deps import get_db, get_current_user
 from app.models.user import User
 from app.schemas.mlm import (
     MLMPartnerCreate, MLMPartnerUpdate, MLMPartnerResponse,
     MLMCommissionResponse, ReferralActivityResponse,
     MLMTreeNode, MLMAnalytics, TeamPerformance,
-    CommissionRuleCreate, CommissionRuleResponse,
+    CommissionRuleCreate, CommissionRuleResponse, RankRequirementSet, RankRequirementResponse,
     CommissionSimulatorRequest, CommissionSimulatorResponse,
-    CommissionPayoutCreate, CommissionPayoutResponse
+    CommissionPayoutCreate, CommissionPayoutResponse,
+    CommissionBatchRequest, CommissionBatchResult,
+    NetworkSimulationRequest, NetworkSimulationResponse,
+    CommissionQualificationResponse, PayoutRunCreate, CommissionPayoutRunResponse
 )
 from app.services.mlm import MLMService, MLMCommissionService, AdvancedCommissionService
+from app.services.mlm_payouts import PayoutRunService, run_payout_job
+from app.services.mlm_qualification import run_qualification_job
+from app.services.mlm_tree import DEFAULT_TREE_DEPTH, MAX_TREE_DEPTH
 
 router = APIRouter()
 
@@ -76,13 +84,14 @@ def get_partner_downline(
 @router.get("/partners/{partner_id}/tree", response_model=MLMTreeNode)
 def get_mlm_tree(
     partner_id: int,
+    depth: int = Query(DEFAULT_TREE_DEPTH, ge=1, le=MAX_TREE_DEPTH),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     service = MLMService(db)
-    tree = service.get_mlm_tree(partner_id)
+    tree = service.get_mlm_tree(partner_id, depth)
     if not tree:
-        return {"message": "No MLM network tree data available for this partner"}
+        raise HTTPException(status_code=404, detail="MLM partner not found")
     return tree
 
 @router.post("/partners/{partner_id}/update-stats")
@@ -120,16 +129,27 @@ def get_top_performers(
 def calculate_commission(
     source_partner_id: int,
     transaction_amount: float,
+    reference_transaction_id: Optional[int] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     service = MLMCommissionService(db)
-    commissions = service.calculate_commission(source_partner_id, transaction_amount)
+    commissions = service.calculate_commission(source_partner_id, transaction_amount, reference_transaction_id)
     return {
         "message": f"Calculated {len(commissions)} commission entries",
         "total_amount": sum(c.amount for c in commissions)
     }
 
+@router.post("/commissions/calculate-batch", response_model=CommissionBatchResult)
+def calculate_commissions_batch(
+    batch: CommissionBatchRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Record commissions for many sales; sales whose idempotency key was already recorded are skipped"""
+    service = MLMCommissionService(db)
+    return service.calculate_commissions_batch(batch.sales)
+
 @router.get("/activities/recent")
 def get_recent_activities(
     limit: int = Query(10, ge=1, le=50),
@@ -161,6 +181,24 @@ def get_commission_rules(
     rules = service.get_commission_rules(active_only)
     return rules or []
 
+@router.post("/rank-requirements/", response_model=RankRequirementResponse)
+def set_rank_requirement(
+    requirement_data: RankRequirementSet,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Create or replace the monthly thresholds for a rank"""
+    service = AdvancedCommissionService(db)
+    return service.set_rank_requirement(requirement_data.dict())
+
+@router.get("/rank-requirements/", response_model=List[RankRequirementResponse])
+def get_rank_requirements(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    service = AdvancedCommissionService(db)
+    return service.get_rank_requirements()
+
 @router.post("/commission-simulator/", response_model=CommissionSimulatorResponse)
 def simulate_commission(
     request: CommissionSimulatorRequest,
@@ -179,6 +217,42 @@ def simulate_commission(
     )
     return result
 
+@router.post("/commission-simulator/network", response_model=NetworkSimulationResponse)
+def simulate_network_commissions(
+    request: NetworkSimulationRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Payout deltas per level and rank if `proposed` had been paid for a month's sales"""
+    service = AdvancedCommissionService(db)
+    return service.simulate_network(request)
+
+@router.post("/qualifications/run", status_code=202)
+def run_rank_qualification(
+    background_tasks: BackgroundTasks,
+    year: int = Query(..., ge=2000, le=2100),
+    month: int = Query(..., ge=1, le=12),
+    allow_demotion: bool = False,
+    apply_rank_changes: bool = False,
+    current_user: User = Depends(get_current_user)
+):
+    """Evaluate every partner's rank and rule qualifications for the month; re-running replaces the results.
+
+    Partner ranks are only updated when `apply_rank_changes` is set.
+    """
+    background_tasks.add_task(run_qualification_job, year, month, allow_demotion, apply_rank_changes)
+    return {"message": f"Rank qualification for {year}-{month:02d} started"}
+
+@router.get("/partners/{partner_id}/qualifications", response_model=List[CommissionQualificationResponse])
+def get_partner_qualifications(
+    partner_id: int,
+    limit: int = Query(12, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    service = AdvancedCommissionService(db)
+    return service.get_partner_qualifications(partner_id, limit)
+
 @router.post("/payouts/", response_model=CommissionPayoutResponse)
 def create_payout(
     payout_data: CommissionPayoutCreate,
@@ -191,13 +265,60 @@ def create_payout(
 
 @router.get("/payouts/pending", response_model=List[CommissionPayoutResponse])
 def get_pending_payouts(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     service = AdvancedCommissionService(db)
-    payouts = service.get_pending_payouts()
+    payouts = service.get_pending_payouts(skip, limit)
     return payouts or []
 
+@router.post("/payout-runs/", response_model=CommissionPayoutRunResponse, status_code=202)
+def create_payout_run(
+    run_data: PayoutRunCreate,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Pay every unpaid commission and adjustment in the period; poll the run for its status"""
+    service = PayoutRunService(db)
+    run = service.start_run(run_data.period_start, run_data.period_end, current_user.id, run_data.file_format)
+    background_tasks.add_task(run_payout_job, run.id)
+    return run
+
+@router.get("/payout-runs/{run_id}", response_model=CommissionPayoutRunResponse)
+def get_payout_run(
+    run_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    return PayoutRunService(db).get_run(run_id)
+
+@router.get("/payout-runs/{run_id}/payouts", response_model=List[CommissionPayoutResponse])
+def get_payout_run_payouts(
+    run_id: int,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    return PayoutRunService(db).get_run_payouts(run_id, skip, limit)
+
+@router.get("/payout-runs/{run_id}/file")
+def download_payout_file(
+    run_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    service = PayoutRunService(db)
+    run = service.get_run(run_id)
+    # Until the job completes it may still be writing the file itself
+    if run.status != "completed":
+        raise HTTPException(status_code=409, detail=f"Payout run is {run.status}")
+    path = run.file_path if run.file_path and os.path.exists(run.file_path) else service.write_file(run)
+    return FileResponse(path, media_type="text/csv", filename=os.path.basename(path))
+
 # Commission structure endpoint
 @router.get("/commission-structure")
 def get_commission_structure(
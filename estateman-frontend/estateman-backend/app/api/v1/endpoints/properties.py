@@ -1,4 +1,5 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File, BackgroundTasks
+from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime
@@ -6,8 +7,12 @@ import os
 import uuid
 from ....core.database import get_db
 from ....services.property import PropertyService
+from ....services.property_import import PropertyImportService, run_property_import_job
+from ....services.saved_search import SavedSearchService
+from ....services.property_duplicates import PropertyDuplicateService
 from ....api.deps import get_current_user
-from ....models.user import User
+from ....models.user import User, UserRole
+from ....models.property import PropertyType
 from pydantic import BaseModel
 
 router = APIRouter()
@@ -72,6 +77,15 @@ class PropertyShowingUpdate(BaseModel):
     feedback: Optional[str] = None
     notes: Optional[str] = None
 
+class SavedSearchCreate(BaseModel):
+    name: str
+    client_id: Optional[int] = None
+    city: Optional[str] = None
+    property_type: Optional[str] = None
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    min_bedrooms: Optional[int] = None
+
 @router.get("/")
 async def get_properties(
     skip: int = 0,
@@ -83,6 +97,11 @@ async def get_properties(
     city: Optional[str] = None,
     bedrooms: Optional[int] = None,
     bathrooms: Optional[int] = None,
+    bounds: Optional[str] = Query(None, description="Map bounds: lat1,lng1,lat2,lng2"),
+    latitude: Optional[float] = Query(None, description="Radius search centre latitude"),
+    longitude: Optional[float] = Query(None, description="Radius search centre longitude"),
+    radius_km: Optional[float] = Query(None, gt=0, description="Radius search distance in km"),
+    polygon: Optional[str] = Query(None, description="Polygon vertices: lat,lng;lat,lng;..."),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -94,13 +113,104 @@ async def get_properties(
         "max_price": max_price,
         "city": city,
         "bedrooms": bedrooms,
-        "bathrooms": bathrooms
+        "bathrooms": bathrooms,
+        "bounds": bounds,
+        "latitude": latitude,
+        "longitude": longitude,
+        "radius_km": radius_km,
+        "polygon": polygon
     }
     filters = {k: v for k, v in filters.items() if v is not None}
     
     properties = property_service.get_properties(skip=skip, limit=limit, filters=filters)
     return {"properties": properties or []}
 
+@router.get("/facets")
+async def get_faceted_properties(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    status: Optional[str] = None,
+    property_type: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    city: Optional[str] = None,
+    bedrooms: Optional[int] = None,
+    bathrooms: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    property_service = PropertyService(db)
+    filters = {
+        "status": status,
+        "property_type": property_type,
+        "min_price": min_price,
+        "max_price": max_price,
+        "city": city,
+        "bedrooms": bedrooms,
+        "bathrooms": bathrooms
+    }
+    filters = {k: v for k, v in filters.items() if v is not None}
+    
+    return property_service.get_faceted_properties(skip=skip, limit=limit, filters=filters)
+
+# Map Data Endpoint
+@router.get("/map")
+async def get_properties_map_data(
+    bounds: Optional[str] = Query(None, description="Map bounds: lat1,lng1,lat2,lng2"),
+    latitude: Optional[float] = Query(None, description="Radius search centre latitude"),
+    longitude: Optional[float] = Query(None, description="Radius search centre longitude"),
+    radius_km: Optional[float] = Query(None, gt=0, description="Radius search distance in km"),
+    polygon: Optional[str] = Query(None, description="Polygon vertices: lat,lng;lat,lng;..."),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    property_service = PropertyService(db)
+    map_data = property_service.get_properties_map_data(bounds, latitude, longitude, radius_km, polygon)
+    return {"properties": map_data}
+
+@router.get("/duplicates")
+async def get_duplicate_listings(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=200),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    return PropertyDuplicateService(db).get_duplicate_clusters(skip=skip, limit=limit)
+
+# Saved Search Endpoints
+@router.get("/saved-searches")
+async def get_saved_searches(
+    client_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    saved_search_service = SavedSearchService(db)
+    return {"saved_searches": saved_search_service.get_saved_searches(current_user.id, client_id)}
+
+@router.post("/saved-searches")
+async def create_saved_search(
+    search_data: SavedSearchCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    if search_data.min_price is not None and search_data.max_price is not None and search_data.min_price > search_data.max_price:
+        raise HTTPException(status_code=400, detail="min_price must not exceed max_price")
+    if search_data.property_type is not None and search_data.property_type not in [t.value for t in PropertyType]:
+        raise HTTPException(status_code=400, detail=f"Invalid property_type '{search_data.property_type}'")
+    saved_search_service = SavedSearchService(db)
+    return saved_search_service.create_saved_search(current_user.id, search_data.dict())
+
+@router.delete("/saved-searches/{search_id}")
+async def delete_saved_search(
+    search_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    saved_search_service = SavedSearchService(db)
+    if not saved_search_service.delete_saved_search(search_id, current_user.id):
+        raise HTTPException(status_code=404, detail="Saved search not found")
+    return {"message": "Saved search deleted successfully"}
+
 @router.get("/{property_id}")
 async def get_property(
     property_id: int,
@@ -116,25 +226,38 @@ async def get_property(
 @router.post("/")
 async def create_property(
     property_data: PropertyCreate,
+    background_tasks: BackgroundTasks,
+    allow_duplicate: bool = Query(False, description="Create the listing even if one exists at the same address"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
+    if not allow_duplicate:
+        duplicate_ids = PropertyDuplicateService(db).find_duplicates(
+            property_data.address, property_data.city, property_data.state,
+            property_data.latitude, property_data.longitude
+        )
+        if duplicate_ids:
+            raise HTTPException(status_code=409, detail={
+                "message": "A listing already exists at this address",
+                "duplicate_property_ids": duplicate_ids
+            })
     property_service = PropertyService(db)
     property_dict = property_data.dict()
     property_dict['agent_id'] = current_user.id
-    property_obj = property_service.create_property(property_dict)
+    property_obj = property_service.create_property(property_dict, background_tasks)
     return property_obj
 
 @router.put("/{property_id}")
 async def update_property(
     property_id: int,
     property_data: PropertyUpdate,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     property_service = PropertyService(db)
     property_dict = {k: v for k, v in property_data.dict().items() if v is not None}
-    property_obj = property_service.update_property(property_id, property_dict)
+    property_obj = property_service.update_property(property_id, property_dict, background_tasks)
     if not property_obj:
         raise HTTPException(status_code=404, detail="Property not found")
     return property_obj
@@ -142,11 +265,12 @@ async def update_property(
 @router.delete("/{property_id}")
 async def delete_property(
     property_id: int,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     property_service = PropertyService(db)
-    success = property_service.delete_property(property_id)
+    success = property_service.delete_property(property_id, background_tasks)
     if not success:
         raise HTTPException(status_code=404, detail="Property not found")
     return {"message": "Property deleted successfully"}
@@ -154,12 +278,13 @@ async def delete_property(
 @router.get("/search/{search_term}")
 async def search_properties(
     search_term: str,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     property_service = PropertyService(db)
-    properties = property_service.search_properties(search_term)
-    return {"properties": properties or []}
+    return property_service.search_properties(search_term, skip=skip, limit=limit)
 
 @router.get("/{property_id}/analytics")
 async def get_property_analytics(
@@ -276,16 +401,48 @@ async def update_property_showing(
         raise HTTPException(status_code=404, detail="Showing not found")
     return showing
 
-# Bulk Import Endpoint
-@router.post("/bulk-import")
+# Bulk Import Endpoints
+def import_job_owner(current_user: User) -> Optional[int]:
+    """Agents see only their own import jobs; admins see all of them"""
+    return None if current_user.role == UserRole.ADMIN else current_user.id
+
+@router.post("/bulk-import", status_code=202)
 async def bulk_import_properties(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    property_service = PropertyService(db)
-    result = await property_service.bulk_import_properties(file, current_user.id)
-    return result
+    import_service = PropertyImportService(db)
+    job = await import_service.start_import(file, current_user.id)
+    background_tasks.add_task(run_property_import_job, job.id)
+    return job
+
+@router.get("/bulk-import/{job_id}")
+async def get_bulk_import_status(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    import_service = PropertyImportService(db)
+    job = import_service.get_job(job_id, import_job_owner(current_user))
+    if not job:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return job
+
+@router.get("/bulk-import/{job_id}/errors")
+async def download_bulk_import_errors(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    import_service = PropertyImportService(db)
+    job = import_service.get_job(job_id, import_job_owner(current_user))
+    if not job:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    if not job.error_file_path or not os.path.exists(job.error_file_path):
+        raise HTTPException(status_code=404, detail="Error file not available")
+    return FileResponse(job.error_file_path, media_type="text/csv", filename=f"import_{job_id}_errors.csv")
 
 # Property Comparison Endpoint
 @router.get("/compare")
@@ -299,17 +456,6 @@ async def compare_properties(
     comparison = property_service.compare_properties(ids)
     return comparison
 
-# Map Data Endpoint
-@router.get("/map")
-async def get_properties_map_data(
-    bounds: Optional[str] = Query(None, description="Map bounds: lat1,lng1,lat2,lng2"),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
-):
-    property_service = PropertyService(db)
-    map_data = property_service.get_properties_map_data(bounds)
-    return {"properties": map_data}
-
 # Tools Endpoints
 @router.post("/{property_id}/cma")
 async def generate_cma(
@@ -407,5 +553,5 @@ async def upload_property_images(
     if not property_obj:
         raise HTTPException(status_code=404, detail="Property not found")
     
-    uploaded_images = await property_service.upload_property_images(property_id, images)
-    return {"uploaded_count": len(uploaded_images), "images": uploaded_images}
\ No newline at end of file
+    uploaded_images, failed = await property_service.upload_property_images(property_id, images)
+    return {"uploaded_count": len(uploaded_images), "images": uploaded_images, "failed": failed}
\ No newline at end of file
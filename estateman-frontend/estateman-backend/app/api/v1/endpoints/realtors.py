@@ -246,11 +246,12 @@ def get_network_downline(
 @router.get("/{realtor_id}/network/tree")
 def get_network_tree(
     realtor_id: int,
+    depth: int = Query(3, ge=1, le=10),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     service = RealtorService(db)
-    return service.get_network_tree(realtor_id)
+    return service.get_network_tree(realtor_id, depth)
 
 # Lead Management endpoints
 @router.get("/{realtor_id}/leads")
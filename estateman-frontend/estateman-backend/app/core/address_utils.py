@@ -0,0 +1,72 @@
+import hashlib
+import re
+from typing import Optional
+
+STREET_SUFFIXES = {
+    "st": "street", "str": "street", "ave": "avenue", "av": "avenue", "rd": "road",
+    "blvd": "boulevard", "dr": "drive", "ln": "lane", "ct": "court", "pl": "place",
+    "sq": "square", "ter": "terrace", "terr": "terrace", "cir": "circle", "hwy": "highway",
+    "pkwy": "parkway", "pky": "parkway", "trl": "trail", "cres": "crescent", "aly": "alley",
+    "expy": "expressway", "fwy": "freeway", "mt": "mount", "ft": "fort"
+}
+DIRECTIONALS = {
+    "n": "north", "s": "south", "e": "east", "w": "west",
+    "ne": "northeast", "nw": "northwest", "se": "southeast", "sw": "southwest"
+}
+CITY_ABBREVIATIONS = {"st": "saint", "ste": "sainte", "ft": "fort", "mt": "mount"}
+
+# Secondary unit designators ("Apt 4B", "Suite 200", "123 Main St # 12") and the kind of unit each names
+UNIT_DESIGNATORS = {
+    "apt": "unit", "apartment": "unit", "unit": "unit", "suite": "unit", "ste": "unit", "rm": "unit",
+    "room": "unit", "lot": "unit", "spc": "unit", "space": "unit", "trlr": "unit", "#": "unit",
+    "fl": "floor", "floor": "floor", "bldg": "building", "building": "building"
+}
+# A designator and the unit number after it; "#" only counts once the street line has started
+_UNIT_RE = re.compile(
+    r"(?:\b(apt|apartment|unit|suite|ste|fl|floor|rm|room|bldg|building|lot|spc|space|trlr)\b\.?\s*#?|(?<=\S)\s*(#))"
+    r"\s*((?:[a-z]-?)?\d[a-z0-9-]*|[a-z]\b(?!-))"
+)
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9]+")
+
+def _tokens(value: Optional[str]):
+    return _NON_ALNUM_RE.sub(" ", value.lower()).split() if value else []
+
+def normalize_address(address: Optional[str]) -> str:
+    """Canonical street line: lowercase, no punctuation, abbreviations expanded, unit last.
+
+    '123 N. Main St., Apt 4-B' -> '123 north main street unit 4b'
+    """
+    if not address:
+        return ""
+    # "#12 Main St": a leading "#" marks the house number, not a unit
+    street = address.lower().strip().lstrip("#")
+    units = []
+    for match in _UNIT_RE.finditer(street):
+        designator = match.group(1) or match.group(2)
+        units.append(f"{UNIT_DESIGNATORS[designator]} {''.join(_tokens(match.group(3)))}")
+    tokens = _tokens(_UNIT_RE.sub(" ", street))
+    return " ".join([DIRECTIONALS.get(token, STREET_SUFFIXES.get(token, token)) for token in tokens] + units)
+
+def normalize_city(city: Optional[str]) -> str:
+    return " ".join(CITY_ABBREVIATIONS.get(token, token) for token in _tokens(city))
+
+def house_number(canonical_address: str) -> Optional[str]:
+    """Leading street number of a canonical address, if any"""
+    first = canonical_address.split(" ", 1)[0]
+    return first if first[:1].isdigit() else None
+
+def street_position(canonical_address: str) -> Optional[str]:
+    """House number plus any unit ('123 unit 4b'), so units in one building stay distinct"""
+    number = house_number(canonical_address)
+    if number is None:
+        return None
+    units = [f"{kind} {value}" for kind, value in re.findall(r"\b(unit|floor|building) ([a-z0-9]+)", canonical_address)]
+    return " ".join([number] + units)
+
+def address_key(address: Optional[str], city: Optional[str], state: Optional[str]) -> Optional[str]:
+    """Stable hash of the canonical address, used as the duplicate-listing lookup key"""
+    canonical = normalize_address(address)
+    if not canonical:
+        return None
+    parts = (canonical, normalize_city(city), " ".join(_tokens(state)))
+    return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()[:32]
@@ -16,6 +16,18 @@ class Settings(BaseSettings):
     
     resend_api_key: Optional[str] = None
     
+    # "fake" keeps campaign messages in memory (development/tests), "live" sends through Resend/Twilio
+    MESSAGING_PROVIDER: str = "fake"
+    MESSAGING_FROM_EMAIL: Optional[str] = None
+    
+    # "postgis" uses the geography column + GiST index, "geohash" the B-tree prefix fallback
+    SPATIAL_BACKEND: str = "geohash"
+    
+    # Payout files hold personal and financial data, so they live outside the public uploads/ mount
+    PAYOUT_FILE_DIR: str = "payout_files"
+    # Import uploads and error reports hold agents' raw rows; also kept out of uploads/
+    IMPORT_FILE_DIR: str = "import_files"
+    
     @property
     def DATABASE_URL(self) -> str:
         return f"postgresql://{self.DB_USER}:{self.DB_PASSWORD}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
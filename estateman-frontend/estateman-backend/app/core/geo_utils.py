@@ -0,0 +1,131 @@
+import math
+from typing import List, Optional, Tuple
+
+EARTH_RADIUS_KM = 6371.0088
+GEOHASH_PRECISION = 9
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+def encode_geohash(latitude: float, longitude: float, precision: int = GEOHASH_PRECISION) -> str:
+    """Encode a lat/lng pair as a geohash string"""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    geohash = []
+    bits = 0
+    bit_count = 0
+    even = True
+
+    while len(geohash) < precision:
+        if even:
+            mid = (lng_range[0] + lng_range[1]) / 2
+            if longitude >= mid:
+                bits = (bits << 1) | 1
+                lng_range[0] = mid
+            else:
+                bits = bits << 1
+                lng_range[1] = mid
+        else:
+            mid = (lat_range[0] + lat_range[1]) / 2
+            if latitude >= mid:
+                bits = (bits << 1) | 1
+                lat_range[0] = mid
+            else:
+                bits = bits << 1
+                lat_range[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            geohash.append(_BASE32[bits])
+            bits = 0
+            bit_count = 0
+
+    return "".join(geohash)
+
+def geohash_cell_size(precision: int) -> Tuple[float, float]:
+    """Return (lat_degrees, lng_degrees) covered by a geohash cell of the given precision"""
+    total_bits = precision * 5
+    lng_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+    return 180.0 / (2 ** lat_bits), 360.0 / (2 ** lng_bits)
+
+def geohash_cover(min_lat: float, min_lng: float, max_lat: float, max_lng: float, max_cells: int = 16) -> List[str]:
+    """Get the finest set of geohash prefixes (at most max_cells) that covers a bounding box"""
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        lat_step, lng_step = geohash_cell_size(precision)
+        lat_cells = int(math.floor(max_lat / lat_step) - math.floor(min_lat / lat_step)) + 1
+        lng_cells = int(math.floor(max_lng / lng_step) - math.floor(min_lng / lng_step)) + 1
+        if lat_cells * lng_cells > max_cells:
+            continue
+
+        cells = set()
+        for i in range(lat_cells):
+            lat = min(min_lat + i * lat_step, max_lat)
+            for j in range(lng_cells):
+                lng = min(min_lng + j * lng_step, max_lng)
+                cells.add(encode_geohash(lat, lng, precision))
+        # Make sure the far corners are included when the steps don't land on them
+        cells.add(encode_geohash(max_lat, max_lng, precision))
+        cells.add(encode_geohash(min_lat, max_lng, precision))
+        cells.add(encode_geohash(max_lat, min_lng, precision))
+        return sorted(cells)
+
+    return []
+
+def radius_bounding_box(latitude: float, longitude: float, radius_km: float) -> Tuple[float, float, float, float]:
+    """Get (min_lat, min_lng, max_lat, max_lng) enclosing a circle around a point"""
+    lat_delta = math.degrees(radius_km / EARTH_RADIUS_KM)
+    cos_lat = math.cos(math.radians(latitude))
+    lng_delta = 180.0 if cos_lat < 1e-6 else min(180.0, lat_delta / cos_lat)
+    return (
+        max(-90.0, latitude - lat_delta),
+        max(-180.0, longitude - lng_delta),
+        min(90.0, latitude + lat_delta),
+        min(180.0, longitude + lng_delta)
+    )
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Great-circle distance between two points in kilometres"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = math.radians(lat2 - lat1)
+    d_lambda = math.radians(lng2 - lng1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+def parse_polygon(polygon: str) -> Optional[List[Tuple[float, float]]]:
+    """Parse 'lat,lng;lat,lng;...' into a list of (lat, lng) vertices"""
+    try:
+        vertices = [
+            tuple(map(float, point.split(',')))
+            for point in polygon.split(';') if point.strip()
+        ]
+    except ValueError:
+        return None
+    if len(vertices) < 3 or any(len(vertex) != 2 for vertex in vertices):
+        return None
+    return vertices
+
+def polygon_bounding_box(vertices: List[Tuple[float, float]]) -> Tuple[float, float, float, float]:
+    """Get (min_lat, min_lng, max_lat, max_lng) of a polygon"""
+    lats = [lat for lat, _ in vertices]
+    lngs = [lng for _, lng in vertices]
+    return min(lats), min(lngs), max(lats), max(lngs)
+
+def point_in_polygon(latitude: float, longitude: float, vertices: List[Tuple[float, float]]) -> bool:
+    """Ray-casting point-in-polygon test"""
+    inside = False
+    j = len(vertices) - 1
+    for i in range(len(vertices)):
+        lat_i, lng_i = vertices[i]
+        lat_j, lng_j = vertices[j]
+        if (lat_i > latitude) != (lat_j > latitude):
+            crossing = (lng_j - lng_i) * (latitude - lat_i) / (lat_j - lat_i) + lng_i
+            if longitude < crossing:
+                inside = not inside
+        j = i
+    return inside
+
+def polygon_to_wkt(vertices: List[Tuple[float, float]]) -> str:
+    """Convert (lat, lng) vertices to a closed WKT polygon (lng lat order)"""
+    ring = list(vertices)
+    if ring[0] != ring[-1]:
+        ring.append(ring[0])
+    return "POLYGON((" + ", ".join(f"{lng} {lat}" for lat, lng in ring) + "))"
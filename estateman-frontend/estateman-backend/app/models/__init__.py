@@ -1,11 +1,11 @@
 from .user import User
-from .property import Property, PropertyImage, PropertyDocument, PropertyValuation, PropertyShowing
-from .client import Client, Lead, ClientInteraction, LoyaltyTransaction, LeadSource, ClientSegment
+from .property import Property, PropertyImage, PropertyDocument, PropertyValuation, PropertyShowing, PropertyImportJob, MarketStat, SavedSearch, SavedSearchAlert
+from .client import Client, Lead, ClientInteraction, LoyaltyTransaction, LeadSource, ClientSegment, ClientPropertyMatch, LeadScoreHistory, CampaignDelivery
 from .realtor import Realtor, Commission, Transaction
 from .permission import Permission, Role
 from .audit import AuditLog
 from .dashboard import DashboardMetrics, RecentActivity
 from .navigation import NavigationRoute
-from .mlm import MLMPartner, MLMCommission, ReferralActivity, CommissionRule, CommissionQualification, CommissionPayout, CommissionAdjustment
+from .mlm import MLMPartner, MLMPartnerClosure, MLMCommission, ReferralActivity, CommissionRule, CommissionQualification, CommissionPayoutRun, CommissionPayout, CommissionAdjustment
 from .document import Document, DocumentShare
 from .realtor import RealtorTeam, PerformanceReview, RealtorGoal, TeamActivity
\ No newline at end of file
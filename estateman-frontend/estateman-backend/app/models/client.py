@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Float, Boolean, ForeignKey, Enum, JSON
+from sqlalchemy import Column, Integer, String, Text, DateTime, Float, Boolean, ForeignKey, Enum, JSON, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
@@ -47,6 +47,10 @@ class Client(Base):
     last_name = Column(String(100), nullable=False)
     email = Column(String(255), unique=True, index=True, nullable=False)
     phone = Column(String(20))
+    # Normalized match keys maintained by ClientDedupeService
+    email_key = Column(String(255), index=True)
+    phone_key = Column(String(20), index=True)
+    name_key = Column(String(255), index=True)
     status = Column(Enum(ClientStatus), default=ClientStatus.LEAD)
     
     # Lead scoring and engagement
@@ -81,9 +85,13 @@ class Client(Base):
     interactions = relationship("ClientInteraction", back_populates="client", cascade="all, delete-orphan")
     loyalty_transactions = relationship("LoyaltyTransaction", back_populates="client", cascade="all, delete-orphan")
     leads = relationship("Lead", back_populates="client", cascade="all, delete-orphan")
+    property_matches = relationship("ClientPropertyMatch", back_populates="client", cascade="all, delete-orphan")
 
 class Lead(Base):
     __tablename__ = "leads"
+    __table_args__ = (
+        Index("ix_leads_client_created", "client_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     lead_id = Column(String(20), unique=True, index=True)
@@ -128,6 +136,9 @@ class Lead(Base):
 
 class ClientInteraction(Base):
     __tablename__ = "client_interactions"
+    __table_args__ = (
+        Index("ix_client_interactions_client_created", "client_id", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     client_id = Column(Integer, ForeignKey("clients.id"), nullable=False)
@@ -158,6 +169,9 @@ class ClientInteraction(Base):
 
 class LoyaltyTransaction(Base):
     __tablename__ = "loyalty_transactions"
+    __table_args__ = (
+        Index("ix_loyalty_transactions_client_created", "client_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     client_id = Column(Integer, ForeignKey("clients.id"), nullable=False)
@@ -248,7 +262,9 @@ class CommunicationCampaign(Base):
     template_id = Column(Integer, ForeignKey("communication_templates.id"))
     target_segment = Column(JSON)  # Client filtering criteria
     scheduled_at = Column(DateTime(timezone=True))
-    status = Column(String(50), default="draft")  # draft, scheduled, sent, completed
+    status = Column(String(50), default="draft")  # draft, scheduled, sending, completed, failed
+    error = Column(Text)  # Why the last send failed
+    claimed_at = Column(DateTime(timezone=True))  # When the running send last reported progress
     
     # Statistics
     total_recipients = Column(Integer, default=0)
@@ -266,10 +282,14 @@ class CommunicationCampaign(Base):
 
 class ClientDuplicate(Base):
     __tablename__ = "client_duplicates"
+    __table_args__ = (
+        Index("ix_client_duplicates_pair", "primary_client_id", "duplicate_client_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     primary_client_id = Column(Integer, ForeignKey("clients.id"), nullable=False)
-    duplicate_client_id = Column(Integer, ForeignKey("clients.id"), nullable=False)
+    # Cleared when the duplicate is merged away; match_criteria keeps its id and email
+    duplicate_client_id = Column(Integer, ForeignKey("clients.id", ondelete="SET NULL"), nullable=True)
     similarity_score = Column(Float, nullable=False)
     match_criteria = Column(JSON)  # What fields matched
     status = Column(String(50), default="pending")  # pending, merged, ignored
@@ -282,4 +302,56 @@ class ClientDuplicate(Base):
     # Relationships
     primary_client = relationship("Client", foreign_keys=[primary_client_id])
     duplicate_client = relationship("Client", foreign_keys=[duplicate_client_id])
-    merged_by_user = relationship("User")
\ No newline at end of file
+    merged_by_user = relationship("User")
+
+class ClientPropertyMatch(Base):
+    """Top-N inventory matches per client, maintained by ClientMatchingService"""
+    __tablename__ = "client_property_matches"
+    __table_args__ = (
+        UniqueConstraint("client_id", "property_id", name="uq_client_property_matches_pair"),
+        Index("ix_client_property_matches_client_score", "client_id", "score"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    client_id = Column(Integer, ForeignKey("clients.id", ondelete="CASCADE"), nullable=False)
+    property_id = Column(Integer, ForeignKey("properties.id", ondelete="CASCADE"), nullable=False, index=True)
+    score = Column(Float, nullable=False)
+    budget_score = Column(Float)
+    location_score = Column(Float)
+    type_score = Column(Float)
+    computed_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    # Relationships
+    client = relationship("Client", back_populates="property_matches")
+    property = relationship("Property")
+
+class LeadScoreHistory(Base):
+    """A client's lead score each time LeadScoringService changed it"""
+    __tablename__ = "lead_score_history"
+    __table_args__ = (
+        Index("ix_lead_score_history_client_computed", "client_id", "computed_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    client_id = Column(Integer, ForeignKey("clients.id", ondelete="CASCADE"), nullable=False)
+    score = Column(Integer, nullable=False)
+    engagement_level = Column(String(20))
+    computed_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class CampaignDelivery(Base):
+    """Outcome of sending one campaign message to one client"""
+    __tablename__ = "campaign_deliveries"
+    __table_args__ = (
+        Index("ix_campaign_deliveries_campaign_client", "campaign_id", "client_id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    campaign_id = Column(Integer, ForeignKey("communication_campaigns.id", ondelete="CASCADE"), nullable=False)
+    client_id = Column(Integer, ForeignKey("clients.id", ondelete="CASCADE"), nullable=False, index=True)
+    channel = Column(Enum(CommunicationType), nullable=False)
+    recipient = Column(String(255), nullable=False)  # Email address or phone number used
+    status = Column(String(20), nullable=False)  # sent, failed
+    provider = Column(String(50))
+    provider_message_id = Column(String(255))
+    error = Column(Text)
+    sent_at = Column(DateTime(timezone=True), server_default=func.now())
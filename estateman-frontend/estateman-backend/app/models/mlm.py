@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text, Boolean, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text, Boolean, Index, Enum as SQLEnum
 from sqlalchemy.orm import relationship
 from app.core.database import Base
 from datetime import datetime
@@ -37,7 +37,7 @@ class MLMPartner(Base):
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), unique=True, nullable=False)
     referral_code = Column(String(20), unique=True, nullable=False)
-    sponsor_id = Column(Integer, ForeignKey("mlm_partners.id"), nullable=True)
+    sponsor_id = Column(Integer, ForeignKey("mlm_partners.id"), nullable=True, index=True)
     level = Column(SQLEnum(PartnerLevel), default=PartnerLevel.ASSOCIATE)
     join_date = Column(DateTime, default=datetime.utcnow)
     is_active = Column(Boolean, default=True)
@@ -52,8 +52,23 @@ class MLMPartner(Base):
     user = relationship("User", backref="mlm_partner")
     commissions = relationship("MLMCommission", foreign_keys="[MLMCommission.partner_id]", back_populates="partner")
 
+class MLMPartnerClosure(Base):
+    """Every (ancestor, descendant) pair of the sponsor tree, including each partner with itself at depth 0"""
+    __tablename__ = "mlm_partner_closure"
+    __table_args__ = (
+        Index("ix_mlm_partner_closure_ancestor_depth", "ancestor_id", "depth"),
+        Index("ix_mlm_partner_closure_descendant", "descendant_id", "depth"),
+    )
+    
+    ancestor_id = Column(Integer, ForeignKey("mlm_partners.id", ondelete="CASCADE"), primary_key=True)
+    descendant_id = Column(Integer, ForeignKey("mlm_partners.id", ondelete="CASCADE"), primary_key=True)
+    depth = Column(Integer, nullable=False)
+
 class MLMCommission(Base):
     __tablename__ = "mlm_commissions"
+    __table_args__ = (
+        Index("ix_mlm_commissions_payout_created", "payout_id", "created_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     partner_id = Column(Integer, ForeignKey("mlm_partners.id"), nullable=False)
@@ -64,9 +79,13 @@ class MLMCommission(Base):
     percentage = Column(Float, nullable=False)
     reference_transaction_id = Column(Integer, nullable=True)
     description = Column(Text, nullable=True)
+    # "<sale key>:<level>"; stops a re-submitted sale from paying the same level twice
+    idempotency_key = Column(String(150), unique=True, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     paid_at = Column(DateTime, nullable=True)
     is_paid = Column(Boolean, default=False)
+    # Set when a payout run includes the commission; never reassigned afterwards
+    payout_id = Column(Integer, ForeignKey("commission_payouts.id"), nullable=True)
     
     # Relationships
     partner = relationship("MLMPartner", foreign_keys=[partner_id], back_populates="commissions")
@@ -86,8 +105,23 @@ class CommissionRule(Base):
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
+class RankRequirement(Base):
+    """Monthly volume and active legs a partner needs to hold a rank"""
+    __tablename__ = "rank_requirements"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    rank = Column(SQLEnum(PartnerLevel), unique=True, nullable=False)
+    min_personal_volume = Column(Float, default=0.0, nullable=False)
+    min_group_volume = Column(Float, default=0.0, nullable=False)
+    min_active_legs = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
 class CommissionQualification(Base):
     __tablename__ = "commission_qualifications"
+    __table_args__ = (
+        Index("ix_commission_qualifications_period_partner", "period_start", "period_end", "partner_id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     partner_id = Column(Integer, ForeignKey("mlm_partners.id"), nullable=False)
@@ -102,10 +136,34 @@ class CommissionQualification(Base):
     partner = relationship("MLMPartner")
     rule = relationship("CommissionRule")
 
+class CommissionPayoutRun(Base):
+    """One bulk payout: the payouts it created and the payout file written for them"""
+    __tablename__ = "commission_payout_runs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    period_start = Column(DateTime, nullable=False)
+    period_end = Column(DateTime, nullable=False)
+    status = Column(String(20), default="running")  # running, completed, failed
+    payout_count = Column(Integer, default=0)
+    total_amount = Column(Float, default=0.0)
+    file_format = Column(String(10), default="csv")
+    file_path = Column(String(500), nullable=True)
+    error = Column(Text, nullable=True)
+    created_by = Column(Integer, ForeignKey("users.id"), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    completed_at = Column(DateTime, nullable=True)
+    
+    # Relationships
+    payouts = relationship("CommissionPayout", back_populates="run")
+
 class CommissionPayout(Base):
     __tablename__ = "commission_payouts"
+    __table_args__ = (
+        Index("ix_commission_payouts_run_partner", "run_id", "partner_id", unique=True),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
+    run_id = Column(Integer, ForeignKey("commission_payout_runs.id"), nullable=True)
     partner_id = Column(Integer, ForeignKey("mlm_partners.id"), nullable=False)
     period_start = Column(DateTime, nullable=False)
     period_end = Column(DateTime, nullable=False)
@@ -119,6 +177,7 @@ class CommissionPayout(Base):
     # Relationships
     partner = relationship("MLMPartner")
     approver = relationship("User")
+    run = relationship("CommissionPayoutRun", back_populates="payouts")
 
 class CommissionAdjustment(Base):
     __tablename__ = "commission_adjustments"
@@ -130,6 +189,8 @@ class CommissionAdjustment(Base):
     reason = Column(Text, nullable=False)
     created_by = Column(Integer, ForeignKey("users.id"), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Adjustments are paid out on their own, so one made after its commission was paid still settles
+    payout_id = Column(Integer, ForeignKey("commission_payouts.id"), nullable=True, index=True)
     
     # Relationships
     commission = relationship("MLMCommission")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Text, Boolean, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, Text, Boolean, ForeignKey, Enum, JSON, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from ..core.database import Base
@@ -36,6 +36,16 @@ class Property(Base):
     zip_code = Column(String(20), nullable=False)
     latitude = Column(Float)
     longitude = Column(Float)
+    geohash = Column(String(12), index=True)
+    # Hash of the canonical address (see core.address_utils) and the earliest listing it duplicates
+    address_key = Column(String(32), index=True)
+    duplicate_of_id = Column(Integer, ForeignKey("properties.id", ondelete="SET NULL"), index=True)
+    # Denormalized child counters, maintained in the same transaction as child writes
+    images_count = Column(Integer, default=0)
+    documents_count = Column(Integer, default=0)
+    showings_count = Column(Integer, default=0)
+    latest_valuation_amount = Column(Float)
+    latest_valuation_date = Column(DateTime(timezone=True))
     agent_id = Column(Integer, ForeignKey("users.id"))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -51,11 +61,14 @@ class PropertyImage(Base):
     __tablename__ = "property_images"
     
     id = Column(Integer, primary_key=True, index=True)
-    property_id = Column(Integer, ForeignKey("properties.id"), nullable=False)
+    property_id = Column(Integer, ForeignKey("properties.id"), nullable=False, index=True)
     image_url = Column(String(500), nullable=False)
     caption = Column(String(255))
     is_primary = Column(Boolean, default=False)
     order_index = Column(Integer, default=0)
+    width = Column(Integer)
+    height = Column(Integer)
+    variants = Column(JSON)  # {"thumb": {"width", "height", "webp": url, "jpg": url}, "card": ..., "full": ...}
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     # Relationships
@@ -65,7 +78,7 @@ class PropertyDocument(Base):
     __tablename__ = "property_documents"
     
     id = Column(Integer, primary_key=True, index=True)
-    property_id = Column(Integer, ForeignKey("properties.id"), nullable=False)
+    property_id = Column(Integer, ForeignKey("properties.id"), nullable=False, index=True)
     document_url = Column(String(500), nullable=False)
     document_name = Column(String(255), nullable=False)
     document_type = Column(String(100))
@@ -79,7 +92,7 @@ class PropertyValuation(Base):
     __tablename__ = "property_valuations"
     
     id = Column(Integer, primary_key=True, index=True)
-    property_id = Column(Integer, ForeignKey("properties.id"), nullable=False)
+    property_id = Column(Integer, ForeignKey("properties.id"), nullable=False, index=True)
     valuation_amount = Column(Float, nullable=False)
     valuation_date = Column(DateTime(timezone=True), server_default=func.now())
     valuation_method = Column(String(100))
@@ -93,7 +106,7 @@ class PropertyShowing(Base):
     __tablename__ = "property_showings"
     
     id = Column(Integer, primary_key=True, index=True)
-    property_id = Column(Integer, ForeignKey("properties.id"), nullable=False)
+    property_id = Column(Integer, ForeignKey("properties.id"), nullable=False, index=True)
     client_name = Column(String(255), nullable=False)
     client_email = Column(String(255))
     client_phone = Column(String(50))
@@ -105,4 +118,73 @@ class PropertyShowing(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     # Relationships
-    property = relationship("Property", back_populates="showings")
\ No newline at end of file
+    property = relationship("Property", back_populates="showings")
+class PropertyImportJob(Base):
+    __tablename__ = "property_import_jobs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    agent_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    file_name = Column(String(255))
+    upload_path = Column(String(500), nullable=False)
+    status = Column(String(20), default="pending")  # pending, running, completed, failed
+    rows_processed = Column(Integer, default=0)
+    created_count = Column(Integer, default=0)
+    failed_count = Column(Integer, default=0)
+    error_file_path = Column(String(500))
+    error_message = Column(Text)
+    started_at = Column(DateTime(timezone=True))
+    completed_at = Column(DateTime(timezone=True))
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class MarketStat(Base):
+    """Monthly rollup of listings per city and property type, keyed by listing month"""
+    __tablename__ = "market_stats"
+    __table_args__ = (
+        UniqueConstraint("city", "property_type", "month", name="uq_market_stats_city_type_month"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    city = Column(String(100), nullable=False)
+    property_type = Column(Enum(PropertyType), nullable=False)
+    month = Column(Date, nullable=False)
+    listing_count = Column(Integer, default=0)
+    sold_count = Column(Integer, default=0)
+    total_price = Column(Float, default=0.0)
+    mean_price = Column(Float)
+    median_price = Column(Float)
+    mean_price_per_sqft = Column(Float)
+    median_price_per_sqft = Column(Float)
+    total_days_on_market = Column(Float, default=0.0)
+    mean_days_on_market = Column(Float)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class SavedSearch(Base):
+    """Listing criteria a user (or an agent on behalf of a client) wants alerts for"""
+    __tablename__ = "saved_searches"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(255), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    client_id = Column(Integer, ForeignKey("clients.id", ondelete="CASCADE"), index=True)
+    # Criteria; a null column matches anything
+    city = Column(String(100))
+    property_type = Column(Enum(PropertyType))
+    min_price = Column(Float)
+    max_price = Column(Float)
+    min_bedrooms = Column(Integer)
+    is_active = Column(Boolean, default=True)
+    last_alerted_at = Column(DateTime(timezone=True))
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+class SavedSearchAlert(Base):
+    """One row per (search, property) already alerted, so edits don't re-alert"""
+    __tablename__ = "saved_search_alerts"
+    __table_args__ = (
+        UniqueConstraint("saved_search_id", "property_id", name="uq_saved_search_alerts_pair"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    saved_search_id = Column(Integer, ForeignKey("saved_searches.id", ondelete="CASCADE"), nullable=False)
+    property_id = Column(Integer, ForeignKey("properties.id", ondelete="CASCADE"), nullable=False, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, ForeignKey, JSON, Enum, Text
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, ForeignKey, JSON, Enum, Text, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
@@ -124,6 +124,9 @@ class Commission(Base):
 
 class Transaction(Base):
     __tablename__ = "transactions"
+    __table_args__ = (
+        Index("ix_transactions_client_created", "client_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     transaction_id = Column(String(20), unique=True, index=True)
@@ -177,6 +180,9 @@ class TransactionMilestone(Base):
 
 class TransactionDocument(Base):
     __tablename__ = "transaction_documents"
+    __table_args__ = (
+        Index("ix_transaction_documents_transaction_created", "transaction_id", "created_at", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     transaction_id = Column(Integer, ForeignKey("transactions.id"), nullable=False)
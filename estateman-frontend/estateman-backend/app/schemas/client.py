@@ -182,4 +182,11 @@ class ClientSegmentResponse(BaseModel):
     created_at: datetime
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+# Merge Schemas
+class ClientMergeCluster(BaseModel):
+    primary_id: int
+    duplicate_ids: List[int] = Field(..., min_length=1)
+
+class ClientBulkMergeRequest(BaseModel):
+    clusters: List[ClientMergeCluster] = Field(..., min_length=1, max_length=10000)
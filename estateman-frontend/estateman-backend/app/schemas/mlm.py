@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, Field
+from typing import Dict, List, Optional
 from datetime import datetime
 from app.models.mlm import PartnerLevel, CommissionType, QualificationStatus, PayoutStatus
 
@@ -12,6 +12,7 @@ class MLMPartnerCreate(MLMPartnerBase):
     user_id: int
 
 class MLMPartnerUpdate(BaseModel):
+    sponsor_id: Optional[int] = None
     level: Optional[PartnerLevel] = None
     is_active: Optional[bool] = None
 
@@ -76,6 +77,31 @@ class MLMTreeNode(BaseModel):
     monthly_commission: float
     children: List['MLMTreeNode'] = []
     avatar: Optional[str] = None
+    child_count: int = 0
+    # Set on nodes at the depth limit that have children; fetch the tree rooted here to expand
+    expand_cursor: Optional[str] = None
+    # Only filled on the root of a response
+    total_network_size: Optional[int] = None
+    network_depth: Optional[int] = None
+
+class CommissionSale(BaseModel):
+    source_partner_id: int
+    amount: float = Field(..., gt=0)
+    reference_transaction_id: Optional[int] = None
+    # Defaults to "txn:<reference_transaction_id>"; sales with neither are never deduplicated
+    idempotency_key: Optional[str] = Field(None, min_length=1, max_length=100)
+    description: Optional[str] = None
+
+class CommissionBatchRequest(BaseModel):
+    sales: List[CommissionSale] = Field(..., min_length=1, max_length=100000)
+
+class CommissionBatchResult(BaseModel):
+    sales: int
+    commissions_created: int
+    duplicates_skipped: int
+    partners_credited: int
+    total_amount: float
+    unknown_sources: List[int] = []
 
 class CommissionRuleCreate(BaseModel):
     name: str
@@ -111,6 +137,79 @@ class CommissionSimulatorResponse(BaseModel):
     difference: float
     breakdown: List[dict]
 
+class CommissionPlanLevel(BaseModel):
+    level: int = Field(..., ge=1, le=20)
+    rate: float = Field(..., ge=0, le=1)
+    # Sponsors below this rank earn nothing at this level; the chain still continues past them
+    min_rank: Optional[PartnerLevel] = None
+
+class CommissionPlan(BaseModel):
+    levels: List[CommissionPlanLevel] = Field(..., min_length=1)
+
+class NetworkSimulationRequest(BaseModel):
+    year: int = Field(..., ge=2000, le=2100)
+    month: int = Field(..., ge=1, le=12)
+    proposed: CommissionPlan
+    # Defaults to the plan the live calculator pays
+    baseline: Optional[CommissionPlan] = None
+    # Hypothetical ranks (partner id -> rank) applied to the proposed plan only
+    rank_overrides: Dict[int, PartnerLevel] = {}
+    volume_multiplier: float = Field(1.0, gt=0)
+
+class SimulationDelta(BaseModel):
+    baseline: float
+    proposed: float
+    difference: float
+
+class LevelSimulationDelta(SimulationDelta):
+    level: int
+
+class RankSimulationDelta(SimulationDelta):
+    rank: str
+
+class NetworkSimulationResponse(BaseModel):
+    period_start: datetime
+    period_end: datetime
+    partners: int
+    selling_partners: int
+    sales: int
+    sales_volume: float
+    baseline_total: float
+    proposed_total: float
+    difference: float
+    by_level: List[LevelSimulationDelta]
+    by_rank: List[RankSimulationDelta]
+
+class RankRequirementSet(BaseModel):
+    rank: PartnerLevel
+    min_personal_volume: float = Field(0.0, ge=0)
+    min_group_volume: float = Field(0.0, ge=0)
+    min_active_legs: int = Field(0, ge=0)
+
+class RankRequirementResponse(BaseModel):
+    id: int
+    rank: PartnerLevel
+    min_personal_volume: float
+    min_group_volume: float
+    min_active_legs: int
+    updated_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
+
+class CommissionQualificationResponse(BaseModel):
+    id: int
+    partner_id: int
+    rule_id: int
+    period_start: datetime
+    period_end: datetime
+    volume_achieved: float
+    status: QualificationStatus
+    qualified_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
+
 class CommissionPayoutCreate(BaseModel):
     partner_id: int
     period_start: datetime
@@ -120,6 +219,7 @@ class CommissionPayoutCreate(BaseModel):
 
 class CommissionPayoutResponse(BaseModel):
     id: int
+    run_id: Optional[int] = None
     partner_id: int
     period_start: datetime
     period_end: datetime
@@ -132,6 +232,26 @@ class CommissionPayoutResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class PayoutRunCreate(BaseModel):
+    period_start: datetime
+    period_end: datetime
+    file_format: str = "csv"
+
+class CommissionPayoutRunResponse(BaseModel):
+    id: int
+    period_start: datetime
+    period_end: datetime
+    status: str
+    payout_count: int
+    total_amount: float
+    file_format: str
+    error: Optional[str] = None
+    created_at: datetime
+    completed_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
+
 class MLMAnalytics(BaseModel):
     total_partners: int
     total_network_size: int
@@ -0,0 +1,297 @@
+import asyncio
+import html
+import re
+from datetime import timedelta
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import func, insert, or_, update
+from sqlalchemy.orm import Session
+from ..core.database import SessionLocal
+from ..core.datetime_utils import utc_now
+from ..core.exceptions import NotFoundError, ValidationException
+from ..models.client import (
+    CampaignDelivery, Client, ClientInteraction, ClientSegment, CommunicationCampaign, CommunicationTemplate
+)
+from .lead_scoring import LeadScoringService
+from .messaging import (
+    EMAIL_CHANNELS, PHONE_CHANNELS, MessageProvider, OutboundMessage, SendResult, get_message_provider
+)
+
+# Messages in flight at once, independent of the provider's rate limit
+MAX_CONCURRENT_SENDS = 20
+# Recipients whose results are written (and progress committed) together
+DELIVERY_BATCH_SIZE = 500
+# A "sending" campaign with no progress for this long lost its worker and may be claimed again
+CAMPAIGN_CLAIM_TIMEOUT_SECONDS = 900
+
+_PLACEHOLDER_RE = re.compile(r"\{\{\s*([a-zA-Z_][a-zA-Z0-9_]*)\s*\}\}")
+
+class CompiledTemplate:
+    """A template split once into literal text and variable slots"""
+
+    def __init__(self, source: str):
+        self.parts: List[str] = []
+        self.variables: List[str] = []
+        position = 0
+        for match in _PLACEHOLDER_RE.finditer(source):
+            self.parts.append(source[position:match.start()])
+            self.variables.append(match.group(1))
+            position = match.end()
+        self.parts.append(source[position:])
+
+    def render(self, context: Dict[str, Any], escape: bool = False) -> str:
+        pieces = [self.parts[0]]
+        for name, literal in zip(self.variables, self.parts[1:]):
+            value = context.get(name)
+            value = "" if value is None else str(value)
+            pieces.append(html.escape(value) if escape else value)
+            pieces.append(literal)
+        return "".join(pieces)
+
+@lru_cache(maxsize=256)
+def compile_template(source: Optional[str]) -> CompiledTemplate:
+    """Keyed by the template text itself, so editing a template never serves a stale compile"""
+    return CompiledTemplate(source or "")
+
+class AsyncRateLimiter:
+    """Spaces acquisitions evenly so at most `rate` calls start per second"""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            now = asyncio.get_running_loop().time()
+            wait = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+# Criteria keys understood in CommunicationCampaign.target_segment / ClientSegment.criteria
+SEGMENT_FILTERS = {
+    "status": lambda value: Client.status.in_(value if isinstance(value, list) else [value]),
+    "engagement_level": lambda value: Client.engagement_level.in_(value if isinstance(value, list) else [value]),
+    "loyalty_tier": lambda value: Client.loyalty_tier.in_(value if isinstance(value, list) else [value]),
+    "lead_source": lambda value: Client.lead_source.in_(value if isinstance(value, list) else [value]),
+    "assigned_agent_id": lambda value: Client.assigned_agent_id == value,
+    "preferred_location": lambda value: Client.preferred_location.ilike(f"%{value}%"),
+    "min_lead_score": lambda value: Client.lead_score >= value,
+    "max_lead_score": lambda value: Client.lead_score <= value,
+    "min_loyalty_points": lambda value: Client.loyalty_points >= value
+}
+
+class CampaignExecutor:
+    """Sends a CommunicationCampaign to every client in its target segment.
+
+    The segment is resolved with one query, the template is compiled once,
+    messages go out with bounded concurrency under the provider's rate limit,
+    and results are written in bulk per batch. Clients that already have a
+    successful delivery for the campaign are skipped, so a re-run only
+    retries failures and recipients it never reached.
+    """
+
+    def __init__(self, db: Session, provider: Optional[MessageProvider] = None):
+        self.db = db
+        self.provider = provider
+
+    def _segment_criteria(self, campaign: CommunicationCampaign) -> Dict[str, Any]:
+        criteria = dict(campaign.target_segment or {})
+        segment_id = criteria.pop("segment_id", None)
+        if segment_id is not None:
+            segment = self.db.query(ClientSegment).filter(ClientSegment.id == segment_id).first()
+            if not segment:
+                raise NotFoundError("Client segment")
+            criteria = {**(segment.criteria or {}), **criteria}
+        unknown = set(criteria) - set(SEGMENT_FILTERS)
+        if unknown:
+            raise ValidationException(f"Unsupported segment criteria: {', '.join(sorted(unknown))}")
+        return criteria
+
+    def resolve_recipients(self, campaign: CommunicationCampaign) -> List[Any]:
+        """Clients in the segment with an address for the channel and no successful delivery yet"""
+        address_column = Client.email if campaign.type in EMAIL_CHANNELS else Client.phone
+        already_sent = self.db.query(CampaignDelivery.id).filter(
+            CampaignDelivery.campaign_id == campaign.id,
+            CampaignDelivery.client_id == Client.id,
+            CampaignDelivery.status == "sent"
+        ).exists()
+        query = self.db.query(
+            Client.id, Client.first_name, Client.last_name, Client.email, Client.phone,
+            Client.loyalty_points, Client.loyalty_tier, Client.preferred_location,
+            address_column.label("address")
+        ).filter(
+            address_column.isnot(None),
+            address_column != "",
+            ~already_sent
+        )
+        for key, value in self._segment_criteria(campaign).items():
+            query = query.filter(SEGMENT_FILTERS[key](value))
+        return query.order_by(Client.id).all()
+
+    def _prepare(self, campaign_id: int) -> Tuple[CommunicationCampaign, CommunicationTemplate, MessageProvider]:
+        """Everything a send needs, raising for whatever would make it fail up front"""
+        campaign = self.db.query(CommunicationCampaign).filter(CommunicationCampaign.id == campaign_id).first()
+        if not campaign:
+            raise NotFoundError("Campaign")
+        if campaign.type not in EMAIL_CHANNELS + PHONE_CHANNELS:
+            raise ValidationException(f"Campaigns cannot be sent over {campaign.type.value}")
+        template = campaign.template or self.db.query(CommunicationTemplate).filter(
+            CommunicationTemplate.id == campaign.template_id
+        ).first()
+        if not template:
+            raise NotFoundError("Communication template")
+        self._segment_criteria(campaign)
+        return campaign, template, self.provider or get_message_provider(self.db, campaign.type)
+
+    def claim(self, campaign_id: int) -> bool:
+        """Validate the campaign and mark it "sending" in one conditional UPDATE.
+
+        Returns False if another send already holds it, so two requests can
+        never both queue a send and deliver every message twice. A send
+        refreshes claimed_at with every batch; a claim that has gone quiet
+        for CAMPAIGN_CLAIM_TIMEOUT_SECONDS belongs to a worker that died and
+        is taken over, and the new send skips what was already delivered.
+        """
+        self._prepare(campaign_id)
+        now = utc_now()
+        claimed = self.db.query(CommunicationCampaign).filter(
+            CommunicationCampaign.id == campaign_id,
+            or_(
+                CommunicationCampaign.status.is_(None),
+                CommunicationCampaign.status != "sending",
+                CommunicationCampaign.claimed_at.is_(None),
+                CommunicationCampaign.claimed_at < now - timedelta(seconds=CAMPAIGN_CLAIM_TIMEOUT_SECONDS)
+            )
+        ).update({"status": "sending", "error": None, "claimed_at": now}, synchronize_session=False)
+        self.db.commit()
+        return claimed == 1
+
+    async def execute(self, campaign_id: int, sent_by: int, claimed: bool = False) -> Dict[str, Any]:
+        """Send the campaign; `claimed` means the caller already holds it through `claim`"""
+        if not claimed and not self.claim(campaign_id):
+            raise ValidationException("Campaign is already being sent")
+        try:
+            return await self._send(campaign_id, sent_by)
+        except Exception as e:
+            self.db.rollback()
+            self.db.query(CommunicationCampaign).filter(CommunicationCampaign.id == campaign_id).update(
+                {"status": "failed", "error": str(e)[:2000]}, synchronize_session=False
+            )
+            self.db.commit()
+            raise
+
+    async def _send(self, campaign_id: int, sent_by: int) -> Dict[str, Any]:
+        campaign, template, provider = self._prepare(campaign_id)
+        recipients = self.resolve_recipients(campaign)
+        subject = compile_template(template.subject)
+        body = compile_template(template.content)
+        escape = campaign.type in EMAIL_CHANNELS
+
+        campaign.total_recipients = (campaign.sent_count or 0) + len(recipients)
+        self.db.commit()
+
+        limiter = AsyncRateLimiter(provider.rate_limit)
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_SENDS)
+
+        async def deliver(recipient) -> Tuple[Any, OutboundMessage, Any]:
+            context = {
+                "first_name": recipient.first_name,
+                "last_name": recipient.last_name,
+                "full_name": f"{recipient.first_name} {recipient.last_name}",
+                "email": recipient.email,
+                "phone": recipient.phone,
+                "loyalty_points": recipient.loyalty_points,
+                "loyalty_tier": recipient.loyalty_tier.value if recipient.loyalty_tier else None,
+                "preferred_location": recipient.preferred_location
+            }
+            message = OutboundMessage(
+                recipient=recipient.address,
+                subject=subject.render(context) if template.subject else None,
+                body=body.render(context, escape=escape)
+            )
+            async with semaphore:
+                await limiter.acquire()
+                try:
+                    result = await provider.send(message)
+                except Exception as e:
+                    # Adapters report failures as results; anything else is a bug we still isolate
+                    result = SendResult(False, error=str(e))
+            return recipient, message, result
+
+        sent = failed = 0
+        for start in range(0, len(recipients), DELIVERY_BATCH_SIZE):
+            outcomes = await asyncio.gather(*[deliver(r) for r in recipients[start:start + DELIVERY_BATCH_SIZE]])
+            batch_sent = self._record_batch(campaign, provider, outcomes, sent_by)
+            sent += batch_sent
+            failed += len(outcomes) - batch_sent
+
+        campaign.status = "completed"
+        self.db.commit()
+        return {
+            "campaign_id": campaign.id,
+            "recipients": len(recipients),
+            "sent": sent,
+            "failed": failed,
+            "provider": provider.name
+        }
+
+    def _record_batch(self, campaign: CommunicationCampaign, provider: MessageProvider,
+                      outcomes: List[Tuple[Any, OutboundMessage, Any]], sent_by: int) -> int:
+        now = utc_now()
+        deliveries = []
+        interactions = []
+        sent_ids = []
+        for recipient, message, result in outcomes:
+            deliveries.append({
+                "campaign_id": campaign.id,
+                "client_id": recipient.id,
+                "channel": campaign.type,
+                "recipient": message.recipient,
+                "status": "sent" if result.success else "failed",
+                "provider": provider.name,
+                "provider_message_id": result.message_id,
+                "error": result.error,
+                "sent_at": now
+            })
+            if result.success:
+                sent_ids.append(recipient.id)
+                interactions.append({
+                    "client_id": recipient.id,
+                    "agent_id": sent_by,
+                    "type": campaign.type,
+                    "subject": message.subject,
+                    "content": message.body,
+                    "completed_at": now,
+                    "interaction_metadata": {"campaign_id": campaign.id, "provider_message_id": result.message_id},
+                    "created_at": now
+                })
+
+        if deliveries:
+            self.db.execute(insert(CampaignDelivery), deliveries)
+        if interactions:
+            self.db.execute(insert(ClientInteraction), interactions)
+            self.db.execute(
+                update(Client).where(Client.id.in_(sent_ids)).values(last_contact_date=now),
+                execution_options={"synchronize_session": False}
+            )
+        self.db.execute(
+            update(CommunicationCampaign)
+            .where(CommunicationCampaign.id == campaign.id)
+            .values(sent_count=func.coalesce(CommunicationCampaign.sent_count, 0) + len(sent_ids), claimed_at=now),
+            execution_options={"synchronize_session": False}
+        )
+        self.db.commit()
+
+        # New interactions feed the engagement part of the lead score
+        LeadScoringService(self.db).score_clients(sent_ids)
+        return len(sent_ids)
+
+def run_campaign_job(campaign_id: int, sent_by: int) -> None:
+    """Background task entry point for a campaign the request has claimed; uses its own session"""
+    db = SessionLocal()
+    try:
+        asyncio.run(CampaignExecutor(db).execute(campaign_id, sent_by, claimed=True))
+    finally:
+        db.close()
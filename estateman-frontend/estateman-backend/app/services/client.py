@@ -1,7 +1,8 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, func, desc
+from sqlalchemy import or_, func, desc
 from typing import List, Optional, Dict, Any
 from datetime import datetime, timedelta
+import asyncio
 import uuid
 from app.core.datetime_utils import utc_now, ensure_timezone_aware
 from app.core.validation import sanitize_html, validate_id, validate_email, validate_phone
@@ -9,8 +10,15 @@ from app.core.exceptions import NotFoundError, ValidationException
 from app.models.client import (
     Client, Lead, ClientInteraction, LoyaltyTransaction, 
     LeadSource, ClientSegment, ClientStatus, LeadStatus, LeadTemperature,
-    RewardCatalog, CommunicationTemplate, CommunicationCampaign, ClientDuplicate
+    RewardCatalog, CommunicationTemplate, CommunicationCampaign
 )
+from fastapi import BackgroundTasks
+from app.services.client_matching import ClientMatchingService, MATCH_FIELDS, run_client_match_job
+from app.services.client_dedupe import ClientDedupeService
+from app.services.lead_scoring import LeadScoringService
+from app.services.client_merge import ClientMergeService
+from app.services.campaign_delivery import CampaignExecutor
+from app.services.client_analytics import client_analytics_cache, compute_client_analytics
 from app.schemas.client import (
     ClientCreate, ClientUpdate, LeadCreate, LeadUpdate,
     InteractionCreate, LoyaltyTransactionCreate
@@ -20,17 +28,20 @@ class ClientService:
     def __init__(self, db: Session):
         self.db = db
 
-    def create_client(self, client_data: ClientCreate) -> Client:
+    def create_client(self, client_data: ClientCreate, background_tasks: Optional[BackgroundTasks] = None) -> Client:
         client = Client(
             client_id=f"C{str(uuid.uuid4())[:8].upper()}",
             **client_data.dict()
         )
+        ClientDedupeService(self.db).sync_keys(client)
         self.db.add(client)
         self.db.commit()
         self.db.refresh(client)
+        client_analytics_cache.invalidate()
         
         # Calculate initial lead score
         self._update_lead_score(client.id)
+        self._refresh_matches(client.id, background_tasks)
         return client
 
     def get_client(self, client_id: int) -> Optional[Client]:
@@ -62,100 +73,54 @@ class ClientService:
             
         return query.offset(skip).limit(limit).all()
 
-    def update_client(self, client_id: int, client_data: ClientUpdate) -> Optional[Client]:
+    def update_client(self, client_id: int, client_data: ClientUpdate,
+                      background_tasks: Optional[BackgroundTasks] = None) -> Optional[Client]:
         client = self.get_client(client_id)
         if not client:
             return None
             
-        for field, value in client_data.dict(exclude_unset=True).items():
+        changes = client_data.dict(exclude_unset=True)
+        for field, value in changes.items():
             setattr(client, field, value)
+        ClientDedupeService(self.db).sync_keys(client)
         
         client.updated_at = utc_now()
         self.db.commit()
         self.db.refresh(client)
+        client_analytics_cache.invalidate()
         
         # Recalculate lead score if relevant fields changed
         self._update_lead_score(client_id)
+        if MATCH_FIELDS.intersection(changes):
+            self._refresh_matches(client_id, background_tasks)
         return client
 
+    def _refresh_matches(self, client_id: int, background_tasks: Optional[BackgroundTasks]) -> None:
+        """Scoring reads every active property, so it runs after the response when it can"""
+        if background_tasks is not None:
+            background_tasks.add_task(run_client_match_job, [client_id])
+        else:
+            ClientMatchingService(self.db).refresh_client(client_id)
+
     def delete_client(self, client_id: int) -> bool:
         client = self.get_client(client_id)
         if not client:
             return False
         self.db.delete(client)
         self.db.commit()
+        client_analytics_cache.invalidate()
         return True
 
     def _update_lead_score(self, client_id: int):
-        """Calculate and update lead score based on various factors"""
-        client = self.get_client(client_id)
-        if not client:
-            return
-            
-        score = 0
-        
-        # Basic information completeness (0-20 points)
-        if client.phone: score += 5
-        if client.budget_min and client.budget_max: score += 10
-        if client.preferred_location: score += 5
-        
-        # Engagement level (0-30 points)
-        recent_interactions = self.db.query(ClientInteraction).filter(
-            and_(
-                ClientInteraction.client_id == client_id,
-                ClientInteraction.created_at >= utc_now() - timedelta(days=30)
-            )
-        ).count()
-        score += min(recent_interactions * 5, 30)
-        
-        # Lead source quality (0-20 points)
-        source_scores = {
-            "referral": 20, "website": 15, "social_media": 10,
-            "google_ads": 12, "walk_in": 8, "cold_call": 5
-        }
-        score += source_scores.get(client.lead_source, 0)
-        
-        # Budget range (0-30 points)
-        if client.budget_max:
-            if client.budget_max >= 1000000: score += 30
-            elif client.budget_max >= 500000: score += 20
-            elif client.budget_max >= 250000: score += 10
-            else: score += 5
-        
-        client.lead_score = min(score, 100)
-        
-        # Update engagement level
-        if score >= 80: client.engagement_level = "high"
-        elif score >= 50: client.engagement_level = "medium"
-        else: client.engagement_level = "low"
-        
-        self.db.commit()
+        """Recalculate the client's lead score (and record it in the score history if it changed)"""
+        LeadScoringService(self.db).score_clients([client_id])
 
     def get_client_analytics(self) -> Dict[str, Any]:
-        total_clients = self.db.query(Client).count()
-        active_clients = self.db.query(Client).filter(Client.status == ClientStatus.ACTIVE).count()
-        leads_count = self.db.query(Client).filter(Client.status == ClientStatus.LEAD).count()
-        
-        avg_score = self.db.query(func.avg(Client.lead_score)).scalar() or 0
-        total_points = self.db.query(func.sum(Client.loyalty_points)).scalar() or 0
-        
-        conversion_rate = (active_clients / total_clients * 100) if total_clients > 0 else 0
-        
-        # Top lead sources
-        top_sources = self.db.query(
-            Client.lead_source,
-            func.count(Client.id).label('count')
-        ).filter(Client.lead_source.isnot(None)).group_by(Client.lead_source).order_by(desc('count')).limit(5).all()
-        
-        return {
-            "total_clients": total_clients,
-            "active_clients": active_clients,
-            "leads_count": leads_count,
-            "conversion_rate": round(conversion_rate, 2),
-            "average_lead_score": round(avg_score, 1),
-            "total_loyalty_points": total_points,
-            "top_lead_sources": [{"source": s[0], "count": s[1]} for s in top_sources]
-        }
+        analytics = client_analytics_cache.get()
+        if analytics is None:
+            analytics = compute_client_analytics(self.db)
+            client_analytics_cache.set(analytics)
+        return analytics
 
 class LeadService:
     def __init__(self, db: Session):
@@ -245,6 +210,7 @@ class LoyaltyService:
             self._update_loyalty_tier(client)
         
         self.db.commit()
+        client_analytics_cache.invalidate()
 
     def redeem_points(self, client_id: int, points: int, description: str) -> bool:
         client = self.db.query(Client).filter(Client.id == client_id).first()
@@ -262,6 +228,7 @@ class LoyaltyService:
         client.loyalty_points -= points
         self._update_loyalty_tier(client)
         self.db.commit()
+        client_analytics_cache.invalidate()
         return True
 
     def _update_loyalty_tier(self, client: Client):
@@ -294,6 +261,8 @@ class CommunicationService:
             client.last_contact_date = utc_now()
         
         self.db.commit()
+        # The new interaction counts toward the engagement component right away
+        LeadScoringService(self.db).score_clients([interaction.client_id])
         self.db.refresh(interaction)
         return interaction
 
@@ -302,111 +271,21 @@ class CommunicationService:
             ClientInteraction.client_id == client_id
         ).order_by(desc(ClientInteraction.created_at)).all()
 
-    def get_interaction_timeline(self, client_id: int) -> List[Dict[str, Any]]:
-        interactions = self.get_client_interactions(client_id)
-        return [
-            {
-                "id": i.id,
-                "type": i.type.value,
-                "subject": i.subject,
-                "content": i.content,
-                "agent_id": i.agent_id,
-                "created_at": i.created_at,
-                "completed_at": i.completed_at,
-                "outcome": i.outcome
-            }
-            for i in interactions
-        ]
-    
-    def detect_duplicates(self, email: str = None, phone: str = None) -> List[Dict[str, Any]]:
-        """Detect potential duplicate clients"""
-        if not email and not phone:
+    def detect_duplicates(self, email: str = None, phone: str = None,
+                          first_name: str = None, last_name: str = None) -> List[Dict[str, Any]]:
+        """Detect potential duplicate clients via the normalized match-key indexes"""
+        if not any((email, phone, first_name, last_name)):
             return []
-        
-        duplicates = []
-        
-        if email:
-            email_matches = self.db.query(Client).filter(
-                Client.email.ilike(f"%{email}%")
-            ).all()
-            
-            for match in email_matches:
-                similarity_score = 100 if match.email.lower() == email.lower() else 80
-                duplicates.append({
-                    "client_id": match.id,
-                    "client_name": f"{match.first_name} {match.last_name}",
-                    "email": match.email,
-                    "phone": match.phone,
-                    "similarity_score": similarity_score,
-                    "match_criteria": ["email"]
-                })
-        
-        if phone:
-            phone_matches = self.db.query(Client).filter(
-                Client.phone.ilike(f"%{phone}%")
-            ).all()
-            
-            for match in phone_matches:
-                similarity_score = 100 if match.phone == phone else 85
-                existing = next((d for d in duplicates if d["client_id"] == match.id), None)
-                if existing:
-                    existing["match_criteria"].append("phone")
-                    existing["similarity_score"] = max(existing["similarity_score"], similarity_score)
-                else:
-                    duplicates.append({
-                        "client_id": match.id,
-                        "client_name": f"{match.first_name} {match.last_name}",
-                        "email": match.email,
-                        "phone": match.phone,
-                        "similarity_score": similarity_score,
-                        "match_criteria": ["phone"]
-                    })
-        
-        return duplicates
+        return ClientDedupeService(self.db).find_duplicates(email, phone, first_name, last_name)
     
     def merge_clients(self, primary_id: int, duplicate_id: int, merged_by: int) -> bool:
         """Merge duplicate client into primary client"""
-        primary = self.get_client(primary_id)
-        duplicate = self.get_client(duplicate_id)
-        
-        if not primary or not duplicate:
+        try:
+            ClientMergeService(self.db).merge_clusters(
+                [{"primary_id": primary_id, "duplicate_ids": [duplicate_id]}], merged_by
+            )
+        except ValidationException:
             return False
-        
-        # Merge interactions
-        self.db.query(ClientInteraction).filter(
-            ClientInteraction.client_id == duplicate_id
-        ).update({"client_id": primary_id})
-        
-        # Merge loyalty transactions
-        self.db.query(LoyaltyTransaction).filter(
-            LoyaltyTransaction.client_id == duplicate_id
-        ).update({"client_id": primary_id})
-        
-        # Merge leads
-        self.db.query(Lead).filter(
-            Lead.client_id == duplicate_id
-        ).update({"client_id": primary_id})
-        
-        # Update primary client with merged data
-        primary.loyalty_points += duplicate.loyalty_points
-        primary.total_spent += duplicate.total_spent
-        
-        # Record the merge
-        from app.models.client import ClientDuplicate
-        merge_record = ClientDuplicate(
-            primary_client_id=primary_id,
-            duplicate_client_id=duplicate_id,
-            similarity_score=100,
-            match_criteria={"merged": True},
-            status="merged",
-            merged_by=merged_by
-        )
-        self.db.add(merge_record)
-        
-        # Delete duplicate client
-        self.db.delete(duplicate)
-        self.db.commit()
-        
         return True
 
     def send_email(self, client_id: int, template_id: int, data: Dict = None) -> Dict[str, Any]:
@@ -453,6 +332,30 @@ class CommunicationService:
         
         return {"success": True, "message": "SMS sent successfully"}
 
+    def get_templates(self, type: Optional[str] = None) -> List[CommunicationTemplate]:
+        query = self.db.query(CommunicationTemplate).filter(CommunicationTemplate.is_active == True)
+        if type:
+            query = query.filter(CommunicationTemplate.type == type)
+        return query.order_by(CommunicationTemplate.name).all()
+
+    def create_template(self, template_data: Dict[str, Any]) -> CommunicationTemplate:
+        template = CommunicationTemplate(**template_data)
+        self.db.add(template)
+        self.db.commit()
+        self.db.refresh(template)
+        return template
+
+    def create_campaign(self, campaign_data: Dict[str, Any]) -> CommunicationCampaign:
+        campaign = CommunicationCampaign(**campaign_data)
+        self.db.add(campaign)
+        self.db.commit()
+        self.db.refresh(campaign)
+        return campaign
+
+    def send_bulk_communication(self, campaign_id: int, sent_by: int) -> Dict[str, Any]:
+        """Send a campaign inline; the API queues run_campaign_job instead"""
+        return asyncio.run(CampaignExecutor(self.db).execute(campaign_id, sent_by))
+
 class RewardService:
     def __init__(self, db: Session):
         self.db = db
@@ -494,5 +397,6 @@ class RewardService:
         )
         self.db.add(transaction)
         self.db.commit()
+        client_analytics_cache.invalidate()
         
         return {"success": True, "message": "Reward redeemed successfully"}
\ No newline at end of file
@@ -0,0 +1,75 @@
+import threading
+import time
+from typing import Any, Dict, Optional
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from ..models.client import Client, ClientStatus
+
+TOP_SOURCE_COUNT = 5
+# Writes made through other worker processes show up after at most this long
+ANALYTICS_MAX_AGE_SECONDS = 60
+
+class ClientAnalyticsCache:
+    """Process-local cache of the client analytics overview.
+
+    Client writes in this process invalidate it; the max age bounds how stale
+    it can get with respect to writes from other processes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._value: Optional[Dict[str, Any]] = None
+        self._built_at: Optional[float] = None
+
+    def get(self) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            if self._built_at is None or time.monotonic() - self._built_at > ANALYTICS_MAX_AGE_SECONDS:
+                return None
+            return self._value
+
+    def set(self, value: Dict[str, Any]) -> None:
+        with self._lock:
+            self._value = value
+            self._built_at = time.monotonic()
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._value = None
+            self._built_at = None
+
+client_analytics_cache = ClientAnalyticsCache()
+
+def compute_client_analytics(db: Session) -> Dict[str, Any]:
+    """All overview figures from one scan: FILTER aggregates grouped by lead source.
+
+    Totals are the sum of the per-source groups, so the source breakdown and
+    the headline numbers come from the same statement.
+    """
+    groups = db.query(
+        Client.lead_source,
+        func.count(Client.id).label("total"),
+        func.count(Client.id).filter(Client.status == ClientStatus.ACTIVE).label("active"),
+        func.count(Client.id).filter(Client.status == ClientStatus.LEAD).label("leads"),
+        func.sum(Client.lead_score).label("score_sum"),
+        func.count(Client.lead_score).label("scored"),
+        func.sum(Client.loyalty_points).label("points")
+    ).group_by(Client.lead_source).all()
+
+    total_clients = sum(group.total for group in groups)
+    active_clients = sum(group.active for group in groups)
+    scored = sum(group.scored for group in groups)
+    score_sum = sum(group.score_sum or 0 for group in groups)
+    top_sources = sorted(
+        (group for group in groups if group.lead_source is not None),
+        key=lambda group: (-group.total, group.lead_source)
+    )[:TOP_SOURCE_COUNT]
+
+    return {
+        "total_clients": total_clients,
+        "active_clients": active_clients,
+        "leads_count": sum(group.leads for group in groups),
+        "conversion_rate": round(active_clients / total_clients * 100, 2) if total_clients > 0 else 0,
+        "average_lead_score": round(score_sum / scored, 1) if scored else 0,
+        "total_loyalty_points": sum(group.points or 0 for group in groups),
+        "top_lead_sources": [{"source": group.lead_source, "count": group.total} for group in top_sources]
+    }
@@ -0,0 +1,270 @@
+import re
+import unicodedata
+from functools import lru_cache
+from types import SimpleNamespace
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+from sqlalchemy import func, insert, or_, update
+from sqlalchemy.orm import Session
+from ..core.database import SessionLocal
+from ..models.client import Client, ClientDuplicate
+
+DUPLICATE_SCORE_THRESHOLD = 60.0
+NAME_SIMILARITY_THRESHOLD = 0.6
+# Sorted-neighbourhood window for the name passes
+NAME_WINDOW = 8
+# Equal-key blocks larger than this are placeholder values ("000...", "test@..."), not people
+MAX_BLOCK_SIZE = 50
+NAME_CANDIDATE_LIMIT = 20
+BATCH_SIZE = 5000
+
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9]+")
+GMAIL_DOMAINS = ("gmail.com", "googlemail.com")
+
+def normalize_email(email: Optional[str]) -> Optional[str]:
+    """Lowercase; for Gmail also drop dots and +tags, which route to the same inbox"""
+    if not email or "@" not in email:
+        return None
+    local, domain = email.strip().lower().rsplit("@", 1)
+    if domain in GMAIL_DOMAINS:
+        local = local.split("+", 1)[0].replace(".", "")
+        domain = "gmail.com"
+    return f"{local}@{domain}"
+
+def normalize_phone(phone: Optional[str]) -> Optional[str]:
+    """Digits only, national number (last 10 digits) so country-code variants match"""
+    digits = re.sub(r"\D", "", phone or "")
+    if len(digits) < 7:
+        return None
+    return digits[-10:]
+
+def normalize_name(first_name: Optional[str], last_name: Optional[str]) -> Optional[str]:
+    text = unicodedata.normalize("NFKD", f"{first_name or ''} {last_name or ''}")
+    text = text.encode("ascii", "ignore").decode("ascii").lower()
+    return " ".join(_NON_ALNUM_RE.sub(" ", text).split()) or None
+
+def match_keys(email: Optional[str], phone: Optional[str],
+               first_name: Optional[str], last_name: Optional[str]) -> Dict[str, Optional[str]]:
+    return {
+        "email_key": normalize_email(email),
+        "phone_key": normalize_phone(phone),
+        "name_key": normalize_name(first_name, last_name)
+    }
+
+@lru_cache(maxsize=1 << 18)
+def trigrams(text: Optional[str]) -> FrozenSet[str]:
+    """Trigram set built the way pg_trgm does: per word, padded with two leading and one trailing space"""
+    grams = set()
+    for word in (text or "").split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return frozenset(grams)
+
+def trigram_similarity(a: Optional[str], b: Optional[str]) -> float:
+    grams_a, grams_b = trigrams(a), trigrams(b)
+    if not grams_a or not grams_b:
+        return 0.0
+    return len(grams_a & grams_b) / len(grams_a | grams_b)
+
+def score_pair(a, b) -> Tuple[float, List[str], float]:
+    """(score 0-100, matched fields, name similarity) for two rows exposing the key columns"""
+    name_similarity = trigram_similarity(a.name_key, b.name_key)
+    fields = []
+    score = 0.0
+    if a.email_key and a.email_key == b.email_key:
+        fields.append("email")
+        score = 100.0
+    if a.phone_key and a.phone_key == b.phone_key:
+        fields.append("phone")
+        score = max(score, 70.0 + 30.0 * name_similarity)
+    if name_similarity >= NAME_SIMILARITY_THRESHOLD:
+        fields.append("name")
+        score = max(score, 80.0 * name_similarity)
+    return round(score, 1), fields, round(name_similarity, 3)
+
+class ClientDedupeService:
+    """Duplicate client detection over normalized, indexed match keys.
+
+    Single lookups use equality on email_key/phone_key and trigram search on
+    name_key. The batch scan compares only clients that share a blocking key
+    (same email or phone key, or neighbours in name order), never all pairs.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def sync_keys(self, client: Client) -> None:
+        for column, value in match_keys(client.email, client.phone, client.first_name, client.last_name).items():
+            setattr(client, column, value)
+
+    def find_duplicates(self, email: Optional[str] = None, phone: Optional[str] = None,
+                        first_name: Optional[str] = None, last_name: Optional[str] = None,
+                        exclude_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        probe = SimpleNamespace(**match_keys(email, phone, first_name, last_name))
+
+        conditions = []
+        if probe.email_key:
+            conditions.append(Client.email_key == probe.email_key)
+        if probe.phone_key:
+            conditions.append(Client.phone_key == probe.phone_key)
+        candidates = {client.id: client for client in self.db.query(Client).filter(or_(*conditions))} if conditions else {}
+
+        if probe.name_key:
+            for client in self._name_candidates(probe.name_key):
+                candidates.setdefault(client.id, client)
+        candidates.pop(exclude_id, None)
+
+        duplicates = []
+        for client in candidates.values():
+            score, fields, _ = score_pair(probe, client)
+            if score >= DUPLICATE_SCORE_THRESHOLD:
+                duplicates.append({
+                    "client_id": client.id,
+                    "client_name": f"{client.first_name} {client.last_name}",
+                    "email": client.email,
+                    "phone": client.phone,
+                    "similarity_score": score,
+                    "match_criteria": fields
+                })
+        return sorted(duplicates, key=lambda d: (-d["similarity_score"], d["client_id"]))
+
+    def _name_candidates(self, name_key: str) -> List[Client]:
+        if self.db.bind.dialect.name == "postgresql":
+            # pg_trgm '%' uses the GIN trigram index on name_key
+            return self.db.query(Client).filter(
+                Client.name_key.op("%")(name_key)
+            ).order_by(func.similarity(Client.name_key, name_key).desc()).limit(NAME_CANDIDATE_LIMIT).all()
+        return self.db.query(Client).filter(
+            Client.name_key.like(f"{name_key[:3]}%")
+        ).limit(NAME_CANDIDATE_LIMIT * 10).all()
+
+    def backfill_keys(self) -> int:
+        """Compute missing or stale match keys in keyset pages"""
+        updated = 0
+        last_id = 0
+        while True:
+            rows = self.db.query(
+                Client.id, Client.email, Client.phone, Client.first_name, Client.last_name,
+                Client.email_key, Client.phone_key, Client.name_key
+            ).filter(Client.id > last_id).order_by(Client.id).limit(BATCH_SIZE).all()
+            if not rows:
+                break
+            changes = []
+            for row in rows:
+                keys = match_keys(row.email, row.phone, row.first_name, row.last_name)
+                if (keys["email_key"], keys["phone_key"], keys["name_key"]) != (row.email_key, row.phone_key, row.name_key):
+                    changes.append({"id": row.id, **keys})
+            if changes:
+                self.db.execute(update(Client), changes)
+                self.db.commit()
+                updated += len(changes)
+            last_id = rows[-1].id
+        return updated
+
+    def scan(self) -> Dict[str, int]:
+        """Rebuild the pending ClientDuplicate candidates for the whole client base"""
+        backfilled = self.backfill_keys()
+        columns = (Client.id, Client.email_key, Client.phone_key, Client.name_key)
+        pairs: Dict[Tuple[int, int], Tuple[Any, Any]] = {}
+        oversized_blocks = 0
+
+        for key_column in (Client.email_key, Client.phone_key):
+            rows = self.db.query(*columns).filter(key_column.isnot(None)).order_by(key_column, Client.id)
+            block: List[Any] = []
+            block_key = None
+            for row in rows.yield_per(BATCH_SIZE):
+                key = getattr(row, key_column.key)
+                if key != block_key:
+                    oversized_blocks += self._pair_block(block, pairs)
+                    block, block_key = [], key
+                block.append(row)
+            oversized_blocks += self._pair_block(block, pairs)
+
+        name_orders = (
+            (Client.name_key, Client.id),
+            (func.lower(Client.last_name), func.lower(Client.first_name), Client.id)
+        )
+        for order in name_orders:
+            window: List[Any] = []
+            rows = self.db.query(*columns).filter(Client.name_key.isnot(None)).order_by(*order)
+            for row in rows.yield_per(BATCH_SIZE):
+                for other in window:
+                    if trigram_similarity(row.name_key, other.name_key) >= NAME_SIMILARITY_THRESHOLD:
+                        self._add_pair(row, other, pairs)
+                window.append(row)
+                if len(window) >= NAME_WINDOW:
+                    window.pop(0)
+
+        resolved = {
+            (min(primary_id, duplicate_id), max(primary_id, duplicate_id)) for primary_id, duplicate_id in self.db.query(
+                ClientDuplicate.primary_client_id, ClientDuplicate.duplicate_client_id
+            ).filter(ClientDuplicate.status != "pending", ClientDuplicate.duplicate_client_id.isnot(None))
+        }
+        self.db.query(ClientDuplicate).filter(
+            ClientDuplicate.status == "pending"
+        ).delete(synchronize_session=False)
+
+        candidates = []
+        for (primary_id, duplicate_id), (primary, duplicate) in pairs.items():
+            if (primary_id, duplicate_id) in resolved:
+                continue
+            score, fields, name_similarity = score_pair(primary, duplicate)
+            if score < DUPLICATE_SCORE_THRESHOLD:
+                continue
+            candidates.append({
+                "primary_client_id": primary_id,
+                "duplicate_client_id": duplicate_id,
+                "similarity_score": score,
+                "match_criteria": {"fields": fields, "name_similarity": name_similarity},
+                "status": "pending"
+            })
+            if len(candidates) >= BATCH_SIZE:
+                self.db.execute(insert(ClientDuplicate), candidates)
+                candidates = []
+        if candidates:
+            self.db.execute(insert(ClientDuplicate), candidates)
+        self.db.commit()
+
+        return {
+            "keys_backfilled": backfilled,
+            "pairs_compared": len(pairs),
+            "duplicates_found": self.db.query(ClientDuplicate).filter(ClientDuplicate.status == "pending").count(),
+            "oversized_blocks_skipped": oversized_blocks
+        }
+
+    def _pair_block(self, block: List[Any], pairs: Dict) -> int:
+        if len(block) > MAX_BLOCK_SIZE:
+            return 1
+        for i, row in enumerate(block):
+            for other in block[:i]:
+                self._add_pair(row, other, pairs)
+        return 0
+
+    def _add_pair(self, a, b, pairs: Dict) -> None:
+        # The older client (lower id) is the proposed primary
+        primary, duplicate = (a, b) if a.id < b.id else (b, a)
+        pairs.setdefault((primary.id, duplicate.id), (primary, duplicate))
+
+    def get_candidates(self, status: str = "pending", skip: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
+        rows = self.db.query(ClientDuplicate).filter(
+            ClientDuplicate.status == status
+        ).order_by(ClientDuplicate.similarity_score.desc(), ClientDuplicate.id).offset(skip).limit(limit).all()
+        return [
+            {
+                "id": row.id,
+                "primary_client_id": row.primary_client_id,
+                "duplicate_client_id": row.duplicate_client_id,
+                "similarity_score": row.similarity_score,
+                "match_criteria": row.match_criteria,
+                "status": row.status,
+                "created_at": row.created_at
+            }
+            for row in rows
+        ]
+
+def run_client_dedupe_job() -> None:
+    """Background task entry point; uses its own session since the request's is closed"""
+    db = SessionLocal()
+    try:
+        ClientDedupeService(db).scan()
+    finally:
+        db.close()
@@ -0,0 +1,327 @@
+from typing import Dict, Iterable, List, Optional, Set
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from ..core.database import SessionLocal
+from ..core.datetime_utils import utc_now
+from ..models.client import Client, ClientPropertyMatch, ClientStatus
+from ..models.property import Property, PropertyStatus, PropertyType
+
+TOP_N = 20
+MIN_MATCH_SCORE = 55.0
+# Weights of each component in the 0-100 match score
+MATCH_WEIGHTS = {"budget": 0.5, "location": 0.3, "type": 0.2}
+# Score given to a component the client expressed no preference for
+NEUTRAL_SCORE = 0.5
+# Price this far outside the budget (as a share of the bound) scores zero
+BUDGET_TOLERANCE = 0.2
+# Upper bound on client x property cells scored at once
+CHUNK_CELLS = 2_000_000
+# Client fields that feed the match score; changing any of them triggers a recompute
+MATCH_FIELDS = {"budget_min", "budget_max", "preferred_location", "property_interests", "status"}
+# Property fields that feed it; edits to anything else leave the stored matches valid
+PROPERTY_MATCH_FIELDS = {"price", "city", "property_type", "status"}
+
+TYPE_CODES = {property_type: code for code, property_type in enumerate(PropertyType)}
+NO_PREFERENCE = -1
+UNKNOWN_LOCATION = -2
+
+def normalize_location(value: Optional[str]) -> Optional[str]:
+    """'Austin, TX' and ' austin ' both become 'austin'"""
+    if not value:
+        return None
+    return value.split(",")[0].strip().lower() or None
+
+class ClientFeatures:
+    """Preference columns for a set of clients, as NumPy arrays"""
+
+    def __init__(self, rows, city_codes: Dict[str, int]):
+        self.ids = np.array([row.id for row in rows], dtype=np.int64)
+        self.budget_min = np.array([row.budget_min if row.budget_min else np.nan for row in rows], dtype=np.float64)
+        self.budget_max = np.array([row.budget_max if row.budget_max else np.nan for row in rows], dtype=np.float64)
+
+        locations = [normalize_location(row.preferred_location) for row in rows]
+        self.location_codes = np.array(
+            [NO_PREFERENCE if location is None else city_codes.get(location, UNKNOWN_LOCATION) for location in locations],
+            dtype=np.int64
+        )
+
+        masks = []
+        for row in rows:
+            mask = 0
+            for interest in row.property_interests or []:
+                try:
+                    mask |= 1 << TYPE_CODES[PropertyType(str(interest).lower())]
+                except ValueError:
+                    continue
+            masks.append(mask)
+        self.type_masks = np.array(masks, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return self.ids.size
+
+class PropertyFeatures:
+    """Matchable columns for the listed inventory, as NumPy arrays"""
+
+    def __init__(self, rows):
+        self.ids = np.array([row.id for row in rows], dtype=np.int64)
+        self.prices = np.array([row.price for row in rows], dtype=np.float64)
+        self.city_codes: Dict[str, int] = {}
+        self.cities = np.array(
+            [self.city_codes.setdefault(normalize_location(row.city) or "", len(self.city_codes)) for row in rows],
+            dtype=np.int64
+        )
+        self.types = np.array([TYPE_CODES[row.property_type] for row in rows], dtype=np.int64)
+
+    def __len__(self) -> int:
+        return self.ids.size
+
+class ClientMatchingService:
+    """Scores every client against every listed property and keeps the top N per client.
+
+    Scores are computed as client x property matrices in bounded chunks. Writes to a
+    client or a property only recompute the rows they can affect.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def _client_rows(self):
+        return self.db.query(
+            Client.id, Client.budget_min, Client.budget_max, Client.preferred_location, Client.property_interests
+        ).filter(Client.status != ClientStatus.INACTIVE)
+
+    def _property_rows(self):
+        return self.db.query(
+            Property.id, Property.price, Property.city, Property.property_type
+        ).filter(Property.status == PropertyStatus.ACTIVE, Property.price.isnot(None))
+
+    def score(self, clients: ClientFeatures, properties: PropertyFeatures) -> Dict[str, np.ndarray]:
+        """Component and total scores as (clients x properties) arrays"""
+        prices = properties.prices[None, :]
+        low = clients.budget_min[:, None]
+        high = clients.budget_max[:, None]
+
+        below = np.where(np.isnan(low), 0.0, np.maximum(low - prices, 0.0) / np.where(np.isnan(low), 1.0, low))
+        above = np.where(np.isnan(high), 0.0, np.maximum(prices - high, 0.0) / np.where(np.isnan(high), 1.0, high))
+        budget = np.clip(1.0 - (below + above) / BUDGET_TOLERANCE, 0.0, 1.0)
+        no_budget = (np.isnan(clients.budget_min) & np.isnan(clients.budget_max))[:, None]
+        budget = np.where(no_budget, NEUTRAL_SCORE, budget)
+
+        location_codes = clients.location_codes[:, None]
+        location = np.where(
+            location_codes == NO_PREFERENCE,
+            NEUTRAL_SCORE,
+            (location_codes == properties.cities[None, :]).astype(np.float64)
+        )
+
+        type_masks = clients.type_masks[:, None]
+        property_type = np.where(
+            type_masks == 0,
+            NEUTRAL_SCORE,
+            ((type_masks >> properties.types[None, :]) & 1).astype(np.float64)
+        )
+
+        total = 100.0 * (
+            MATCH_WEIGHTS["budget"] * budget
+            + MATCH_WEIGHTS["location"] * location
+            + MATCH_WEIGHTS["type"] * property_type
+        )
+        return {"budget": budget, "location": location, "type": property_type, "total": total}
+
+    def rebuild(self) -> int:
+        """Recompute matches for every client. Meant to run on a schedule or after bulk loads."""
+        properties = PropertyFeatures(self._property_rows().all())
+        self.db.query(ClientPropertyMatch).delete(synchronize_session=False)
+        created = self._store_top_matches(self._client_rows().all(), properties)
+        self.db.commit()
+        return created
+
+    def refresh_client(self, client_id: int) -> None:
+        self.refresh_clients([client_id])
+
+    def refresh_clients(self, client_ids: Iterable[int]) -> None:
+        """Replace the stored matches of the given clients"""
+        client_ids = list(set(client_ids))
+        if not client_ids:
+            return
+        self.db.query(ClientPropertyMatch).filter(
+            ClientPropertyMatch.client_id.in_(client_ids)
+        ).delete(synchronize_session=False)
+        rows = self._client_rows().filter(Client.id.in_(client_ids)).all()
+        if rows:
+            self._store_top_matches(rows, PropertyFeatures(self._property_rows().all()))
+        self.db.commit()
+
+    def refresh_property(self, property_id: int) -> None:
+        """Re-score one property against every client after it was created or changed.
+
+        Clients it now qualifies for get it inserted (dropping their weakest match);
+        clients that lose it are recomputed so their list is refilled.
+        """
+        previous = self.clients_matching(property_id)
+        self.db.query(ClientPropertyMatch).filter(
+            ClientPropertyMatch.property_id == property_id
+        ).delete(synchronize_session=False)
+
+        row = self._property_rows().filter(Property.id == property_id).first()
+        if row is None:
+            self.db.commit()
+            self.refresh_clients(previous)
+            return
+
+        properties = PropertyFeatures([row])
+        clients = ClientFeatures(self._client_rows().all(), properties.city_codes)
+        scores = {name: values[:, 0] for name, values in self.score(clients, properties).items()}
+        candidates = np.nonzero(scores["total"] >= MIN_MATCH_SCORE)[0]
+
+        floors = self._score_floors(clients.ids[candidates].tolist())
+        now = utc_now()
+        inserted: Set[int] = set()
+        matches = []
+        for index in candidates:
+            client_id = int(clients.ids[index])
+            count, weakest = floors.get(client_id, (0, None))
+            if count >= TOP_N and scores["total"][index] <= weakest:
+                continue
+            inserted.add(client_id)
+            matches.append(self._match(client_id, property_id, scores, index, now))
+
+        self.db.bulk_save_objects(matches)
+        self._trim(client_id for client_id, (count, _) in floors.items() if client_id in inserted and count >= TOP_N)
+        self.db.commit()
+        self.refresh_clients(previous - inserted)
+
+    def clients_matching(self, property_id: int) -> Set[int]:
+        return {
+            client_id for (client_id,) in self.db.query(ClientPropertyMatch.client_id).filter(
+                ClientPropertyMatch.property_id == property_id
+            )
+        }
+
+    def get_matches(self, client_id: int, limit: int = TOP_N) -> List[Dict]:
+        rows = self.db.query(
+            ClientPropertyMatch.score, ClientPropertyMatch.budget_score, ClientPropertyMatch.location_score,
+            ClientPropertyMatch.type_score, ClientPropertyMatch.computed_at,
+            Property.id, Property.title, Property.address, Property.city, Property.price,
+            Property.property_type, Property.status, Property.bedrooms, Property.bathrooms, Property.square_feet
+        ).join(Property, Property.id == ClientPropertyMatch.property_id).filter(
+            ClientPropertyMatch.client_id == client_id
+        ).order_by(ClientPropertyMatch.score.desc(), Property.id).limit(limit).all()
+
+        return [
+            {
+                "property_id": row.id,
+                "title": row.title,
+                "address": row.address,
+                "city": row.city,
+                "price": row.price,
+                "property_type": row.property_type.value if row.property_type else None,
+                "status": row.status.value if row.status else None,
+                "bedrooms": row.bedrooms,
+                "bathrooms": row.bathrooms,
+                "square_feet": row.square_feet,
+                "score": round(row.score, 2),
+                "breakdown": {
+                    "budget": row.budget_score,
+                    "location": row.location_score,
+                    "type": row.type_score
+                },
+                "computed_at": row.computed_at
+            }
+            for row in rows
+        ]
+
+    def _store_top_matches(self, client_rows, properties: PropertyFeatures) -> int:
+        if not client_rows or not len(properties):
+            return 0
+
+        now = utc_now()
+        created = 0
+        chunk_size = max(1, CHUNK_CELLS // len(properties))
+        keep = min(TOP_N, len(properties))
+        for start in range(0, len(client_rows), chunk_size):
+            clients = ClientFeatures(client_rows[start:start + chunk_size], properties.city_codes)
+            scores = self.score(clients, properties)
+            total = scores["total"]
+
+            top = np.argpartition(-total, keep - 1, axis=1)[:, :keep]
+            matches = []
+            for row, columns in enumerate(top):
+                client_id = int(clients.ids[row])
+                for column in columns[np.argsort(-total[row, columns], kind="stable")]:
+                    if total[row, column] < MIN_MATCH_SCORE:
+                        break
+                    matches.append(self._match(
+                        client_id, int(properties.ids[column]),
+                        {name: values[row] for name, values in scores.items()}, column, now
+                    ))
+            self.db.bulk_save_objects(matches)
+            created += len(matches)
+        return created
+
+    def _match(self, client_id: int, property_id: int, scores: Dict[str, np.ndarray], index: int, computed_at) -> ClientPropertyMatch:
+        return ClientPropertyMatch(
+            client_id=client_id,
+            property_id=property_id,
+            score=round(float(scores["total"][index]), 4),
+            budget_score=round(float(scores["budget"][index]), 4),
+            location_score=round(float(scores["location"][index]), 4),
+            type_score=round(float(scores["type"][index]), 4),
+            computed_at=computed_at
+        )
+
+    def _score_floors(self, client_ids: List[int]) -> Dict[int, tuple]:
+        """(match count, weakest score) for each client that has matches"""
+        floors = {}
+        for start in range(0, len(client_ids), 1000):
+            rows = self.db.query(
+                ClientPropertyMatch.client_id,
+                func.count(ClientPropertyMatch.id),
+                func.min(ClientPropertyMatch.score)
+            ).filter(
+                ClientPropertyMatch.client_id.in_(client_ids[start:start + 1000])
+            ).group_by(ClientPropertyMatch.client_id).all()
+            floors.update({client_id: (count, weakest) for client_id, count, weakest in rows})
+        return floors
+
+    def _trim(self, client_ids: Iterable[int]) -> None:
+        """Drop matches beyond the top N for the given clients"""
+        client_ids = list(client_ids)
+        if not client_ids:
+            return
+        self.db.flush()
+        surplus = []
+        for start in range(0, len(client_ids), 1000):
+            rows = self.db.query(
+                ClientPropertyMatch.id, ClientPropertyMatch.client_id
+            ).filter(
+                ClientPropertyMatch.client_id.in_(client_ids[start:start + 1000])
+            ).order_by(
+                ClientPropertyMatch.client_id, ClientPropertyMatch.score.desc(), ClientPropertyMatch.property_id
+            ).all()
+            seen: Dict[int, int] = {}
+            for match_id, client_id in rows:
+                seen[client_id] = seen.get(client_id, 0) + 1
+                if seen[client_id] > TOP_N:
+                    surplus.append(match_id)
+        if surplus:
+            self.db.query(ClientPropertyMatch).filter(
+                ClientPropertyMatch.id.in_(surplus)
+            ).delete(synchronize_session=False)
+
+def run_property_match_job(property_id: int) -> None:
+    """Background task entry point; uses its own session since the request's is closed"""
+    db = SessionLocal()
+    try:
+        ClientMatchingService(db).refresh_property(property_id)
+    finally:
+        db.close()
+
+def run_client_match_job(client_ids: List[int]) -> None:
+    """Background task entry point; uses its own session since the request's is closed"""
+    db = SessionLocal()
+    try:
+        ClientMatchingService(db).refresh_clients(client_ids)
+    finally:
+        db.close()
@@ -0,0 +1,208 @@
+from typing import Any, Dict, List, Sequence, Tuple
+from sqlalchemy import Integer, any_, case, func, insert, literal, or_, select, update
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import Session, aliased
+from ..core.datetime_utils import utc_now
+from ..core.exceptions import ValidationException
+from ..models.audit import AuditLog
+from ..models.client import (
+    CampaignDelivery, Client, ClientDuplicate, ClientInteraction, ClientPropertyMatch, Lead,
+    LeadScoreHistory, LoyaltyTier, LoyaltyTransaction
+)
+from ..models.property import SavedSearch
+from ..models.realtor import Commission, Transaction
+from .client_analytics import client_analytics_cache
+from .client_matching import ClientMatchingService
+from .lead_scoring import LeadScoringService
+
+# Clusters per statement; bounds the size of the duplicate -> primary CASE
+MERGE_CHUNK_SIZE = 1000
+# Child tables whose client_id moves to the surviving client
+REASSIGNED_COLUMNS = (
+    ClientInteraction.client_id,
+    LoyaltyTransaction.client_id,
+    Lead.client_id,
+    Commission.client_id,
+    Transaction.client_id,
+    SavedSearch.client_id,
+    CampaignDelivery.client_id
+)
+# Derived per-client rows that are rebuilt for the primary rather than moved
+DROPPED_COLUMNS = (ClientPropertyMatch.client_id, LeadScoreHistory.client_id)
+
+class ClientMergeService:
+    """Merges duplicate clusters (one primary, N duplicates) with set-based statements.
+
+    Every child table is reassigned with one UPDATE per chunk of clusters,
+    balances are summed in SQL and the whole batch commits once, together
+    with its merge records and an audit log entry.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def _id_filter(self, column, ids: Sequence[int]):
+        if self.db.bind.dialect.name == "postgresql":
+            # One array parameter instead of one bind per id
+            return column == any_(literal(list(ids), ARRAY(Integer)))
+        return column.in_(ids)
+
+    def _validate(self, clusters: List[Dict[str, Any]]) -> Tuple[Dict[int, int], Dict[int, str]]:
+        """duplicate id -> primary id, and each client's email; every id may appear once across the batch"""
+        mapping: Dict[int, int] = {}
+        seen = set()
+        for cluster in clusters:
+            primary_id = cluster["primary_id"]
+            for client_id in [primary_id, *cluster["duplicate_ids"]]:
+                if client_id in seen:
+                    raise ValidationException(f"Client {client_id} appears more than once in the merge batch")
+                seen.add(client_id)
+            mapping.update({duplicate_id: primary_id for duplicate_id in cluster["duplicate_ids"]})
+        if not mapping:
+            raise ValidationException("No duplicates to merge")
+
+        emails: Dict[int, str] = {}
+        ids = list(seen)
+        for start in range(0, len(ids), MERGE_CHUNK_SIZE * 10):
+            emails.update(
+                self.db.query(Client.id, Client.email).filter(
+                    self._id_filter(Client.id, ids[start:start + MERGE_CHUNK_SIZE * 10])
+                ).all()
+            )
+        missing = seen - set(emails)
+        if missing:
+            raise ValidationException(f"Clients not found: {sorted(missing)[:20]}")
+        return mapping, emails
+
+    def merge_clusters(self, clusters: List[Dict[str, Any]], merged_by: int) -> Dict[str, Any]:
+        mapping, emails = self._validate(clusters)
+        primary_ids = sorted(set(mapping.values()))
+        duplicate_ids = sorted(mapping)
+        chunks = [duplicate_ids[start:start + MERGE_CHUNK_SIZE] for start in range(0, len(duplicate_ids), MERGE_CHUNK_SIZE)]
+        reassigned: Dict[str, int] = {}
+
+        try:
+            now = utc_now()
+            self.db.query(ClientDuplicate).filter(
+                ClientDuplicate.status != "merged",
+                or_(*(
+                    or_(self._id_filter(ClientDuplicate.primary_client_id, chunk),
+                        self._id_filter(ClientDuplicate.duplicate_client_id, chunk))
+                    for chunk in chunks
+                ))
+            ).delete(synchronize_session=False)
+            self.db.execute(insert(ClientDuplicate), [
+                {
+                    "primary_client_id": primary_id,
+                    "duplicate_client_id": duplicate_id,
+                    "similarity_score": 100,
+                    # The duplicate's id is cleared when it is deleted; keep who it was
+                    "match_criteria": {"merged": True, "duplicate_client_id": duplicate_id, "email": emails[duplicate_id]},
+                    "status": "merged",
+                    "merged_by": merged_by,
+                    "resolved_at": now
+                }
+                for duplicate_id, primary_id in mapping.items()
+            ])
+
+            for chunk in chunks:
+                chunk_mapping = {duplicate_id: mapping[duplicate_id] for duplicate_id in chunk}
+                for column in REASSIGNED_COLUMNS:
+                    result = self.db.execute(
+                        update(column.class_)
+                        .where(self._id_filter(column, chunk))
+                        .values({column.key: case(chunk_mapping, value=column)}),
+                        execution_options={"synchronize_session": False}
+                    )
+                    reassigned[column.class_.__tablename__] = reassigned.get(column.class_.__tablename__, 0) + result.rowcount
+                # Earlier merges into a duplicate now point at its new primary
+                self.db.execute(
+                    update(ClientDuplicate)
+                    .where(ClientDuplicate.status == "merged", self._id_filter(ClientDuplicate.primary_client_id, chunk))
+                    .values(primary_client_id=case(chunk_mapping, value=ClientDuplicate.primary_client_id)),
+                    execution_options={"synchronize_session": False}
+                )
+                for column in DROPPED_COLUMNS:
+                    self.db.query(column.class_).filter(self._id_filter(column, chunk)).delete(synchronize_session=False)
+                self._merge_balances(chunk_mapping)
+
+            self._update_tiers(primary_ids)
+
+            for chunk in chunks:
+                # What ondelete="SET NULL" does, done explicitly so the delete never trips the FK
+                self.db.execute(
+                    update(ClientDuplicate)
+                    .where(self._id_filter(ClientDuplicate.duplicate_client_id, chunk))
+                    .values(duplicate_client_id=None),
+                    execution_options={"synchronize_session": False}
+                )
+                self.db.query(Client).filter(self._id_filter(Client.id, chunk)).delete(synchronize_session=False)
+
+            summary = {
+                "clusters": len(clusters),
+                "primaries": len(primary_ids),
+                "duplicates_merged": len(duplicate_ids),
+                "rows_reassigned": reassigned
+            }
+            self.db.add(AuditLog(
+                user_id=merged_by,
+                action="bulk_merge",
+                resource="client",
+                old_values={"clusters": [
+                    {"primary_id": cluster["primary_id"], "duplicate_ids": list(cluster["duplicate_ids"])}
+                    for cluster in clusters
+                ]},
+                new_values=summary
+            ))
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        self.db.expire_all()
+        client_analytics_cache.invalidate()
+
+        # Derived data for the survivors; each of these commits on its own
+        LeadScoringService(self.db).score_clients(primary_ids)
+        ClientMatchingService(self.db).refresh_clients(primary_ids)
+        return summary
+
+    def _merge_balances(self, chunk_mapping: Dict[int, int]) -> None:
+        """Add a chunk of duplicates' loyalty points and spend onto their primaries"""
+        duplicate = aliased(Client)
+        duplicate_ids = list(chunk_mapping)
+
+        def merged_from(column):
+            return select(func.coalesce(func.sum(column), 0)).where(
+                self._id_filter(duplicate.id, duplicate_ids),
+                case(chunk_mapping, value=duplicate.id) == Client.id
+            ).scalar_subquery()
+
+        self.db.execute(
+            update(Client)
+            .where(self._id_filter(Client.id, sorted(set(chunk_mapping.values()))))
+            .values(
+                loyalty_points=func.coalesce(Client.loyalty_points, 0) + merged_from(duplicate.loyalty_points),
+                total_spent=func.coalesce(Client.total_spent, 0) + merged_from(duplicate.total_spent)
+            ),
+            execution_options={"synchronize_session": False}
+        )
+
+    def _update_tiers(self, primary_ids: List[int]) -> None:
+        """Re-tier the primaries from their merged loyalty points"""
+        def tier(value: LoyaltyTier):
+            return literal(value, Client.loyalty_tier.type)
+
+        for start in range(0, len(primary_ids), MERGE_CHUNK_SIZE):
+            chunk = primary_ids[start:start + MERGE_CHUNK_SIZE]
+            # Same thresholds as LoyaltyService._update_loyalty_tier
+            self.db.execute(
+                update(Client)
+                .where(self._id_filter(Client.id, chunk))
+                .values(loyalty_tier=case(
+                    (Client.loyalty_points >= 10000, tier(LoyaltyTier.PLATINUM)),
+                    (Client.loyalty_points >= 5000, tier(LoyaltyTier.GOLD)),
+                    (Client.loyalty_points >= 2000, tier(LoyaltyTier.SILVER)),
+                    else_=tier(LoyaltyTier.BRONZE)
+                )),
+                execution_options={"synchronize_session": False}
+            )
@@ -0,0 +1,149 @@
+import base64
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from sqlalchemy import literal, select, tuple_, union_all
+from sqlalchemy.orm import Session
+from ..core.exceptions import ValidationException
+from ..models.client import ClientInteraction, Lead, LoyaltyTransaction
+from ..models.realtor import Transaction, TransactionDocument
+
+DEFAULT_TIMELINE_LIMIT = 50
+
+def _enum_value(value):
+    return value.value if value is not None and hasattr(value, "value") else value
+
+def encode_cursor(occurred_at: datetime, kind: str, event_id: int) -> str:
+    raw = f"{occurred_at.isoformat()}|{kind}|{event_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str, int]:
+    try:
+        occurred_at, kind, event_id = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8").split("|")
+        return datetime.fromisoformat(occurred_at), kind, int(event_id)
+    except (ValueError, UnicodeError):
+        raise ValidationException("Invalid timeline cursor")
+
+class ClientTimelineService:
+    """Everything that happened to a client, newest first, one keyset page at a time.
+
+    A page is picked by a single UNION ALL over the (kind, id, created_at) of
+    every event source, each branch served by a (client_id, created_at) index
+    and pre-limited to the page size; only the rows on the page are then loaded.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def _event_keys(self, kind: str, id_column, created_column):
+        return select(literal(kind).label("kind"), id_column.label("id"), created_column.label("occurred_at"))
+
+    def _sources(self, client_id: int) -> Dict[str, Tuple[Any, Any, Any]]:
+        """kind -> (id column, created_at column, key select restricted to the client)"""
+        sources = {}
+        for kind, model in (
+            ("interaction", ClientInteraction),
+            ("lead", Lead),
+            ("loyalty", LoyaltyTransaction),
+            ("transaction", Transaction)
+        ):
+            sources[kind] = (
+                model.id, model.created_at,
+                self._event_keys(kind, model.id, model.created_at).where(model.client_id == client_id)
+            )
+        sources["document"] = (
+            TransactionDocument.id,
+            TransactionDocument.created_at,
+            self._event_keys("document", TransactionDocument.id, TransactionDocument.created_at).join(
+                Transaction, Transaction.id == TransactionDocument.transaction_id
+            ).where(Transaction.client_id == client_id)
+        )
+        return sources
+
+    def get_timeline(self, client_id: int, limit: int = DEFAULT_TIMELINE_LIMIT,
+                     cursor: Optional[str] = None) -> Dict[str, Any]:
+        before = decode_cursor(cursor) if cursor else None
+
+        branches = []
+        for kind, (id_column, created_column, base) in self._sources(client_id).items():
+            query = base.where(created_column.isnot(None))
+            if before:
+                # Rows sort by (occurred_at, kind, id) descending; kind is constant per
+                # branch, so the keyset condition reduces to a plain index range
+                occurred_at, last_kind, last_id = before
+                if kind < last_kind:
+                    query = query.where(created_column <= occurred_at)
+                elif kind == last_kind:
+                    query = query.where(tuple_(created_column, id_column) < tuple_(occurred_at, last_id))
+                else:
+                    query = query.where(created_column < occurred_at)
+            branches.append(
+                query.order_by(created_column.desc(), id_column.desc()).limit(limit + 1).subquery().select()
+            )
+
+        events = union_all(*branches).subquery()
+        keys = self.db.execute(
+            select(events.c.kind, events.c.id, events.c.occurred_at)
+            .order_by(events.c.occurred_at.desc(), events.c.kind.desc(), events.c.id.desc())
+            .limit(limit + 1)
+        ).all()
+
+        has_more = len(keys) > limit
+        keys = keys[:limit]
+        details = self._load_details(keys)
+        items = [details[(key.kind, key.id)] for key in keys if (key.kind, key.id) in details]
+        last = keys[-1] if keys else None
+        return {
+            "items": items,
+            "next_cursor": encode_cursor(last.occurred_at, last.kind, last.id) if has_more else None
+        }
+
+    def _load_details(self, keys) -> Dict[Tuple[str, int], Dict[str, Any]]:
+        ids_by_kind: Dict[str, List[int]] = {}
+        for key in keys:
+            ids_by_kind.setdefault(key.kind, []).append(key.id)
+
+        loaders: Dict[str, Tuple[Any, Callable[[Any], Dict[str, Any]]]] = {
+            "interaction": (ClientInteraction, lambda row: {
+                "title": row.subject,
+                "summary": row.content,
+                "subtype": _enum_value(row.type),
+                "agent_id": row.agent_id,
+                "completed_at": row.completed_at,
+                "outcome": row.outcome
+            }),
+            "lead": (Lead, lambda row: {
+                "title": row.lead_id,
+                "summary": row.notes,
+                "subtype": _enum_value(row.status),
+                "temperature": _enum_value(row.temperature),
+                "estimated_value": row.estimated_value
+            }),
+            "loyalty": (LoyaltyTransaction, lambda row: {
+                "title": row.description,
+                "summary": None,
+                "subtype": row.type,
+                "points": row.points
+            }),
+            "transaction": (Transaction, lambda row: {
+                "title": row.transaction_id,
+                "summary": row.notes,
+                "subtype": row.type,
+                "status": _enum_value(row.status),
+                "property_id": row.property_id,
+                "sale_price": row.sale_price
+            }),
+            "document": (TransactionDocument, lambda row: {
+                "title": row.document_name,
+                "summary": None,
+                "subtype": row.document_type,
+                "status": row.status,
+                "transaction_id": row.transaction_id
+            })
+        }
+
+        details = {}
+        for kind, ids in ids_by_kind.items():
+            model, describe = loaders[kind]
+            for row in self.db.query(model).filter(model.id.in_(ids)):
+                details[(kind, row.id)] = {"type": kind, "id": row.id, "occurred_at": row.created_at, **describe(row)}
+        return details
@@ -0,0 +1,196 @@
+import threading
+import time
+from typing import Any, Dict, Optional
+import numpy as np
+from sqlalchemy.orm import Session
+from ..core.geo_utils import EARTH_RADIUS_KM
+from ..models.property import Property, PropertyStatus
+
+FEATURES = ("price", "square_feet", "bedrooms", "bathrooms", "year_built", "latitude", "longitude")
+PRICE, SQFT, BEDS, BATHS, YEAR, LAT, LNG = range(len(FEATURES))
+
+# Relative importance of each similarity term
+SIMILARITY_WEIGHTS = {
+    "price": 1.0,
+    "square_feet": 2.0,
+    "bedrooms": 1.5,
+    "bathrooms": 1.0,
+    "year_built": 0.5,
+    "distance": 2.0
+}
+# Scale at which a difference counts as "one unit" of dissimilarity
+BEDROOM_SCALE = 1.0
+BATHROOM_SCALE = 1.0
+YEAR_SCALE = 10.0
+DISTANCE_SCALE_KM = 5.0
+MISSING_PENALTY = 1.0
+
+# Price adjustments applied to a comparable to bring it in line with the subject
+SQFT_ADJUSTMENT_FACTOR = 0.5    # share of the comparable's price/sqft per sqft difference
+BEDROOM_ADJUSTMENT_RATE = 0.03  # of comparable price per bedroom
+BATHROOM_ADJUSTMENT_RATE = 0.02
+YEAR_ADJUSTMENT_RATE = 0.003    # per year newer/older
+
+# Other workers' writes never invalidate this process's matrices; bound how stale they get
+CITY_MATRIX_MAX_AGE_SECONDS = 300
+
+class CityFeatureMatrix:
+    """Feature columns for every property in one city, as NumPy arrays"""
+
+    def __init__(self, rows, built_at: float):
+        self.built_at = built_at
+        self.ids = np.array([row.id for row in rows], dtype=np.int64)
+        self.property_types = np.array([row.property_type.value for row in rows], dtype=object)
+        self.statuses = np.array([row.status.value if row.status else "" for row in rows], dtype=object)
+        self.features = np.array(
+            [[np.nan if getattr(row, name) is None else float(getattr(row, name)) for name in FEATURES] for row in rows],
+            dtype=np.float64
+        ).reshape(len(rows), len(FEATURES))
+        self.addresses = [row.address for row in rows]
+        self.id_set = set(self.ids.tolist())
+
+class CMAEngine:
+    """Ranks comparables with a weighted distance computed over the whole city at once.
+
+    Per-city matrices are cached for CITY_MATRIX_MAX_AGE_SECONDS and dropped
+    sooner when a property in that city is written in this process.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cache: Dict[str, CityFeatureMatrix] = {}
+        # Bumped by every invalidation; a matrix whose query started before the bump is not cached
+        self._generation = 0
+
+    def invalidate(self, property_id: int, city: Optional[str] = None) -> None:
+        with self._lock:
+            self._generation += 1
+            for key in [key for key, matrix in self._cache.items() if key == city or property_id in matrix.id_set]:
+                del self._cache[key]
+
+    def invalidate_all(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._cache.clear()
+
+    def get_city_matrix(self, db: Session, city: str) -> CityFeatureMatrix:
+        with self._lock:
+            matrix = self._cache.get(city)
+            generation = self._generation
+        if matrix is not None and time.monotonic() - matrix.built_at <= CITY_MATRIX_MAX_AGE_SECONDS:
+            return matrix
+
+        built_at = time.monotonic()
+        rows = db.query(
+            Property.id, Property.property_type, Property.status, Property.address,
+            *[getattr(Property, name) for name in FEATURES]
+        ).filter(Property.city == city).all()
+        matrix = CityFeatureMatrix(rows, built_at)
+        with self._lock:
+            # A write that landed while the query ran may be missing from it; serve it but don't keep it
+            if self._generation == generation:
+                self._cache[city] = matrix
+        return matrix
+
+    def find_comparables(self, db: Session, subject: Property, k: int = 5) -> Dict[str, Any]:
+        matrix = self.get_city_matrix(db, subject.city)
+        candidates = (
+            (matrix.ids != subject.id)
+            & (matrix.property_types == subject.property_type.value)
+            & (matrix.statuses != PropertyStatus.WITHDRAWN.value)
+            & ~np.isnan(matrix.features[:, PRICE])
+        )
+        index = np.nonzero(candidates)[0]
+        if index.size == 0:
+            return {"comparables": [], "estimated_value": None, "confidence": 0.0}
+
+        features = matrix.features[index]
+        target = np.array(
+            [np.nan if getattr(subject, name) is None else float(getattr(subject, name)) for name in FEATURES],
+            dtype=np.float64
+        )
+        distance = self._weighted_distance(features, target)
+        similarity = 1.0 / (1.0 + distance)
+
+        top = np.argsort(distance, kind="stable")[:k]
+        adjusted = self._adjusted_prices(features[top], target)
+        top_similarity = similarity[top]
+
+        estimated_value = float(np.average(adjusted, weights=top_similarity))
+        spread = float(np.std(adjusted) / estimated_value) if estimated_value else 1.0
+        confidence = float(np.clip(top_similarity.mean() * (1.0 - min(spread, 1.0)) * min(1.0, top.size / k), 0.0, 1.0))
+
+        comparables = []
+        for position, row in enumerate(index[top]):
+            values = matrix.features[row]
+            comparables.append({
+                "property_id": int(matrix.ids[row]),
+                "address": matrix.addresses[row],
+                "price": float(values[PRICE]),
+                "bedrooms": None if np.isnan(values[BEDS]) else int(values[BEDS]),
+                "bathrooms": None if np.isnan(values[BATHS]) else int(values[BATHS]),
+                "square_feet": None if np.isnan(values[SQFT]) else float(values[SQFT]),
+                "status": matrix.statuses[row],
+                "similarity": round(float(top_similarity[position]), 4),
+                "adjusted_price": round(float(adjusted[position]), 2)
+            })
+
+        return {
+            "comparables": comparables,
+            "estimated_value": round(estimated_value, 2),
+            "confidence": round(confidence, 3)
+        }
+
+    def _weighted_distance(self, features: np.ndarray, target: np.ndarray) -> np.ndarray:
+        terms: Dict[str, np.ndarray] = {}
+
+        if not np.isnan(target[PRICE]) and target[PRICE] > 0:
+            terms["price"] = np.abs(np.log(np.maximum(features[:, PRICE], 1.0) / target[PRICE]))
+        if not np.isnan(target[SQFT]) and target[SQFT] > 0:
+            terms["square_feet"] = np.abs(features[:, SQFT] - target[SQFT]) / target[SQFT]
+        if not np.isnan(target[BEDS]):
+            terms["bedrooms"] = np.abs(features[:, BEDS] - target[BEDS]) / BEDROOM_SCALE
+        if not np.isnan(target[BATHS]):
+            terms["bathrooms"] = np.abs(features[:, BATHS] - target[BATHS]) / BATHROOM_SCALE
+        if not np.isnan(target[YEAR]):
+            terms["year_built"] = np.abs(features[:, YEAR] - target[YEAR]) / YEAR_SCALE
+        if not np.isnan(target[LAT]) and not np.isnan(target[LNG]):
+            terms["distance"] = self._haversine_km(features[:, LAT], features[:, LNG], target[LAT], target[LNG]) / DISTANCE_SCALE_KM
+
+        if not terms:
+            return np.zeros(features.shape[0])
+
+        total = np.zeros(features.shape[0])
+        weight_sum = 0.0
+        for name, values in terms.items():
+            weight = SIMILARITY_WEIGHTS[name]
+            total += weight * np.square(np.nan_to_num(values, nan=MISSING_PENALTY))
+            weight_sum += weight
+        return np.sqrt(total / weight_sum)
+
+    def _adjusted_prices(self, features: np.ndarray, target: np.ndarray) -> np.ndarray:
+        prices = features[:, PRICE]
+        adjustment = np.zeros_like(prices)
+
+        if not np.isnan(target[SQFT]):
+            price_per_sqft = np.where(features[:, SQFT] > 0, prices / np.where(features[:, SQFT] > 0, features[:, SQFT], 1.0), 0.0)
+            adjustment += np.nan_to_num(SQFT_ADJUSTMENT_FACTOR * price_per_sqft * (target[SQFT] - features[:, SQFT]))
+        if not np.isnan(target[BEDS]):
+            adjustment += np.nan_to_num(BEDROOM_ADJUSTMENT_RATE * prices * (target[BEDS] - features[:, BEDS]))
+        if not np.isnan(target[BATHS]):
+            adjustment += np.nan_to_num(BATHROOM_ADJUSTMENT_RATE * prices * (target[BATHS] - features[:, BATHS]))
+        if not np.isnan(target[YEAR]):
+            adjustment += np.nan_to_num(YEAR_ADJUSTMENT_RATE * prices * (target[YEAR] - features[:, YEAR]))
+
+        return prices + adjustment
+
+    @staticmethod
+    def _haversine_km(lats: np.ndarray, lngs: np.ndarray, lat: float, lng: float) -> np.ndarray:
+        phi1 = np.radians(lat)
+        phi2 = np.radians(lats)
+        d_phi = phi2 - phi1
+        d_lambda = np.radians(lngs - lng)
+        a = np.sin(d_phi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(d_lambda / 2) ** 2
+        return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+cma_engine = CMAEngine()
@@ -3,9 +3,9 @@ import uuid
 import shutil
 from typing import List, Optional
 from fastapi import UploadFile, HTTPException, status
-from PIL import Image
 import aiofiles
 from pathlib import Path
+from .image_pipeline import optimize_image, run_in_pool
 
 class FileUploadService:
     def __init__(self):
@@ -83,17 +83,8 @@ class FileUploadService:
     async def _process_image(self, file_path: Path):
         """Process and optimize images"""
         try:
-            with Image.open(file_path) as img:
-                # Create thumbnail
-                thumbnail_path = file_path.parent / f"thumb_{file_path.name}"
-                img.thumbnail((300, 300), Image.Resampling.LANCZOS)
-                img.save(thumbnail_path, optimize=True, quality=85)
-                
-                # Optimize original
-                if img.mode in ('RGBA', 'LA', 'P'):
-                    img = img.convert('RGB')
-                img.save(file_path, optimize=True, quality=90)
-                
+            # PIL resizing is CPU bound, so keep it off the event loop
+            await run_in_pool(optimize_image, str(file_path))
         except Exception as e:
             print(f"Image processing failed: {e}")
     
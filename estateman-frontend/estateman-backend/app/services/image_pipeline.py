@@ -0,0 +1,72 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Optional
+from PIL import Image, ImageOps
+
+# Longest-edge bounding boxes for each responsive variant
+IMAGE_VARIANTS = {
+    "thumb": (320, 240),
+    "card": (800, 600),
+    "full": (1920, 1440)
+}
+VARIANT_FORMATS = {
+    "webp": {"format": "WEBP", "quality": 80, "method": 4},
+    "jpg": {"format": "JPEG", "quality": 85, "optimize": True, "progressive": True}
+}
+MAX_WORKERS = min(4, os.cpu_count() or 1)
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+def get_executor() -> ProcessPoolExecutor:
+    """Shared process pool so CPU-bound resizing never runs on the event loop"""
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=MAX_WORKERS)
+    return _executor
+
+def render_variants(source_path: str, output_dir: str, base_name: str) -> Dict[str, Any]:
+    """Generate every variant for one image. Runs inside a worker process.
+
+    Orientation from EXIF is applied to the pixels, then all metadata is
+    dropped by saving fresh images without exif/icc data.
+    """
+    with Image.open(source_path) as original:
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if image.mode in ("LA", "P", "PA") else "RGB")
+        width, height = image.size
+
+        variants = {}
+        for variant, size in IMAGE_VARIANTS.items():
+            resized = image.copy()
+            resized.thumbnail(size, Image.Resampling.LANCZOS)
+            files = {}
+            for extension, options in VARIANT_FORMATS.items():
+                output = resized.convert("RGB") if options["format"] == "JPEG" and resized.mode != "RGB" else resized
+                filename = f"{base_name}_{variant}.{extension}"
+                output.save(os.path.join(output_dir, filename), **options)
+                files[extension] = filename
+            variants[variant] = {"width": resized.width, "height": resized.height, "files": files}
+
+    return {"width": width, "height": height, "variants": variants}
+
+def optimize_image(file_path: str) -> None:
+    """Write a 300px thumbnail next to the file and re-save the original optimized"""
+    with Image.open(file_path) as img:
+        thumbnail = img.copy()
+        thumbnail.thumbnail((300, 300), Image.Resampling.LANCZOS)
+        directory, name = os.path.split(file_path)
+        thumbnail.save(os.path.join(directory, f"thumb_{name}"), optimize=True, quality=85)
+
+        if img.mode in ('RGBA', 'LA', 'P'):
+            img = img.convert('RGB')
+        img.save(file_path, optimize=True, quality=90)
+
+async def run_in_pool(func, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), func, *args)
+
+async def generate_variants(source_path: str, output_dir: str, base_name: str) -> Dict[str, Any]:
+    """Render variants for one image in the process pool"""
+    return await run_in_pool(render_variants, source_path, output_dir, base_name)
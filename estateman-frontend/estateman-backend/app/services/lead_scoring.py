@@ -0,0 +1,127 @@
+from datetime import timedelta
+from typing import Any, Dict, Iterable, List, Optional
+from sqlalchemy import and_, case, func, insert, literal, or_, select, update
+from sqlalchemy.orm import Session
+from ..core.datetime_utils import utc_now
+from ..models.client import Client, ClientInteraction, LeadScoreHistory
+from .client_analytics import client_analytics_cache
+
+RECENT_INTERACTION_DAYS = 30
+POINTS_PER_INTERACTION = 5
+MAX_INTERACTION_POINTS = 30
+SOURCE_SCORES = {
+    "referral": 20, "website": 15, "social_media": 10,
+    "google_ads": 12, "walk_in": 8, "cold_call": 5
+}
+# (minimum budget_max, points), highest first
+BUDGET_TIERS = ((1000000, 30), (500000, 20), (250000, 10))
+BUDGET_FLOOR_POINTS = 5
+HIGH_ENGAGEMENT_SCORE = 80
+MEDIUM_ENGAGEMENT_SCORE = 50
+BATCH_SIZE = 50000
+
+# SQL equivalents of the Python truthiness checks the scoring rules were written with
+def _has_text(column):
+    return and_(column.isnot(None), column != "")
+
+def _has_amount(column):
+    return and_(column.isnot(None), column != 0)
+
+class LeadScoringService:
+    """Computes lead scores in SQL, for one client or the whole table in id-range batches.
+
+    Each pass is a single UPDATE ... RETURNING over the batch that only touches
+    clients whose score changed; every change is appended to lead_score_history.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def _score_expressions(self):
+        cutoff = utc_now() - timedelta(days=RECENT_INTERACTION_DAYS)
+        recent_interactions = select(func.count(ClientInteraction.id)).where(
+            ClientInteraction.client_id == Client.id,
+            ClientInteraction.created_at >= cutoff
+        ).scalar_subquery()
+
+        # Basic information completeness (0-20), engagement (0-30), source (0-20), budget (0-30)
+        raw_score = (
+            case((_has_text(Client.phone), 5), else_=0)
+            + case((and_(_has_amount(Client.budget_min), _has_amount(Client.budget_max)), 10), else_=0)
+            + case((_has_text(Client.preferred_location), 5), else_=0)
+            + case(
+                (recent_interactions * POINTS_PER_INTERACTION >= MAX_INTERACTION_POINTS, MAX_INTERACTION_POINTS),
+                else_=recent_interactions * POINTS_PER_INTERACTION
+            )
+            + case(
+                *[(Client.lead_source == source, points) for source, points in SOURCE_SCORES.items()],
+                else_=0
+            )
+            + case(
+                *[(Client.budget_max >= minimum, points) for minimum, points in BUDGET_TIERS],
+                (_has_amount(Client.budget_max), BUDGET_FLOOR_POINTS),
+                else_=0
+            )
+        )
+        score = case((raw_score >= 100, literal(100)), else_=raw_score)
+        engagement_level = case(
+            (raw_score >= HIGH_ENGAGEMENT_SCORE, "high"),
+            (raw_score >= MEDIUM_ENGAGEMENT_SCORE, "medium"),
+            else_="low"
+        )
+        return score, engagement_level
+
+    def score_clients(self, client_ids: Optional[Iterable[int]] = None) -> int:
+        """Rescore the given clients, or every client when None. Returns how many changed."""
+        if client_ids is not None:
+            client_ids = list(set(client_ids))
+            if not client_ids:
+                return 0
+            changed = self._score_where(Client.id.in_(client_ids))
+            self.db.commit()
+            if changed:
+                client_analytics_cache.invalidate()
+            return changed
+
+        changed = 0
+        last_id = 0
+        max_id = self.db.query(func.max(Client.id)).scalar() or 0
+        # Bounded id ranges keep each UPDATE's row locks and RETURNING set small
+        while last_id < max_id:
+            changed += self._score_where(and_(Client.id > last_id, Client.id <= last_id + BATCH_SIZE))
+            self.db.commit()
+            last_id += BATCH_SIZE
+        if changed:
+            client_analytics_cache.invalidate()
+        return changed
+
+    def _score_where(self, condition) -> int:
+        score, engagement_level = self._score_expressions()
+        rows = self.db.execute(
+            update(Client)
+            .where(
+                condition,
+                or_(Client.lead_score.is_distinct_from(score), Client.engagement_level.is_distinct_from(engagement_level))
+            )
+            .values(lead_score=score, engagement_level=engagement_level)
+            .returning(Client.id, Client.lead_score, Client.engagement_level),
+            execution_options={"synchronize_session": False}
+        ).all()
+        if rows:
+            self.db.execute(insert(LeadScoreHistory), [
+                {"client_id": row.id, "score": row.lead_score, "engagement_level": row.engagement_level}
+                for row in rows
+            ])
+        return len(rows)
+
+    def get_score_history(self, client_id: int, days: int = 90) -> List[Dict[str, Any]]:
+        rows = self.db.query(
+            LeadScoreHistory.score, LeadScoreHistory.engagement_level, LeadScoreHistory.computed_at
+        ).filter(
+            LeadScoreHistory.client_id == client_id,
+            LeadScoreHistory.computed_at >= utc_now() - timedelta(days=days)
+        ).order_by(LeadScoreHistory.computed_at).all()
+        return [
+            {"score": row.score, "engagement_level": row.engagement_level, "computed_at": row.computed_at}
+            for row in rows
+        ]
@@ -0,0 +1,144 @@
+from collections import defaultdict
+from datetime import date, datetime
+from statistics import median
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import func, insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from ..core.datetime_utils import ensure_timezone_aware, utc_now
+from ..models.property import MarketStat, Property, PropertyStatus, PropertyType
+
+# Month-over-month change in median price that counts as a trend
+TREND_THRESHOLD = 0.02
+CLOSED_STATUSES = (PropertyStatus.SOLD, PropertyStatus.WITHDRAWN)
+
+MarketCell = Tuple[str, PropertyType, date]
+CELL_KEYS = ("city", "property_type", "month")
+
+def month_start(value: datetime) -> date:
+    return date(value.year, value.month, 1)
+
+def next_month(value: date) -> date:
+    return date(value.year + value.month // 12, value.month % 12 + 1, 1)
+
+class MarketStatsService:
+    """Maintains the market_stats rollup (city x property type x listing month)"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def _rows(self):
+        return self.db.query(
+            Property.city, Property.property_type, Property.status, Property.price,
+            Property.square_feet, Property.created_at, Property.updated_at
+        )
+
+    def rebuild(self) -> int:
+        """Recompute every cell in one streaming pass. Meant to run on a schedule."""
+        accumulators: Dict[MarketCell, List] = defaultdict(list)
+        for row in self._rows().filter(Property.created_at.isnot(None)).yield_per(5000):
+            accumulators[(row.city, row.property_type, month_start(row.created_at))].append(row)
+
+        self.db.query(MarketStat).delete(synchronize_session=False)
+        stats = [self._build_stat(cell, rows) for cell, rows in accumulators.items()]
+        if stats:
+            self.db.execute(insert(MarketStat), stats)
+        self.db.commit()
+        return len(accumulators)
+
+    def refresh_cells(self, cells: Iterable[MarketCell]) -> None:
+        """Recompute just the given cells, e.g. after a property write.
+
+        Cells are upserted, so concurrent writes to the same cell never both
+        insert it; the last one to commit wins with the rows it saw.
+        """
+        for city, property_type, month in set(cells):
+            rows = self._rows().filter(
+                Property.city == city,
+                Property.property_type == property_type,
+                Property.created_at >= month,
+                Property.created_at < next_month(month)
+            ).all()
+
+            cell_filter = (
+                MarketStat.city == city,
+                MarketStat.property_type == property_type,
+                MarketStat.month == month
+            )
+            if not rows:
+                self.db.query(MarketStat).filter(*cell_filter).delete(synchronize_session=False)
+            elif self.db.bind.dialect.name == "postgresql":
+                stat = self._build_stat((city, property_type, month), rows)
+                self.db.execute(
+                    pg_insert(MarketStat).values(stat).on_conflict_do_update(
+                        constraint="uq_market_stats_city_type_month",
+                        set_={**{key: stat[key] for key in stat if key not in CELL_KEYS}, "updated_at": func.now()}
+                    )
+                )
+            else:
+                self.db.query(MarketStat).filter(*cell_filter).delete(synchronize_session=False)
+                self.db.execute(insert(MarketStat), [self._build_stat((city, property_type, month), rows)])
+        self.db.commit()
+
+    def cell_for(self, city: Optional[str], property_type: Any, created_at: Optional[datetime]) -> Optional[MarketCell]:
+        if not city or property_type is None or created_at is None:
+            return None
+        return city, PropertyType(property_type), month_start(created_at)
+
+    def get_area_stats(self, city: str, property_type: PropertyType, months: int = 13) -> List[MarketStat]:
+        """Latest monthly rows for an area, newest first"""
+        return self.db.query(MarketStat).filter(
+            MarketStat.city == city,
+            MarketStat.property_type == property_type
+        ).order_by(MarketStat.month.desc()).limit(months).all()
+
+    def get_area_totals(self, city: str, property_type: PropertyType) -> Dict[str, float]:
+        totals = self.db.query(
+            func.coalesce(func.sum(MarketStat.listing_count), 0),
+            func.coalesce(func.sum(MarketStat.total_price), 0.0),
+            func.coalesce(func.sum(MarketStat.total_days_on_market), 0.0)
+        ).filter(
+            MarketStat.city == city,
+            MarketStat.property_type == property_type
+        ).one()
+        return {"count": totals[0], "total_price": totals[1], "total_days_on_market": totals[2]}
+
+    def _build_stat(self, cell: MarketCell, rows: List) -> Dict[str, Any]:
+        city, property_type, month = cell
+        now = utc_now()
+        prices = [row.price for row in rows if row.price is not None]
+        price_per_sqft = [row.price / row.square_feet for row in rows if row.price is not None and row.square_feet]
+        days_on_market = []
+        for row in rows:
+            # Closed listings stop the clock at their last update; open ones are still on market
+            end = row.updated_at if row.status in CLOSED_STATUSES and row.updated_at else now
+            days_on_market.append(max((ensure_timezone_aware(end) - ensure_timezone_aware(row.created_at)).days, 0))
+
+        return {
+            "city": city,
+            "property_type": property_type,
+            "month": month,
+            "listing_count": len(rows),
+            "sold_count": sum(1 for row in rows if row.status == PropertyStatus.SOLD),
+            "total_price": float(sum(prices)),
+            "mean_price": sum(prices) / len(prices) if prices else None,
+            "median_price": median(prices) if prices else None,
+            "mean_price_per_sqft": sum(price_per_sqft) / len(price_per_sqft) if price_per_sqft else None,
+            "median_price_per_sqft": median(price_per_sqft) if price_per_sqft else None,
+            "total_days_on_market": float(sum(days_on_market)),
+            "mean_days_on_market": sum(days_on_market) / len(days_on_market) if days_on_market else None
+        }
+
+    def price_trend(self, stats: List[MarketStat]) -> Dict[str, Any]:
+        """Month-over-month median price change from the two most recent months"""
+        if (len(stats) < 2 or next_month(stats[1].month) != stats[0].month
+                or not stats[0].median_price or not stats[1].median_price):
+            return {"direction": "insufficient_data", "month_over_month_change": None}
+        change = (stats[0].median_price - stats[1].median_price) / stats[1].median_price
+        if change > TREND_THRESHOLD:
+            direction = "rising"
+        elif change < -TREND_THRESHOLD:
+            direction = "falling"
+        else:
+            direction = "stable"
+        return {"direction": direction, "month_over_month_change": round(change * 100, 2)}
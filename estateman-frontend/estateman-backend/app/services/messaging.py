@@ -0,0 +1,145 @@
+import asyncio
+import uuid
+from dataclasses import dataclass
+from typing import List, Optional, Set
+import requests
+from sqlalchemy.orm import Session
+from ..core.config import settings
+from ..core.exceptions import ValidationException
+from ..models.client import CommunicationType
+from ..models.integration import IntegrationType
+from .integration import IntegrationService
+
+PROVIDER_TIMEOUT_SECONDS = 15
+EMAIL_CHANNELS = (CommunicationType.EMAIL,)
+PHONE_CHANNELS = (CommunicationType.SMS, CommunicationType.WHATSAPP)
+
+@dataclass
+class OutboundMessage:
+    recipient: str
+    subject: Optional[str]
+    body: str
+
+@dataclass
+class SendResult:
+    success: bool
+    message_id: Optional[str] = None
+    error: Optional[str] = None
+
+class MessageProvider:
+    """Adapter over one delivery service.
+
+    `send` must not raise for per-message failures; it returns a failed
+    SendResult instead so one bad address never aborts a campaign.
+    """
+    name = "base"
+    # Requests per second the service allows for this account
+    rate_limit = 10.0
+
+    async def send(self, message: OutboundMessage) -> SendResult:
+        raise NotImplementedError
+
+class FakeMessageProvider(MessageProvider):
+    """Local provider that records messages in memory instead of sending them"""
+    name = "fake"
+    rate_limit = 1000.0
+
+    def __init__(self, latency: float = 0.0, fail_recipients: Optional[Set[str]] = None):
+        self.latency = latency
+        self.fail_recipients = fail_recipients or set()
+        self.outbox: List[OutboundMessage] = []
+
+    async def send(self, message: OutboundMessage) -> SendResult:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if message.recipient in self.fail_recipients:
+            return SendResult(False, error="Rejected by fake provider")
+        self.outbox.append(message)
+        return SendResult(True, message_id=f"fake_{uuid.uuid4().hex}")
+
+class _HTTPMessageProvider(MessageProvider):
+    """Runs the blocking HTTP call in a worker thread so sends overlap"""
+
+    async def send(self, message: OutboundMessage) -> SendResult:
+        try:
+            return await asyncio.to_thread(self._post, message)
+        except requests.RequestException as e:
+            return SendResult(False, error=str(e))
+
+    def _post(self, message: OutboundMessage) -> SendResult:
+        raise NotImplementedError
+
+class ResendEmailProvider(_HTTPMessageProvider):
+    name = "resend"
+    rate_limit = 10.0
+
+    def __init__(self, api_key: str, from_email: str):
+        self.api_key = api_key
+        self.from_email = from_email
+
+    def _post(self, message: OutboundMessage) -> SendResult:
+        response = requests.post(
+            "https://api.resend.com/emails",
+            headers={"Authorization": f"Bearer {self.api_key}"},
+            json={"from": self.from_email, "to": [message.recipient], "subject": message.subject or "", "html": message.body},
+            timeout=PROVIDER_TIMEOUT_SECONDS
+        )
+        if response.status_code >= 400:
+            return SendResult(False, error=f"HTTP {response.status_code}: {response.text[:500]}")
+        return SendResult(True, message_id=response.json().get("id"))
+
+class TwilioSMSProvider(_HTTPMessageProvider):
+    name = "twilio"
+    rate_limit = 30.0
+    # Twilio routes a message by the scheme on its From and To numbers
+    address_prefix = ""
+
+    def __init__(self, account_sid: str, auth_token: str, from_phone: str):
+        self.account_sid = account_sid
+        self.auth_token = auth_token
+        self.from_phone = from_phone
+
+    def _post(self, message: OutboundMessage) -> SendResult:
+        response = requests.post(
+            f"https://api.twilio.com/2010-04-01/Accounts/{self.account_sid}/Messages.json",
+            auth=(self.account_sid, self.auth_token),
+            data={
+                "From": f"{self.address_prefix}{self.from_phone}",
+                "To": f"{self.address_prefix}{message.recipient}",
+                "Body": message.body
+            },
+            timeout=PROVIDER_TIMEOUT_SECONDS
+        )
+        if response.status_code >= 400:
+            return SendResult(False, error=f"HTTP {response.status_code}: {response.text[:500]}")
+        return SendResult(True, message_id=response.json().get("sid"))
+
+class TwilioWhatsAppProvider(TwilioSMSProvider):
+    name = "twilio_whatsapp"
+    address_prefix = "whatsapp:"
+
+def get_message_provider(db: Session, channel: CommunicationType) -> MessageProvider:
+    """Provider for a channel; the fake provider unless MESSAGING_PROVIDER is "live"."""
+    if settings.MESSAGING_PROVIDER != "live":
+        return FakeMessageProvider()
+
+    if channel in EMAIL_CHANNELS:
+        integration = IntegrationService(db).get_integration_by_type(IntegrationType.EMAIL_SERVICE.value)
+        api_key = settings.resend_api_key or (integration.api_key if integration and integration.provider == "resend" else None)
+        from_email = ((integration.settings or {}).get("from_email") if integration else None) or settings.MESSAGING_FROM_EMAIL
+        if api_key and from_email:
+            return ResendEmailProvider(api_key, from_email)
+    elif channel in PHONE_CHANNELS:
+        integration = IntegrationService(db).get_integration_by_type(IntegrationType.SMS_SERVICE.value)
+        if integration and integration.provider == "twilio":
+            integration_settings = integration.settings or {}
+            if channel == CommunicationType.WHATSAPP:
+                provider_class = TwilioWhatsAppProvider
+                from_phone = integration_settings.get("whatsapp_from_phone") or integration_settings.get("from_phone")
+            else:
+                provider_class = TwilioSMSProvider
+                from_phone = integration_settings.get("from_phone")
+            if integration.api_key and integration.api_secret and from_phone:
+                return provider_class(integration.api_key, integration.api_secret, from_phone)
+
+    raise ValidationException(f"No messaging provider configured for {channel.value}")
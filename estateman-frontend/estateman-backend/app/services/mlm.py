@@ -5,12 +5,18 @@ from app.core.datetime_utils import utc_now, ensure_timezone_aware
 from app.core.validation import sanitize_html, validate_id
 from app.core.exceptions import NotFoundError, ValidationException, UnauthorizedError
 from app.models.mlm import (
-    MLMPartner, MLMCommission, ReferralActivity, CommissionRule, 
+    MLMPartner, MLMCommission, ReferralActivity, CommissionRule, RankRequirement,
     CommissionQualification, CommissionPayout, CommissionAdjustment,
-    PartnerLevel, CommissionType, QualificationStatus, PayoutStatus
+    PartnerLevel, QualificationStatus, PayoutStatus
 )
 from app.models.user import User
-from app.schemas.mlm import MLMPartnerCreate, MLMPartnerUpdate, MLMTreeNode, TeamPerformance
+from app.services.mlm_commissions import MLMCommissionEngine
+from app.services.mlm_network import MLMNetworkService
+from app.services.mlm_simulator import CommissionSimulator
+from app.services.mlm_tree import DEFAULT_TREE_DEPTH, MLMTreeService, mlm_tree_cache
+from app.schemas.mlm import (
+    CommissionSale, MLMPartnerCreate, MLMPartnerUpdate, MLMTreeNode, NetworkSimulationRequest, TeamPerformance
+)
 import random
 import string
 from datetime import datetime, timedelta
@@ -38,12 +44,12 @@ class MLMService:
         )
         
         self.db.add(partner)
+        self.db.flush()
+        # Also counts the new partner into the stats of its whole upline
+        upline = MLMNetworkService(self.db).add_partner(partner.id, partner.sponsor_id)
         self.db.commit()
         self.db.refresh(partner)
-        
-        # Update sponsor's direct referrals count
-        if partner.sponsor_id:
-            self.update_network_stats(partner.sponsor_id)
+        mlm_tree_cache.invalidate([partner.id, *upline])
         
         return partner
     
@@ -66,78 +72,37 @@ class MLMService:
         if not partner:
             return None
         
-        for field, value in partner_data.dict(exclude_unset=True).items():
+        changes = partner_data.dict(exclude_unset=True)
+        affected = {partner.id}
+        if "sponsor_id" in changes:
+            affected |= MLMNetworkService(self.db).move_partner(partner.id, changes.pop("sponsor_id"))
+        for field, value in changes.items():
             setattr(partner, field, value)
         
         self.db.commit()
+        mlm_tree_cache.invalidate(affected)
         self.db.refresh(partner)
         return partner
     
     def get_downline(self, partner_id: int, max_depth: int = 10) -> List[MLMPartner]:
         """Get all downline partners"""
-        downline = []
-        
-        def get_children(parent_id: int, current_depth: int):
-            if current_depth >= max_depth:
-                return
-            
-            children = self.db.query(MLMPartner).filter(MLMPartner.sponsor_id == parent_id).all()
-            for child in children:
-                downline.append(child)
-                get_children(child.id, current_depth + 1)
-        
-        get_children(partner_id, 0)
-        return downline
+        return MLMNetworkService(self.db).downline_query(partner_id, max_depth).all()
     
-    def get_mlm_tree(self, partner_id: int) -> Optional[MLMTreeNode]:
-        """Get MLM tree structure for visualization"""
-        partner = self.get_partner(partner_id)
-        if not partner:
-            return None
-        
-        def build_tree_node(p: MLMPartner) -> MLMTreeNode:
-            user = self.db.query(User).filter(User.id == p.user_id).first()
-            children = self.db.query(MLMPartner).filter(MLMPartner.sponsor_id == p.id).all()
-            
-            return MLMTreeNode(
-                id=str(p.id),
-                name=sanitize_html(user.full_name if user else f"Partner {p.id}"),
-                level=p.level.value,
-                referral_id=p.referral_code,
-                direct_referrals=p.direct_referrals_count,
-                monthly_commission=p.monthly_commission,
-                children=[build_tree_node(child) for child in children]
-            )
-        
-        return build_tree_node(partner)
+    def get_mlm_tree(self, partner_id: int, depth: int = DEFAULT_TREE_DEPTH) -> Optional[MLMTreeNode]:
+        """Get `depth` levels of the MLM tree for visualization; deeper nodes carry an expand cursor"""
+        tree = MLMTreeService(self.db).get_tree(validate_id(partner_id), depth)
+        return MLMTreeNode(**tree) if tree else None
     
     def update_network_stats(self, partner_id: int):
-        """Update network statistics for a partner"""
+        """Recount network statistics for a partner from the closure"""
         partner = self.get_partner(partner_id)
         if not partner:
             return
         
-        # Update direct referrals count
-        direct_count = self.db.query(MLMPartner).filter(MLMPartner.sponsor_id == partner_id).count()
-        partner.direct_referrals_count = direct_count
-        
-        # Update total network size and depth
-        downline = self.get_downline(partner_id)
-        partner.total_network_size = len(downline)
-        
-        # Calculate network depth
-        max_depth = 0
-        def calculate_depth(p_id: int, current_depth: int):
-            nonlocal max_depth
-            max_depth = max(max_depth, current_depth)
-            children = self.db.query(MLMPartner).filter(MLMPartner.sponsor_id == p_id).all()
-            for child in children:
-                calculate_depth(child.id, current_depth + 1)
-        
-        calculate_depth(partner_id, 0)
-        partner.network_depth = max_depth
-        
+        MLMNetworkService(self.db).refresh_stats({partner.id})
         self.db.commit()
+        self.db.refresh(partner)
+        mlm_tree_cache.invalidate([partner_id])
     
     def get_top_performers(self, limit: int = 10) -> List[TeamPerformance]:
         """Get top performing partners"""
@@ -209,42 +174,72 @@ class AdvancedCommissionService:
             query = query.filter(CommissionRule.is_active == True)
         return query.all()
     
+    def get_rank_requirements(self) -> List[RankRequirement]:
+        """Rank thresholds used by the monthly qualification run"""
+        return self.db.query(RankRequirement).order_by(RankRequirement.id).all()
+    
+    def set_rank_requirement(self, requirement_data: dict) -> RankRequirement:
+        """Create or replace the thresholds for one rank"""
+        requirement = self.db.query(RankRequirement).filter(
+            RankRequirement.rank == requirement_data["rank"]
+        ).first()
+        if not requirement:
+            requirement = RankRequirement(rank=requirement_data["rank"])
+            self.db.add(requirement)
+        for field in ("min_personal_volume", "min_group_volume", "min_active_legs"):
+            setattr(requirement, field, requirement_data[field])
+        self.db.commit()
+        self.db.refresh(requirement)
+        return requirement
+    
     def simulate_commission(self, partner_id: int, transaction_amount: float, scenario: dict) -> dict:
-        """Simulate commission under different scenarios"""
+        """Simulate commission under different scenarios; reads only, nothing is recorded"""
         partner = self.db.query(MLMPartner).filter(MLMPartner.id == partner_id).first()
         if not partner:
             return {"error": "Partner not found"}
         
-        # Current commission calculation
-        commission_service = MLMCommissionService(self.db)
-        current_commissions = commission_service.calculate_commission(partner_id, transaction_amount)
-        current_total = sum(c.amount for c in current_commissions)
-        
-        # Projected commission based on scenario
-        if scenario.get("scenario_type") == "rank_up":
-            original_level = partner.level
-            partner.level = scenario.get("new_rank", partner.level)
-            projected_commissions = commission_service.calculate_commission(partner_id, transaction_amount)
-            partner.level = original_level
-        elif scenario.get("scenario_type") == "volume_increase":
-            multiplier = scenario.get("volume_multiplier", 1.0)
-            projected_commissions = commission_service.calculate_commission(partner_id, transaction_amount * multiplier)
+        engine = MLMCommissionEngine(self.db)
+        current_commissions = engine.compute([CommissionSale(source_partner_id=partner_id, amount=transaction_amount)])["rows"]
+        current_total = sum(c["amount"] for c in current_commissions)
+        
+        # Projected commission based on scenario. Payouts go to the upline, so the
+        # seller's own rank does not change them under the live plan.
+        if scenario.get("scenario_type") == "volume_increase":
+            multiplier = scenario.get("volume_multiplier") or 1.0
+            projected_commissions = engine.compute([
+                CommissionSale(source_partner_id=partner_id, amount=transaction_amount * multiplier)
+            ])["rows"]
         else:
             projected_commissions = current_commissions
         
-        projected_total = sum(c.amount for c in projected_commissions)
+        projected_total = sum(c["amount"] for c in projected_commissions)
         
         return {
             "current_commission": current_total,
             "projected_commission": projected_total,
             "difference": projected_total - current_total,
             "breakdown": [{
-                "level": c.level,
-                "amount": c.amount,
-                "type": c.commission_type.value
+                "level": c["level"],
+                "amount": c["amount"],
+                "type": c["commission_type"].value
             } for c in projected_commissions]
         }
     
+    def simulate_network(self, request: NetworkSimulationRequest) -> Dict[str, Any]:
+        """Compare two commission plans over a month of completed sales across the whole network"""
+        return CommissionSimulator(self.db).simulate_month(
+            request.year, request.month, request.proposed,
+            baseline=request.baseline,
+            rank_overrides=request.rank_overrides,
+            volume_multiplier=request.volume_multiplier
+        )
+    
+    def get_partner_qualifications(self, partner_id: int, limit: int = 12) -> List[CommissionQualification]:
+        """Most recent qualification results for a partner"""
+        return self.db.query(CommissionQualification).filter(
+            CommissionQualification.partner_id == partner_id
+        ).order_by(desc(CommissionQualification.period_start), CommissionQualification.rule_id).limit(limit).all()
+    
     def create_payout(self, payout_data: dict) -> CommissionPayout:
         """Create commission payout record"""
         payout = CommissionPayout(**payout_data)
@@ -253,71 +248,29 @@ class AdvancedCommissionService:
         self.db.refresh(payout)
         return payout
     
-    def get_pending_payouts(self) -> List[CommissionPayout]:
-        """Get all pending payouts"""
+    def get_pending_payouts(self, skip: int = 0, limit: int = 100) -> List[CommissionPayout]:
+        """Get pending payouts, oldest first"""
         return self.db.query(CommissionPayout).filter(
             CommissionPayout.status == PayoutStatus.PENDING
-        ).all()
+        ).order_by(CommissionPayout.id).offset(skip).limit(limit).all()
 
 class MLMCommissionService:
     def __init__(self, db: Session):
         self.db = db
     
-    def calculate_commission(self, source_partner_id: int, transaction_amount: float) -> List[MLMCommission]:
-        """Calculate multi-level commissions"""
-        commissions = []
-        source_partner = self.db.query(MLMPartner).filter(MLMPartner.id == source_partner_id).first()
-        
-        if not source_partner:
-            return commissions
-        
-        # Commission structure
-        commission_rates = {
-            1: 0.15,  # 15% for direct referrals
-            2: 0.07,  # 7% for level 2
-            3: 0.03,  # 3% for level 3
-            4: 0.01,  # 1% for levels 4-7
-            5: 0.01,
-            6: 0.01,
-            7: 0.01
-        }
-        
-        current_partner = source_partner
-        level = 1
-        
-        while current_partner.sponsor_id and level <= 7:
-            sponsor = self.db.query(MLMPartner).filter(MLMPartner.id == current_partner.sponsor_id).first()
-            if not sponsor or not sponsor.is_active:
-                break
-            
-            rate = commission_rates.get(level, 0)
-            if rate > 0:
-                amount = transaction_amount * rate
-                
-                commission = MLMCommission(
-                    partner_id=sponsor.id,
-                    source_partner_id=source_partner_id,
-                    commission_type=CommissionType.DIRECT_REFERRAL if level == 1 else CommissionType.LEVEL_BONUS,
-                    level=level,
-                    amount=amount,
-                    percentage=rate * 100
-                )
-                
-                commissions.append(commission)
-                
-                # Update partner's monthly commission
-                sponsor.monthly_commission += amount
-                sponsor.total_earnings += amount
-            
-            current_partner = sponsor
-            level += 1
-        
-        # Save all commissions
-        for commission in commissions:
-            self.db.add(commission)
-        
-        self.db.commit()
-        return commissions
+    def calculate_commission(self, source_partner_id: int, transaction_amount: float,
+                             reference_transaction_id: Optional[int] = None) -> List[MLMCommission]:
+        """Calculate multi-level commissions for one sale"""
+        result = self.calculate_commissions_batch([CommissionSale(
+            source_partner_id=source_partner_id,
+            amount=transaction_amount,
+            reference_transaction_id=reference_transaction_id
+        )])
+        return [MLMCommission(**row) for row in result["rows"]]
+    
+    def calculate_commissions_batch(self, sales: List[CommissionSale]) -> Dict[str, Any]:
+        """Calculate and record multi-level commissions for many sales in one pass"""
+        return MLMCommissionEngine(self.db).apply(sales)
     
     def get_recent_activities(self, limit: int = 10) -> List[Dict[str, Any]]:
         """Get recent referral activities"""
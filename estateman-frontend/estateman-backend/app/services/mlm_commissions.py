@@ -0,0 +1,183 @@
+from typing import Any, Dict, List, Optional, Sequence
+import numpy as np
+from sqlalchemy import bindparam, func, insert, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from ..core.exceptions import ValidationException
+from ..models.mlm import CommissionType, MLMCommission, MLMPartner, MLMPartnerClosure
+from ..schemas.mlm import CommissionSale
+from .mlm_tree import mlm_tree_cache
+
+# Share of the sale paid to the sponsor N levels above the seller
+COMMISSION_RATES = {1: 0.15, 2: 0.07, 3: 0.03, 4: 0.01, 5: 0.01, 6: 0.01, 7: 0.01}
+MAX_COMMISSION_LEVEL = max(COMMISSION_RATES)
+# Source partners resolved, keys checked and rows written per statement
+COMMISSION_BATCH_SIZE = 5000
+
+_LEVEL_RATES = np.array([COMMISSION_RATES.get(level, 0.0) for level in range(1, MAX_COMMISSION_LEVEL + 1)])
+
+def sale_key(sale: CommissionSale) -> Optional[str]:
+    """The sale's idempotency key; sales for a recorded transaction default to its id"""
+    if sale.idempotency_key:
+        return sale.idempotency_key
+    if sale.reference_transaction_id is not None:
+        return f"txn:{sale.reference_transaction_id}"
+    return None
+
+class MLMCommissionEngine:
+    """Multi-level commissions for many sales at once.
+
+    The sponsor chains of every seller in a batch come from one closure-table
+    query. Commissions are then computed for all sales and levels as arrays:
+    a level pays only while every sponsor up to it is active, as in the
+    original sponsor walk. Rows are bulk-inserted with an idempotency key of
+    "<sale key>:<level>", so re-submitting a sale never pays it twice, and
+    each credited sponsor's totals move by one aggregated UPDATE.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def _resolve_chains(self, source_ids: np.ndarray):
+        """Ancestor ids and active flags per level for each source, plus which sources exist"""
+        position = {int(source_id): index for index, source_id in enumerate(source_ids)}
+        ancestors = np.zeros((len(source_ids), MAX_COMMISSION_LEVEL), dtype=np.int64)
+        active = np.zeros((len(source_ids), MAX_COMMISSION_LEVEL), dtype=bool)
+        known = np.zeros(len(source_ids), dtype=bool)
+        for start in range(0, len(source_ids), COMMISSION_BATCH_SIZE):
+            chunk = [int(source_id) for source_id in source_ids[start:start + COMMISSION_BATCH_SIZE]]
+            rows = self.db.query(
+                MLMPartnerClosure.descendant_id, MLMPartnerClosure.depth,
+                MLMPartnerClosure.ancestor_id, MLMPartner.is_active
+            ).join(
+                MLMPartner, MLMPartner.id == MLMPartnerClosure.ancestor_id
+            ).filter(
+                MLMPartnerClosure.descendant_id.in_(chunk),
+                MLMPartnerClosure.depth <= MAX_COMMISSION_LEVEL
+            ).all()
+            for descendant_id, depth, ancestor_id, is_active in rows:
+                index = position[descendant_id]
+                if depth == 0:
+                    known[index] = True
+                else:
+                    ancestors[index, depth - 1] = ancestor_id
+                    active[index, depth - 1] = bool(is_active)
+        return ancestors, active, known
+
+    def compute(self, sales: Sequence[CommissionSale]) -> Dict[str, Any]:
+        """Commission rows for the sales without writing anything"""
+        if not sales:
+            return {"rows": [], "unknown_sources": []}
+        sources = np.array([sale.source_partner_id for sale in sales], dtype=np.int64)
+        amounts = np.array([sale.amount for sale in sales], dtype=float)
+        source_ids, inverse = np.unique(sources, return_inverse=True)
+        ancestors, active, known = self._resolve_chains(source_ids)
+
+        # The original walk stopped at the first missing or inactive sponsor
+        eligible = np.logical_and.accumulate(active, axis=1)[inverse]
+        credits = amounts[:, None] * _LEVEL_RATES[None, :]
+        sale_indexes, level_indexes = np.nonzero(eligible & (credits > 0))
+        partner_ids = ancestors[inverse[sale_indexes], level_indexes]
+
+        keys = [sale_key(sale) for sale in sales]
+        rows = []
+        for sale_index, level_index, partner_id in zip(sale_indexes.tolist(), level_indexes.tolist(), partner_ids.tolist()):
+            sale = sales[sale_index]
+            level = level_index + 1
+            rows.append({
+                "partner_id": partner_id,
+                "source_partner_id": sale.source_partner_id,
+                "commission_type": CommissionType.DIRECT_REFERRAL if level == 1 else CommissionType.LEVEL_BONUS,
+                "level": level,
+                "amount": float(credits[sale_index, level_index]),
+                "percentage": COMMISSION_RATES[level] * 100,
+                "reference_transaction_id": sale.reference_transaction_id,
+                "description": sale.description,
+                "idempotency_key": f"{keys[sale_index]}:{level}" if keys[sale_index] else None
+            })
+        return {
+            "rows": rows,
+            "unknown_sources": [int(source_id) for source_id in source_ids[~known]]
+        }
+
+    def apply(self, sales: Sequence[CommissionSale]) -> Dict[str, Any]:
+        """Record the commissions for the sales and credit the sponsors, in one transaction"""
+        keys = [key for key in (sale_key(sale) for sale in sales) if key]
+        if len(keys) != len(set(keys)):
+            raise ValidationException("Each sale in a batch needs a distinct idempotency key")
+
+        computed = self.compute(sales)
+        rows = computed["rows"]
+        already_recorded = self._existing_keys([row["idempotency_key"] for row in rows if row["idempotency_key"]])
+        rows = [row for row in rows if row["idempotency_key"] not in already_recorded]
+
+        try:
+            inserted = self._insert(rows)
+            credited = self._credit_partners(inserted)
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        mlm_tree_cache.invalidate(credited)
+
+        return {
+            "sales": len(sales),
+            "commissions_created": len(inserted),
+            "duplicates_skipped": len(computed["rows"]) - len(inserted),
+            "partners_credited": len(credited),
+            "total_amount": float(sum(row["amount"] for row in inserted)),
+            "unknown_sources": computed["unknown_sources"],
+            "rows": inserted
+        }
+
+    def _existing_keys(self, keys: List[str]) -> set:
+        existing = set()
+        for start in range(0, len(keys), COMMISSION_BATCH_SIZE):
+            existing.update(
+                key for (key,) in self.db.query(MLMCommission.idempotency_key).filter(
+                    MLMCommission.idempotency_key.in_(keys[start:start + COMMISSION_BATCH_SIZE])
+                )
+            )
+        return existing
+
+    def _insert(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Bulk-insert the rows; returns the ones actually written"""
+        if self.db.bind.dialect.name != "postgresql":
+            for start in range(0, len(rows), COMMISSION_BATCH_SIZE):
+                self.db.execute(insert(MLMCommission), rows[start:start + COMMISSION_BATCH_SIZE])
+            return rows
+
+        # A concurrent run may have recorded a key since the check above; its rows win
+        inserted_keys = set()
+        for start in range(0, len(rows), COMMISSION_BATCH_SIZE):
+            chunk = rows[start:start + COMMISSION_BATCH_SIZE]
+            keyed = [row for row in chunk if row["idempotency_key"]]
+            if keyed:
+                inserted_keys.update(self.db.execute(
+                    pg_insert(MLMCommission).on_conflict_do_nothing(index_elements=["idempotency_key"])
+                    .returning(MLMCommission.idempotency_key),
+                    keyed
+                ).scalars())
+            unkeyed = [row for row in chunk if not row["idempotency_key"]]
+            if unkeyed:
+                self.db.execute(insert(MLMCommission), unkeyed)
+        return [row for row in rows if not row["idempotency_key"] or row["idempotency_key"] in inserted_keys]
+
+    def _credit_partners(self, rows: List[Dict[str, Any]]) -> List[int]:
+        """Add each sponsor's summed credit to its monthly and total earnings"""
+        if not rows:
+            return []
+        partner_ids, inverse = np.unique(np.array([row["partner_id"] for row in rows], dtype=np.int64), return_inverse=True)
+        totals = np.bincount(inverse, weights=np.array([row["amount"] for row in rows], dtype=float))
+        credits = [
+            {"credited_id": int(partner_id), "credit": float(total)}
+            for partner_id, total in zip(partner_ids, totals)
+        ]
+        self.db.connection().execute(
+            update(MLMPartner).where(MLMPartner.id == bindparam("credited_id")).values(
+                monthly_commission=func.coalesce(MLMPartner.monthly_commission, 0) + bindparam("credit"),
+                total_earnings=func.coalesce(MLMPartner.total_earnings, 0) + bindparam("credit")
+            ),
+            credits
+        )
+        return [credit["credited_id"] for credit in credits]
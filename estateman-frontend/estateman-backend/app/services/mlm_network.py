@@ -0,0 +1,224 @@
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Set
+from sqlalchemy import case, func, insert, literal, select, union_all, update
+from sqlalchemy.orm import Query, Session, aliased
+from ..core.exceptions import NotFoundError, ValidationException
+from ..models.mlm import MLMPartner, MLMPartnerClosure
+
+# Guards the rebuild's recursive CTE against sponsor cycles already in the data
+MAX_NETWORK_DEPTH = 1000
+# Partners whose stats are written per bulk UPDATE in `rebuild_stats`
+STATS_BATCH_SIZE = 5000
+
+class MLMNetworkService:
+    """Sponsor-tree queries backed by the mlm_partner_closure table.
+
+    The closure holds one row per (ancestor, descendant) pair with their
+    distance, so a downline, its depth and its size are each one indexed
+    query instead of a walk over sponsor_id. Writes keep it in step when a
+    partner joins or changes sponsor; `rebuild` regenerates it from sponsor_id.
+
+    The denormalised stats on MLMPartner (direct_referrals_count,
+    total_network_size, network_depth) are kept current for the whole upline
+    by the same writes; `rebuild_stats` recomputes them for every partner.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def upline_ids(self, partner_id: int) -> List[int]:
+        """Every ancestor of a partner, its sponsor first"""
+        return [row.ancestor_id for row in self.db.query(MLMPartnerClosure.ancestor_id).filter(
+            MLMPartnerClosure.descendant_id == partner_id,
+            MLMPartnerClosure.depth >= 1
+        ).order_by(MLMPartnerClosure.depth)]
+
+    def add_partner(self, partner_id: int, sponsor_id: Optional[int]) -> List[int]:
+        """Link a new leaf partner under its sponsor's ancestors (and itself at depth 0).
+
+        Returns the upline whose stats were updated.
+        """
+        rows = [select(literal(partner_id), literal(partner_id), literal(0))]
+        if sponsor_id:
+            rows.append(
+                select(MLMPartnerClosure.ancestor_id, literal(partner_id), MLMPartnerClosure.depth + 1)
+                .where(MLMPartnerClosure.descendant_id == sponsor_id)
+            )
+        self.db.execute(
+            insert(MLMPartnerClosure).from_select(["ancestor_id", "descendant_id", "depth"], union_all(*rows))
+        )
+        if not sponsor_id:
+            return []
+
+        # A leaf adds one member to every ancestor and can only deepen their networks
+        distance = select(MLMPartnerClosure.depth).where(
+            MLMPartnerClosure.ancestor_id == MLMPartner.id,
+            MLMPartnerClosure.descendant_id == partner_id
+        ).scalar_subquery()
+        self.db.execute(
+            update(MLMPartner).where(
+                MLMPartner.id.in_(
+                    select(MLMPartnerClosure.ancestor_id).where(
+                        MLMPartnerClosure.descendant_id == partner_id,
+                        MLMPartnerClosure.depth >= 1
+                    )
+                )
+            ).values(
+                total_network_size=func.coalesce(MLMPartner.total_network_size, 0) + 1,
+                direct_referrals_count=func.coalesce(MLMPartner.direct_referrals_count, 0)
+                + case((MLMPartner.id == sponsor_id, 1), else_=0),
+                network_depth=case(
+                    (func.coalesce(MLMPartner.network_depth, 0) < distance, distance),
+                    else_=MLMPartner.network_depth
+                )
+            ),
+            execution_options={"synchronize_session": False}
+        )
+        return self.upline_ids(partner_id)
+
+    def move_partner(self, partner_id: int, new_sponsor_id: Optional[int]) -> Set[int]:
+        """Re-parent a partner together with its whole downline.
+
+        Returns the old and new upline, whose stats were recomputed.
+        """
+        partner = self.db.query(MLMPartner).filter(MLMPartner.id == partner_id).first()
+        if not partner:
+            raise NotFoundError("MLM partner")
+        if new_sponsor_id == partner.sponsor_id:
+            return set()
+        if new_sponsor_id is not None:
+            if not self.db.query(MLMPartner.id).filter(MLMPartner.id == new_sponsor_id).first():
+                raise NotFoundError("Sponsor")
+            in_subtree = self.db.query(MLMPartnerClosure).filter(
+                MLMPartnerClosure.ancestor_id == partner_id,
+                MLMPartnerClosure.descendant_id == new_sponsor_id
+            ).first()
+            if in_subtree:
+                raise ValidationException("A partner cannot be moved under its own downline")
+
+        affected = set(self.upline_ids(partner_id))
+        subtree = select(MLMPartnerClosure.descendant_id).where(
+            MLMPartnerClosure.ancestor_id == partner_id
+        ).scalar_subquery()
+        # Drop the links from the old upline into the subtree; links inside the subtree stay
+        self.db.query(MLMPartnerClosure).filter(
+            MLMPartnerClosure.descendant_id.in_(subtree),
+            MLMPartnerClosure.ancestor_id.notin_(subtree)
+        ).delete(synchronize_session=False)
+
+        if new_sponsor_id is not None:
+            upline = MLMPartnerClosure.__table__.alias("upline")
+            below = MLMPartnerClosure.__table__.alias("below")
+            self.db.execute(
+                insert(MLMPartnerClosure).from_select(
+                    ["ancestor_id", "descendant_id", "depth"],
+                    # Every ancestor of the new sponsor paired with every member of the subtree
+                    select(upline.c.ancestor_id, below.c.descendant_id, upline.c.depth + below.c.depth + 1)
+                    .select_from(upline.join(below, below.c.ancestor_id == partner_id))
+                    .where(upline.c.descendant_id == new_sponsor_id)
+                )
+            )
+        partner.sponsor_id = new_sponsor_id
+        # Losing a subtree can make an old ancestor shallower, so recount rather than subtract
+        affected.update(self.upline_ids(partner_id))
+        self.refresh_stats(affected)
+        return affected
+
+    def rebuild(self) -> int:
+        """Regenerate the closure from sponsor_id with one recursive CTE"""
+        tree = select(
+            MLMPartner.id.label("ancestor_id"), MLMPartner.id.label("descendant_id"), literal(0).label("depth")
+        ).cte("tree", recursive=True)
+        tree = tree.union_all(
+            select(tree.c.ancestor_id, MLMPartner.id, tree.c.depth + 1)
+            .where(MLMPartner.sponsor_id == tree.c.descendant_id, tree.c.depth < MAX_NETWORK_DEPTH)
+        )
+        self.db.query(MLMPartnerClosure).delete(synchronize_session=False)
+        self.db.execute(
+            insert(MLMPartnerClosure).from_select(
+                ["ancestor_id", "descendant_id", "depth"],
+                select(tree.c.ancestor_id, tree.c.descendant_id, tree.c.depth)
+            )
+        )
+        self.db.commit()
+        return self.db.query(func.count()).select_from(MLMPartnerClosure).scalar()
+
+    def downline_query(self, partner_id: int, max_depth: Optional[int] = None) -> Query:
+        """Partners below `partner_id`, at most `max_depth` levels down, nearest levels first"""
+        query = self.db.query(MLMPartner).join(
+            MLMPartnerClosure, MLMPartnerClosure.descendant_id == MLMPartner.id
+        ).filter(
+            MLMPartnerClosure.ancestor_id == partner_id,
+            MLMPartnerClosure.depth >= 1
+        )
+        if max_depth is not None:
+            query = query.filter(MLMPartnerClosure.depth <= max_depth)
+        return query.order_by(MLMPartnerClosure.depth, MLMPartner.id)
+
+    def refresh_stats(self, partner_ids: Set[int]) -> None:
+        """Recount the stats of the given partners from the closure in one UPDATE"""
+        if not partner_ids:
+            return
+        below = aliased(MLMPartnerClosure)
+
+        def over_downline(aggregate):
+            return select(aggregate).where(below.ancestor_id == MLMPartner.id).scalar_subquery()
+
+        self.db.execute(
+            update(MLMPartner).where(MLMPartner.id.in_(list(partner_ids))).values(
+                direct_referrals_count=over_downline(func.count().filter(below.depth == 1)),
+                total_network_size=over_downline(func.count().filter(below.depth >= 1)),
+                network_depth=over_downline(func.coalesce(func.max(below.depth), 0))
+            ),
+            execution_options={"synchronize_session": False}
+        )
+
+    def rebuild_stats(self) -> Dict[str, Any]:
+        """Recompute every partner's stats from sponsor_id in one bottom-up pass.
+
+        The forest is read once, ordered roots first, and folded from the
+        leaves up so each partner's totals are built from its children's.
+        Only partners whose stats changed are written. Partners caught in a
+        sponsor cycle are unreachable from any root and are left untouched.
+        """
+        partners = self.db.query(
+            MLMPartner.id, MLMPartner.sponsor_id, MLMPartner.direct_referrals_count,
+            MLMPartner.total_network_size, MLMPartner.network_depth
+        ).all()
+        known = {partner.id for partner in partners}
+        children: Dict[int, List[int]] = defaultdict(list)
+        order = []
+        for partner in partners:
+            if partner.sponsor_id in known:
+                children[partner.sponsor_id].append(partner.id)
+            else:
+                order.append(partner.id)
+
+        # Breadth-first from the roots: every sponsor precedes its downline
+        position = 0
+        while position < len(order):
+            order.extend(children[order[position]])
+            position += 1
+
+        size: Dict[int, int] = {}
+        depth: Dict[int, int] = {}
+        for partner_id in reversed(order):
+            size[partner_id] = sum(size[child] + 1 for child in children[partner_id])
+            depth[partner_id] = max((depth[child] + 1 for child in children[partner_id]), default=0)
+
+        changes = [
+            {
+                "id": partner.id,
+                "direct_referrals_count": len(children[partner.id]),
+                "total_network_size": size[partner.id],
+                "network_depth": depth[partner.id]
+            }
+            for partner in partners
+            if partner.id in size and (
+                partner.direct_referrals_count, partner.total_network_size, partner.network_depth
+            ) != (len(children[partner.id]), size[partner.id], depth[partner.id])
+        ]
+        for start in range(0, len(changes), STATS_BATCH_SIZE):
+            self.db.execute(update(MLMPartner), changes[start:start + STATS_BATCH_SIZE])
+        self.db.commit()
+        return {"partners": len(partners), "updated": len(changes), "unreachable": len(partners) - len(order)}
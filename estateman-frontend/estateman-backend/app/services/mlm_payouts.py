@@ -0,0 +1,222 @@
+import csv
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+from sqlalchemy import case, func, insert, literal, select, text, union_all, update
+from sqlalchemy.orm import Session
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..core.datetime_utils import to_utc, utc_now
+from ..core.exceptions import NotFoundError, ValidationException
+from ..models.mlm import (
+    CommissionAdjustment, CommissionPayout, CommissionPayoutRun, MLMCommission, MLMPartner, PayoutStatus
+)
+from ..models.user import User
+
+PAYOUT_FILE_FORMATS = ("csv",)
+# Payout rows fetched per round trip while the file is written
+PAYOUT_FILE_BATCH_SIZE = 1000
+# pg_advisory_xact_lock key that serialises payout runs
+PAYOUT_RUN_LOCK_KEY = 7305001
+PAYOUT_FILE_COLUMNS = [
+    "payout_id", "partner_id", "referral_code", "name", "email", "amount", "period_start", "period_end"
+]
+
+def _stored(dt: datetime) -> datetime:
+    """Naive UTC, like the other DateTime columns of the MLM tables"""
+    return to_utc(dt).replace(tzinfo=None)
+
+def _cell(value: Optional[str]) -> str:
+    """Free text for the CSV, neutralised so spreadsheets don't evaluate it as a formula"""
+    value = value or ""
+    return f"'{value}" if value[:1] in ("=", "+", "-", "@") else value
+
+class PayoutRunService:
+    """Bulk commission payouts for a period.
+
+    Unpaid commissions and adjustments created before the end of the period
+    are summed per partner in SQL and inserted as CommissionPayout rows with
+    one INSERT ... SELECT. The included rows are then linked to their payout;
+    a linked row is never picked up again, so re-running a period only pays
+    what is new. Partners whose chargebacks leave nothing owed get no payout
+    and their rows stay unlinked, so the debt carries into the next run and
+    is netted against what they earn there. The payout file is streamed to
+    disk from a server-side cursor.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def start_run(self, period_start: datetime, period_end: datetime, created_by: Optional[int],
+                  file_format: str = "csv") -> CommissionPayoutRun:
+        if file_format not in PAYOUT_FILE_FORMATS:
+            raise ValidationException(f"Unsupported payout file format: {file_format}")
+        if period_end <= period_start:
+            raise ValidationException("period_end must be after period_start")
+        run = CommissionPayoutRun(
+            period_start=_stored(period_start),
+            period_end=_stored(period_end),
+            file_format=file_format,
+            created_by=created_by
+        )
+        self.db.add(run)
+        self.db.commit()
+        self.db.refresh(run)
+        return run
+
+    def get_run(self, run_id: int) -> CommissionPayoutRun:
+        run = self.db.query(CommissionPayoutRun).filter(CommissionPayoutRun.id == run_id).first()
+        if not run:
+            raise NotFoundError("Payout run")
+        return run
+
+    def get_run_payouts(self, run_id: int, skip: int = 0, limit: int = 100) -> List[CommissionPayout]:
+        return self.db.query(CommissionPayout).filter(
+            CommissionPayout.run_id == run_id
+        ).order_by(CommissionPayout.id).offset(skip).limit(limit).all()
+
+    def _unpaid_commissions(self, run: CommissionPayoutRun):
+        # Rows left from earlier periods are carried forward, not just the period's own
+        return (
+            MLMCommission.payout_id.is_(None),
+            MLMCommission.is_paid.isnot(True),
+            MLMCommission.created_at < run.period_end
+        )
+
+    def _unpaid_adjustments(self, run: CommissionPayoutRun):
+        return (
+            CommissionAdjustment.payout_id.is_(None),
+            CommissionAdjustment.created_at < run.period_end
+        )
+
+    def execute(self, run_id: int) -> CommissionPayoutRun:
+        run = self.get_run(run_id)
+        if run.status != "running":
+            raise ValidationException(f"Payout run {run.id} is already {run.status}")
+        try:
+            if self.db.bind.dialect.name == "postgresql":
+                # Two runs aggregating the same rows at once would both pay them
+                self.db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": PAYOUT_RUN_LOCK_KEY})
+
+            # Chargebacks reduce what is owed whatever sign they were entered with
+            adjustment_amount = case(
+                (CommissionAdjustment.adjustment_type == "chargeback", -func.abs(CommissionAdjustment.amount)),
+                else_=CommissionAdjustment.amount
+            )
+            owed = union_all(
+                select(MLMCommission.partner_id.label("partner_id"), MLMCommission.amount.label("amount"))
+                .where(*self._unpaid_commissions(run)),
+                select(MLMCommission.partner_id, adjustment_amount)
+                .join(MLMCommission, MLMCommission.id == CommissionAdjustment.commission_id)
+                .where(*self._unpaid_adjustments(run))
+            ).subquery()
+            self.db.execute(
+                insert(CommissionPayout).from_select(
+                    ["run_id", "partner_id", "period_start", "period_end", "total_amount", "status"],
+                    select(
+                        literal(run.id), owed.c.partner_id,
+                        literal(run.period_start, CommissionPayout.period_start.type),
+                        literal(run.period_end, CommissionPayout.period_end.type),
+                        func.sum(owed.c.amount),
+                        literal(PayoutStatus.PENDING, CommissionPayout.status.type)
+                    ).group_by(owed.c.partner_id).having(func.sum(owed.c.amount) > 0)
+                )
+            )
+
+            paid_partners = select(CommissionPayout.partner_id).where(CommissionPayout.run_id == run.id)
+            self.db.execute(
+                update(MLMCommission).where(
+                    *self._unpaid_commissions(run),
+                    MLMCommission.partner_id.in_(paid_partners)
+                ).values(payout_id=select(CommissionPayout.id).where(
+                    CommissionPayout.run_id == run.id,
+                    CommissionPayout.partner_id == MLMCommission.partner_id
+                ).scalar_subquery()),
+                execution_options={"synchronize_session": False}
+            )
+            self.db.execute(
+                update(CommissionAdjustment).where(
+                    *self._unpaid_adjustments(run),
+                    CommissionAdjustment.commission_id.in_(
+                        select(MLMCommission.id).where(MLMCommission.partner_id.in_(paid_partners))
+                    )
+                ).values(payout_id=select(CommissionPayout.id).join(
+                    MLMCommission, MLMCommission.partner_id == CommissionPayout.partner_id
+                ).where(
+                    CommissionPayout.run_id == run.id,
+                    MLMCommission.id == CommissionAdjustment.commission_id
+                ).scalar_subquery()),
+                execution_options={"synchronize_session": False}
+            )
+
+            count, total = self.db.query(
+                func.count(CommissionPayout.id), func.coalesce(func.sum(CommissionPayout.total_amount), 0)
+            ).filter(CommissionPayout.run_id == run.id).one()
+            run.payout_count = count
+            run.total_amount = float(total)
+            self.db.commit()
+        except Exception as e:
+            self.db.rollback()
+            self._fail(run, e)
+            raise
+
+        try:
+            self.write_file(run)
+        except Exception as e:
+            # The payouts are committed, so the run is complete; its download regenerates the file
+            self.db.rollback()
+            run.error = f"Payout file not written: {e}"[:2000]
+        run.status = "completed"
+        run.completed_at = utc_now().replace(tzinfo=None)
+        self.db.commit()
+        return run
+
+    def _fail(self, run: CommissionPayoutRun, error: Exception) -> None:
+        run.status = "failed"
+        run.error = str(error)[:2000]
+        self.db.commit()
+
+    def write_file(self, run: CommissionPayoutRun) -> str:
+        """Stream the run's payouts to its payout file and return the path"""
+        directory = Path(settings.PAYOUT_FILE_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"payout_run_{run.id}.{run.file_format}"
+        partial = path.with_suffix(path.suffix + ".part")
+
+        rows = self.db.query(
+            CommissionPayout.id, CommissionPayout.partner_id, MLMPartner.referral_code,
+            User.first_name, User.last_name, User.email, CommissionPayout.total_amount
+        ).join(
+            MLMPartner, MLMPartner.id == CommissionPayout.partner_id
+        ).outerjoin(
+            User, User.id == MLMPartner.user_id
+        ).filter(
+            CommissionPayout.run_id == run.id
+        ).order_by(CommissionPayout.id).yield_per(PAYOUT_FILE_BATCH_SIZE)
+
+        period_start = run.period_start.date().isoformat()
+        period_end = run.period_end.date().isoformat()
+        with open(partial, "w", newline="", encoding="utf-8") as handle:
+            writer = csv.writer(handle)
+            writer.writerow(PAYOUT_FILE_COLUMNS)
+            for payout_id, partner_id, referral_code, first_name, last_name, email, amount in rows:
+                writer.writerow([
+                    payout_id, partner_id, referral_code,
+                    _cell(f"{first_name} {last_name}" if first_name is not None else None),
+                    _cell(email), f"{amount:.2f}", period_start, period_end
+                ])
+        # Readers only ever see a complete file
+        os.replace(partial, path)
+
+        run.file_path = str(path)
+        self.db.commit()
+        return run.file_path
+
+def run_payout_job(run_id: int) -> None:
+    """Background task entry point; uses its own session since the request's is closed"""
+    db = SessionLocal()
+    try:
+        PayoutRunService(db).execute(run_id)
+    finally:
+        db.close()
@@ -0,0 +1,166 @@
+from typing import Any, Dict, Tuple
+import numpy as np
+from sqlalchemy import insert, update
+from sqlalchemy.orm import Session
+from ..core.database import SessionLocal
+from ..core.datetime_utils import utc_now
+from ..core.exceptions import ValidationException
+from ..models.mlm import (
+    CommissionQualification, CommissionRule, CommissionType, MLMPartner, QualificationStatus, RankRequirement
+)
+from .mlm_simulator import RANK_ORDER, NetworkArrays, load_network, month_bounds, month_sales
+from .mlm_tree import mlm_tree_cache
+
+# Rules of these types are measured on the partner's own sales; all others on group volume
+PERSONAL_VOLUME_RULES = {CommissionType.DIRECT_REFERRAL, CommissionType.PERFORMANCE_BONUS}
+# Qualification rows and rank changes written per bulk statement
+QUALIFICATION_BATCH_SIZE = 5000
+
+class RankQualificationEngine:
+    """Monthly rank qualification for the whole network in one pass.
+
+    Personal volume is each partner's completed sales closed in the month.
+    Group volume (personal plus the whole downline's) and active legs
+    (direct downline legs with any group volume) come from a single
+    bottom-up aggregation: partners are ordered by depth and each level,
+    deepest first, is folded into its sponsors with array operations.
+    Ranks follow the RankRequirement table and active CommissionRules are
+    evaluated against them; results are written in bulk. Partner ranks are
+    only updated when the run is asked to apply the changes.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def aggregate(self, network: NetworkArrays, personal: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Group volume, active legs and a mask of partners reachable from a root"""
+        size = len(network.ids)
+        # Pointer jumping: each round doubles how far `jump` reaches, so depths of any
+        # size resolve in log2(size) rounds; depth[i] is the distance from i to jump[i]
+        depth = (network.parent >= 0).astype(np.int64)
+        jump = network.parent.copy()
+        for _ in range(size.bit_length() + 1):
+            climbing = np.nonzero(jump >= 0)[0]
+            if not len(climbing):
+                break
+            targets = jump[climbing]
+            depth[climbing] += depth[targets]
+            jump[climbing] = jump[targets]
+        # Anything still climbing is in (or hangs below) a sponsor cycle
+        reachable = jump < 0
+
+        group = personal.copy()
+        legs = np.zeros(size, dtype=np.int64)
+        # Unreachable partners sit at level 0 so they are never folded into a cycle
+        levels = np.where(reachable, depth, 0)
+        order = np.argsort(levels, kind="stable")
+        bounds = np.searchsorted(levels[order], np.arange(levels.max(initial=0) + 2))
+        for level in range(int(levels.max(initial=0)), 0, -1):
+            nodes = order[bounds[level]:bounds[level + 1]]
+            np.add.at(group, network.parent[nodes], group[nodes])
+            np.add.at(legs, network.parent[nodes], (group[nodes] > 0).astype(np.int64))
+        return group, legs, reachable
+
+    def load_requirements(self) -> Dict[int, Tuple[float, float, int]]:
+        """Rank index -> (personal volume, group volume, active legs) needed to hold it"""
+        requirements = {
+            RANK_ORDER.index(row.rank): (
+                row.min_personal_volume or 0.0, row.min_group_volume or 0.0, row.min_active_legs or 0
+            )
+            for row in self.db.query(RankRequirement).all()
+        }
+        if not requirements:
+            raise ValidationException("No rank requirements are configured")
+        return requirements
+
+    def run(self, year: int, month: int, allow_demotion: bool = False,
+            apply_rank_changes: bool = False) -> Dict[str, Any]:
+        requirements = self.load_requirements()
+        period_start, period_end = month_bounds(year, month)
+        network = load_network(self.db)
+        sellers, volumes, _ = month_sales(self.db, network, period_start, period_end)
+        personal = np.zeros(len(network.ids), dtype=float)
+        np.add.at(personal, sellers, volumes)
+        group, legs, reachable = self.aggregate(network, personal)
+
+        eligible = reachable & network.active
+        qualified_rank = np.zeros(len(network.ids), dtype=np.int64)
+        for rank_index, (min_personal, min_group, min_legs) in requirements.items():
+            meets = eligible & (personal >= min_personal) & (group >= min_group) & (legs >= min_legs)
+            qualified_rank = np.where(meets, np.maximum(qualified_rank, rank_index), qualified_rank)
+        new_rank = qualified_rank if allow_demotion else np.maximum(network.rank, qualified_rank)
+        new_rank = np.where(reachable, new_rank, network.rank)
+        changed = np.nonzero(new_rank != network.rank)[0]
+
+        # Naive UTC, like the other DateTime columns of the MLM tables
+        stored_start = period_start.replace(tzinfo=None)
+        stored_end = period_end.replace(tzinfo=None)
+        rules = self.db.query(CommissionRule).filter(CommissionRule.is_active == True).all()
+        now = utc_now().replace(tzinfo=None)
+        evaluated = np.nonzero(reachable)[0]
+        qualified_counts = {}
+
+        try:
+            self.db.query(CommissionQualification).filter(
+                CommissionQualification.period_start == stored_start,
+                CommissionQualification.period_end == stored_end
+            ).delete(synchronize_session=False)
+
+            for rule in rules:
+                measure = personal if rule.commission_type in PERSONAL_VOLUME_RULES else group
+                qualified = eligible & (measure >= (rule.min_volume or 0))
+                if rule.min_rank is not None:
+                    qualified &= new_rank >= RANK_ORDER.index(rule.min_rank)
+                qualified_counts[rule.id] = int(qualified[evaluated].sum())
+                for start in range(0, len(evaluated), QUALIFICATION_BATCH_SIZE):
+                    chunk = evaluated[start:start + QUALIFICATION_BATCH_SIZE]
+                    self.db.execute(insert(CommissionQualification), [
+                        {
+                            "partner_id": int(network.ids[position]),
+                            "rule_id": rule.id,
+                            "period_start": stored_start,
+                            "period_end": stored_end,
+                            "volume_achieved": float(measure[position]),
+                            "status": QualificationStatus.QUALIFIED if qualified[position] else QualificationStatus.NOT_QUALIFIED,
+                            "qualified_at": now if qualified[position] else None
+                        }
+                        for position in chunk.tolist()
+                    ])
+
+            rank_changes = [
+                {"id": int(network.ids[position]), "level": RANK_ORDER[new_rank[position]]}
+                for position in changed.tolist()
+            ] if apply_rank_changes else []
+            for start in range(0, len(rank_changes), QUALIFICATION_BATCH_SIZE):
+                self.db.execute(update(MLMPartner), rank_changes[start:start + QUALIFICATION_BATCH_SIZE])
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        mlm_tree_cache.invalidate(change["id"] for change in rank_changes)
+
+        return {
+            "period_start": period_start,
+            "period_end": period_end,
+            "partners": len(network.ids),
+            "evaluated": len(evaluated),
+            "unreachable": len(network.ids) - len(evaluated),
+            "sales_volume": float(personal.sum()),
+            "promotions": int((new_rank[changed] > network.rank[changed]).sum()),
+            "demotions": int((new_rank[changed] < network.rank[changed]).sum()),
+            "rank_changes_applied": apply_rank_changes,
+            "rank_distribution": {
+                rank.value: int((new_rank == index).sum()) for index, rank in enumerate(RANK_ORDER)
+            },
+            "rules_evaluated": len(rules),
+            "qualified_by_rule": qualified_counts
+        }
+
+def run_qualification_job(year: int, month: int, allow_demotion: bool = False,
+                          apply_rank_changes: bool = False) -> None:
+    """Background task entry point; uses its own session since the request's is closed"""
+    db = SessionLocal()
+    try:
+        RankQualificationEngine(db).run(year, month, allow_demotion, apply_rank_changes)
+    finally:
+        db.close()
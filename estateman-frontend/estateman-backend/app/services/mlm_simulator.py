@@ -0,0 +1,168 @@
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from ..models.mlm import MLMPartner, PartnerLevel
+from ..models.realtor import Realtor, Transaction, TransactionStatus
+from ..schemas.mlm import CommissionPlan, CommissionPlanLevel
+from .mlm_commissions import COMMISSION_RATES
+
+# Rank order used for min_rank comparisons, lowest first
+RANK_ORDER = list(PartnerLevel)
+
+def live_plan() -> CommissionPlan:
+    """The plan MLMCommissionEngine pays today: fixed rates, no rank requirements"""
+    return CommissionPlan(levels=[CommissionPlanLevel(level=level, rate=rate) for level, rate in COMMISSION_RATES.items()])
+
+class NetworkArrays:
+    """The partner forest as parallel arrays indexed by position.
+
+    `parent[i]` is the position of partner i's sponsor, or -1 for roots and
+    sponsors that no longer exist.
+    """
+
+    def __init__(self, ids: np.ndarray, parent: np.ndarray, active: np.ndarray, rank: np.ndarray):
+        self.ids = ids
+        self.parent = parent
+        self.active = active
+        self.rank = rank
+
+    def positions(self, partner_ids) -> np.ndarray:
+        """Positions of the given partner ids, -1 for unknown ones"""
+        partner_ids = np.asarray(partner_ids, dtype=np.int64)
+        if not len(self.ids):
+            return np.full(len(partner_ids), -1, dtype=np.int64)
+        found = np.minimum(np.searchsorted(self.ids, partner_ids), len(self.ids) - 1)
+        return np.where(self.ids[found] == partner_ids, found, -1)
+
+def month_bounds(year: int, month: int) -> Tuple[datetime, datetime]:
+    """UTC start of the month and of the next one"""
+    return (
+        datetime(year, month, 1, tzinfo=timezone.utc),
+        datetime(year + month // 12, month % 12 + 1, 1, tzinfo=timezone.utc)
+    )
+
+def load_network(db: Session) -> NetworkArrays:
+    """Every partner in one query, as parent-index arrays ordered by id"""
+    rows = db.query(
+        MLMPartner.id, MLMPartner.sponsor_id, MLMPartner.is_active, MLMPartner.level
+    ).order_by(MLMPartner.id).all()
+    ids = np.array([row.id for row in rows], dtype=np.int64)
+    network = NetworkArrays(
+        ids=ids,
+        parent=np.full(len(rows), -1, dtype=np.int64),
+        active=np.array([bool(row.is_active) for row in rows], dtype=bool),
+        rank=np.array([RANK_ORDER.index(row.level or PartnerLevel.ASSOCIATE) for row in rows], dtype=np.int64)
+    )
+    sponsored = np.array([row.sponsor_id is not None for row in rows], dtype=bool)
+    if sponsored.any():
+        network.parent[sponsored] = network.positions([row.sponsor_id for row in rows if row.sponsor_id is not None])
+    return network
+
+def month_sales(db: Session, network: NetworkArrays, period_start: datetime, period_end: datetime):
+    """Per-seller positions, volumes and sale counts of the completed sales closed in the period"""
+    rows = db.query(
+        MLMPartner.id, func.sum(Transaction.sale_price), func.count(Transaction.id)
+    ).join(
+        Realtor, Realtor.id == Transaction.realtor_id
+    ).join(
+        MLMPartner, MLMPartner.user_id == Realtor.user_id
+    ).filter(
+        Transaction.status == TransactionStatus.COMPLETED,
+        Transaction.closing_date >= period_start,
+        Transaction.closing_date < period_end,
+        Transaction.sale_price.isnot(None)
+    ).group_by(MLMPartner.id).all()
+    sellers = network.positions([row[0] for row in rows])
+    volumes = np.array([float(row[1] or 0) for row in rows], dtype=float)
+    counts = np.array([row[2] for row in rows], dtype=np.int64)
+    known = sellers >= 0
+    return sellers[known], volumes[known], counts[known]
+
+class CommissionSimulator:
+    """Evaluates commission plans over a month of real sales without writing anything.
+
+    The network is loaded once into parent-index arrays and the month's
+    completed sales are summed per selling partner. Because commissions are
+    linear in the sale amount, each plan is then evaluated one level at a
+    time for all sellers together: step every seller's pointer to its next
+    sponsor, stop chains at inactive sponsors (as the live calculator does),
+    and pay the level's rate to sponsors meeting its rank requirement.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def evaluate(self, network: NetworkArrays, plan: CommissionPlan, sellers: np.ndarray,
+                 volumes: np.ndarray, rank: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+        """Payout totals per level and per recipient rank for one plan"""
+        rank = network.rank if rank is None else rank
+        levels = {entry.level: entry for entry in plan.levels}
+        depth = max(levels)
+        by_level = np.zeros(depth, dtype=float)
+        by_rank = np.zeros(len(RANK_ORDER), dtype=float)
+
+        current = sellers.copy()
+        for level in range(1, depth + 1):
+            current = np.where(current >= 0, network.parent[np.maximum(current, 0)], -1)
+            # An inactive sponsor ends the chain, exactly like the live sponsor walk
+            current = np.where((current >= 0) & network.active[np.maximum(current, 0)], current, -1)
+            reached = current >= 0
+            if not reached.any():
+                break
+            entry = levels.get(level)
+            if entry is None or entry.rate == 0:
+                continue
+            paid = reached.copy()
+            if entry.min_rank is not None:
+                paid &= rank[np.maximum(current, 0)] >= RANK_ORDER.index(entry.min_rank)
+            payouts = volumes[paid] * entry.rate
+            by_level[level - 1] = payouts.sum()
+            by_rank += np.bincount(rank[current[paid]], weights=payouts, minlength=len(RANK_ORDER))
+        return {"by_level": by_level, "by_rank": by_rank}
+
+    def simulate_month(self, year: int, month: int, proposed: CommissionPlan,
+                       baseline: Optional[CommissionPlan] = None,
+                       rank_overrides: Optional[Dict[int, PartnerLevel]] = None,
+                       volume_multiplier: float = 1.0) -> Dict[str, Any]:
+        period_start, period_end = month_bounds(year, month)
+        network = load_network(self.db)
+        sellers, volumes, counts = month_sales(self.db, network, period_start, period_end)
+
+        proposed_rank = network.rank
+        if rank_overrides:
+            proposed_rank = network.rank.copy()
+            positions = network.positions(list(rank_overrides))
+            for position, rank in zip(positions, rank_overrides.values()):
+                if position >= 0:
+                    proposed_rank[position] = RANK_ORDER.index(rank)
+
+        before = self.evaluate(network, baseline or live_plan(), sellers, volumes)
+        after = self.evaluate(network, proposed, sellers, volumes * volume_multiplier, proposed_rank)
+
+        depth = max(len(before["by_level"]), len(after["by_level"]))
+        before_levels = np.pad(before["by_level"], (0, depth - len(before["by_level"])))
+        after_levels = np.pad(after["by_level"], (0, depth - len(after["by_level"])))
+        baseline_total = float(before_levels.sum())
+        proposed_total = float(after_levels.sum())
+        return {
+            "period_start": period_start,
+            "period_end": period_end,
+            "partners": len(network.ids),
+            "selling_partners": len(sellers),
+            "sales": int(counts.sum()),
+            "sales_volume": float(volumes.sum()),
+            "baseline_total": baseline_total,
+            "proposed_total": proposed_total,
+            "difference": proposed_total - baseline_total,
+            "by_level": self._deltas("level", range(1, depth + 1), before_levels, after_levels),
+            "by_rank": self._deltas("rank", [rank.value for rank in RANK_ORDER], before["by_rank"], after["by_rank"])
+        }
+
+    @staticmethod
+    def _deltas(key: str, labels, baseline: np.ndarray, proposed: np.ndarray) -> List[Dict[str, Any]]:
+        return [
+            {key: label, "baseline": float(old), "proposed": float(new), "difference": float(new - old)}
+            for label, old, new in zip(labels, baseline, proposed)
+        ]
@@ -0,0 +1,116 @@
+import threading
+import time
+from typing import Any, Dict, FrozenSet, Iterable, Optional, Tuple
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session, aliased
+from ..core.validation import sanitize_html
+from ..models.mlm import MLMPartner, MLMPartnerClosure
+from ..models.user import User
+
+DEFAULT_TREE_DEPTH = 3
+MAX_TREE_DEPTH = 10
+# Writes made through other worker processes show up after at most this long
+TREE_MAX_AGE_SECONDS = 60
+TREE_CACHE_MAX_ENTRIES = 512
+
+class MLMTreeCache:
+    """Process-local cache of rendered subtrees keyed by (root partner, depth).
+
+    Each entry remembers which partners it shows, so a change to one partner
+    only drops the subtrees that contain it. Partner writes in this process
+    invalidate; the max age bounds staleness against other processes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: Dict[Tuple[int, int], Tuple[float, FrozenSet[int], Dict[str, Any]]] = {}
+
+    def get(self, root_id: int, depth: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get((root_id, depth))
+            if entry is None or time.monotonic() - entry[0] > TREE_MAX_AGE_SECONDS:
+                return None
+            return entry[2]
+
+    def set(self, root_id: int, depth: int, members: Iterable[int], tree: Dict[str, Any]) -> None:
+        with self._lock:
+            if len(self._entries) >= TREE_CACHE_MAX_ENTRIES:
+                oldest = min(self._entries, key=lambda key: self._entries[key][0])
+                del self._entries[oldest]
+            self._entries[(root_id, depth)] = (time.monotonic(), frozenset(members), tree)
+
+    def invalidate(self, partner_ids: Optional[Iterable[int]] = None) -> None:
+        """Drop subtrees showing any of `partner_ids`, or everything when none are given"""
+        with self._lock:
+            if partner_ids is None:
+                self._entries.clear()
+                return
+            changed = set(partner_ids)
+            for key in [key for key, entry in self._entries.items() if entry[1] & changed]:
+                del self._entries[key]
+
+mlm_tree_cache = MLMTreeCache()
+
+class MLMTreeService:
+    """Depth-limited sponsor trees read from the closure table.
+
+    A request loads `depth` levels below the root in one query, with each
+    node's direct child count. Nodes on the last level that still have
+    children carry an `expand_cursor`; fetching the tree rooted at that
+    cursor returns the next levels.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get_tree(self, root_id: int, depth: int = DEFAULT_TREE_DEPTH) -> Optional[Dict[str, Any]]:
+        depth = max(1, min(depth, MAX_TREE_DEPTH))
+        cached = mlm_tree_cache.get(root_id, depth)
+        if cached is not None:
+            return cached
+
+        children = aliased(MLMPartnerClosure)
+        child_count = select(func.count()).where(
+            children.ancestor_id == MLMPartner.id,
+            children.depth == 1
+        ).scalar_subquery()
+        rows = self.db.query(
+            MLMPartner, MLMPartnerClosure.depth, User.first_name, User.last_name,
+            User.profile_picture, child_count.label("child_count")
+        ).join(
+            MLMPartnerClosure, MLMPartnerClosure.descendant_id == MLMPartner.id
+        ).outerjoin(
+            User, User.id == MLMPartner.user_id
+        ).filter(
+            MLMPartnerClosure.ancestor_id == root_id,
+            MLMPartnerClosure.depth <= depth
+        ).order_by(MLMPartnerClosure.depth, MLMPartner.id).all()
+        if not rows:
+            return None
+
+        nodes: Dict[int, Dict[str, Any]] = {}
+        for partner, node_depth, first_name, last_name, avatar, count in rows:
+            name = f"{first_name} {last_name}" if first_name is not None else f"Partner {partner.id}"
+            node = {
+                "id": str(partner.id),
+                "name": sanitize_html(name),
+                "level": partner.level.value,
+                "referral_id": partner.referral_code,
+                "direct_referrals": partner.direct_referrals_count or 0,
+                "monthly_commission": partner.monthly_commission or 0.0,
+                "avatar": avatar,
+                "child_count": count,
+                "expand_cursor": str(partner.id) if node_depth == depth and count else None,
+                "children": []
+            }
+            nodes[partner.id] = node
+            # Rows come nearest level first, so a sponsor is always placed before its children
+            if node_depth > 0:
+                nodes[partner.sponsor_id]["children"].append(node)
+
+        tree = nodes[root_id]
+        root = rows[0][0]
+        tree["total_network_size"] = root.total_network_size or 0
+        tree["network_depth"] = root.network_depth or 0
+        mlm_tree_cache.set(root_id, depth, nodes, tree)
+        return tree
@@ -16,6 +16,14 @@ class NotificationService:
         self.db.refresh(notification)
         return notification
 
+    def create_notifications(self, notifications_data: List[NotificationCreate]) -> int:
+        """Insert a batch of notifications in one round trip and commit"""
+        if not notifications_data:
+            return 0
+        self.db.bulk_save_objects([Notification(**data.dict()) for data in notifications_data])
+        self.db.commit()
+        return len(notifications_data)
+
     def get_user_notifications(self, user_id: int, skip: int = 0, limit: int = 50, unread_only: bool = False) -> List[Notification]:
         query = self.db.query(Notification).filter(
             or_(
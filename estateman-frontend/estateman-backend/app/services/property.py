@@ -1,21 +1,43 @@
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func, desc, and_, or_
+import asyncio
+import logging
+import os
+import uuid
+import aiofiles
+from fastapi import BackgroundTasks
+from sqlalchemy.orm import Session, joinedload, selectinload
+from sqlalchemy import func, desc, and_, or_, text, literal_column, case, select, update
 from ..models.property import Property, PropertyImage, PropertyDocument, PropertyValuation, PropertyShowing, PropertyStatus, PropertyType
 from ..models.user import User
-from typing import Dict, List, Any, Optional
+from ..core.config import settings
+from ..core.geo_utils import (
+    EARTH_RADIUS_KM, encode_geohash, geohash_cover, radius_bounding_box, haversine_km,
+    parse_polygon, polygon_bounding_box, point_in_polygon, polygon_to_wkt
+)
+from .property_search import property_search_index
+from .property_facets import property_facet_index
+from .image_pipeline import generate_variants
+from .cma_engine import cma_engine
+from .market_stats import MarketStatsService
+from .client_matching import (
+    PROPERTY_MATCH_FIELDS, ClientMatchingService, run_client_match_job, run_property_match_job
+)
+from .saved_search import SavedSearchService
+from .property_duplicates import PropertyDuplicateService
+from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime
 
+logger = logging.getLogger(__name__)
+
+PROPERTY_IMAGE_DIR = "uploads/properties"
+SEARCH_HEADLINE_OPTIONS = "StartSel=<mark>, StopSel=</mark>, MaxWords=20, MinWords=8, MaxFragments=2"
+
 class PropertyService:
     def __init__(self, db: Session):
         self.db = db
     
-    def get_properties(self, skip: int = 0, limit: int = 100, filters: Dict = None) -> List[Property]:
-        """Get properties with optional filters"""
-        query = self.db.query(Property).options(
-            joinedload(Property.agent),
-            joinedload(Property.images),
-            joinedload(Property.documents)
-        )
+    def get_properties(self, skip: int = 0, limit: int = 100, filters: Dict = None) -> List[Dict[str, Any]]:
+        """Get property cards with optional filters"""
+        query = self._property_card_query()
         
         if filters:
             if filters.get('status'):
@@ -32,87 +54,362 @@ class PropertyService:
                 query = query.filter(Property.bedrooms >= filters['bedrooms'])
             if filters.get('bathrooms'):
                 query = query.filter(Property.bathrooms >= filters['bathrooms'])
+            
+            query, polygon = self._apply_spatial_filter(query, filters)
+            if polygon:
+                # Geohash cells only approximate the polygon, so refine before paginating
+                candidates = [
+                    row for row in query.all()
+                    if point_in_polygon(row.latitude, row.longitude, polygon)
+                ]
+                return [self._property_card(row) for row in candidates[skip:skip + limit]]
+        
+        return [self._property_card(row) for row in query.order_by(Property.id).offset(skip).limit(limit).all()]
+    
+    def _property_card_query(self):
+        """Project only the fields a listing card needs.
+        
+        The agent name comes from a many-to-one outer join and the primary image
+        from a correlated subquery, so each property is exactly one row however
+        many images and documents it has.
+        """
+        primary_image_url = self.db.query(PropertyImage.image_url).filter(
+            PropertyImage.property_id == Property.id
+        ).order_by(
+            desc(PropertyImage.is_primary), PropertyImage.order_index, PropertyImage.id
+        ).limit(1).correlate(Property).scalar_subquery()
+        return self.db.query(
+            Property.id, Property.title, Property.property_type, Property.status, Property.price,
+            Property.bedrooms, Property.bathrooms, Property.square_feet, Property.address,
+            Property.city, Property.state, Property.zip_code, Property.latitude, Property.longitude,
+            Property.agent_id, Property.created_at,
+            (User.first_name + ' ' + User.last_name).label('agent_name'),
+            primary_image_url.label('primary_image_url'),
+            Property.images_count
+        ).outerjoin(User, User.id == Property.agent_id)
+    
+    def _property_card(self, row) -> Dict[str, Any]:
+        return {
+            "id": row.id,
+            "title": row.title,
+            "property_type": row.property_type.value,
+            "status": row.status.value if row.status else None,
+            "price": row.price,
+            "bedrooms": row.bedrooms,
+            "bathrooms": row.bathrooms,
+            "square_feet": row.square_feet,
+            "address": row.address,
+            "city": row.city,
+            "state": row.state,
+            "zip_code": row.zip_code,
+            "latitude": row.latitude,
+            "longitude": row.longitude,
+            "agent_id": row.agent_id,
+            "agent_name": row.agent_name,
+            "primary_image_url": row.primary_image_url,
+            "images_count": row.images_count or 0,
+            "created_at": row.created_at
+        }
+    
+    def _apply_spatial_filter(self, query, filters: Dict) -> Tuple[Any, Optional[List[Tuple[float, float]]]]:
+        """Apply bounds, radius or polygon filters.
+        
+        Returns the filtered query and, when the polygon could only be matched
+        approximately in SQL, the vertices the caller must refine against.
+        """
+        if filters.get('polygon'):
+            vertices = parse_polygon(filters['polygon'])
+            if vertices:
+                query = query.filter(Property.latitude.isnot(None), Property.longitude.isnot(None))
+                if settings.SPATIAL_BACKEND == "postgis":
+                    return query.filter(
+                        text("ST_Covers(ST_GeogFromText(:polygon_wkt), properties.geog)").bindparams(
+                            polygon_wkt=f"SRID=4326;{polygon_to_wkt(vertices)}"
+                        )
+                    ), None
+                return self._filter_by_box(query, *polygon_bounding_box(vertices)), vertices
+        
+        if filters.get('latitude') is not None and filters.get('longitude') is not None and filters.get('radius_km'):
+            lat, lng, radius_km = filters['latitude'], filters['longitude'], filters['radius_km']
+            query = query.filter(Property.latitude.isnot(None), Property.longitude.isnot(None))
+            if settings.SPATIAL_BACKEND == "postgis":
+                return query.filter(
+                    text("ST_DWithin(properties.geog, ST_SetSRID(ST_MakePoint(:center_lng, :center_lat), 4326)::geography, :radius_m)").bindparams(
+                        center_lng=lng, center_lat=lat, radius_m=radius_km * 1000
+                    )
+                ), None
+            query = self._filter_by_box(query, *radius_bounding_box(lat, lng, radius_km))
+            return query.filter(self._distance_km_expression(lat, lng) <= radius_km), None
+        
+        if filters.get('bounds'):
+            try:
+                lat1, lng1, lat2, lng2 = map(float, filters['bounds'].split(','))
+                query = self._filter_by_box(query, min(lat1, lat2), min(lng1, lng2), max(lat1, lat2), max(lng1, lng2))
+            except ValueError:
+                pass  # Invalid bounds format, return all properties
         
-        return query.offset(skip).limit(limit).all()
+        return query, None
+    
+    def _filter_by_box(self, query, min_lat: float, min_lng: float, max_lat: float, max_lng: float):
+        """Restrict to a bounding box, narrowed first by indexed geohash prefixes"""
+        prefixes = geohash_cover(min_lat, min_lng, max_lat, max_lng)
+        if prefixes:
+            query = query.filter(or_(*[Property.geohash.like(f"{prefix}%") for prefix in prefixes]))
+        return query.filter(
+            Property.latitude.between(min_lat, max_lat),
+            Property.longitude.between(min_lng, max_lng)
+        )
+    
+    def _distance_km_expression(self, latitude: float, longitude: float):
+        """Haversine distance from a point to each property, as a SQL expression"""
+        d_lat = func.radians(Property.latitude - latitude)
+        d_lng = func.radians(Property.longitude - longitude)
+        a = func.power(func.sin(d_lat / 2), 2) + func.cos(func.radians(latitude)) * func.cos(
+            func.radians(Property.latitude)
+        ) * func.power(func.sin(d_lng / 2), 2)
+        return 2 * EARTH_RADIUS_KM * func.asin(func.sqrt(a))
+    
+    def _sync_geohash(self, property_obj: Property) -> None:
+        """Keep the geohash index column in step with latitude/longitude"""
+        if property_obj.latitude is not None and property_obj.longitude is not None:
+            property_obj.geohash = encode_geohash(property_obj.latitude, property_obj.longitude)
+        else:
+            property_obj.geohash = None
+    
+    def get_faceted_properties(self, skip: int = 0, limit: int = 20, filters: Dict = None) -> Dict[str, Any]:
+        """Get a page of properties together with facet counts and a price histogram"""
+        if property_facet_index.is_stale:
+            property_facet_index.build(self.db.query(
+                Property.id, Property.price, Property.status, Property.property_type,
+                Property.city, Property.bedrooms, Property.bathrooms
+            ).yield_per(1000))
+        
+        result = property_facet_index.query(filters or {}, skip=skip, limit=limit)
+        page_ids = result.pop("ids")
+        properties_by_id = {
+            row.id: self._property_card(row)
+            for row in self._property_card_query().filter(Property.id.in_(page_ids)).all()
+        } if page_ids else {}
+        
+        result["properties"] = [properties_by_id[pid] for pid in page_ids if pid in properties_by_id]
+        return result
     
     def get_property_by_id(self, property_id: int) -> Optional[Property]:
         """Get property by ID with all relationships"""
+        # selectinload keeps images and documents as separate queries instead of
+        # multiplying them together in one joined result
         return self.db.query(Property).options(
             joinedload(Property.agent),
-            joinedload(Property.images),
-            joinedload(Property.documents)
+            selectinload(Property.images),
+            selectinload(Property.documents)
         ).filter(Property.id == property_id).first()
     
-    def create_property(self, property_data: Dict) -> Property:
-        """Create new property"""
+    def create_property(self, property_data: Dict, background_tasks: Optional[BackgroundTasks] = None) -> Property:
+        """Create new property; client matches are scored in `background_tasks` when given"""
         property_obj = Property(**property_data)
+        self._sync_geohash(property_obj)
+        duplicates = PropertyDuplicateService(self.db)
+        duplicates.sync_address_key(property_obj)
+        property_obj.duplicate_of_id = duplicates.canonical_listing_id(duplicates.find_duplicates(
+            property_obj.address, property_obj.city, property_obj.state,
+            property_obj.latitude, property_obj.longitude
+        ))
         self.db.add(property_obj)
         self.db.commit()
         self.db.refresh(property_obj)
+        self._after_property_write(property_obj, background_tasks=background_tasks)
         return property_obj
     
-    def update_property(self, property_id: int, property_data: Dict) -> Optional[Property]:
-        """Update property"""
+    def update_property(self, property_id: int, property_data: Dict,
+                        background_tasks: Optional[BackgroundTasks] = None) -> Optional[Property]:
+        """Update property; client matches are re-scored only if a field they use changed"""
         property_obj = self.get_property_by_id(property_id)
         if property_obj:
+            previous_cell = self._market_cell(property_obj)
+            rescore = any(
+                getattr(property_obj, key) != value for key, value in property_data.items() if key in PROPERTY_MATCH_FIELDS
+            )
             for key, value in property_data.items():
                 setattr(property_obj, key, value)
+            self._sync_geohash(property_obj)
+            PropertyDuplicateService(self.db).sync_address_key(property_obj)
             self.db.commit()
             self.db.refresh(property_obj)
+            self._after_property_write(property_obj, previous_cell, rescore, background_tasks)
         return property_obj
     
-    def delete_property(self, property_id: int) -> bool:
+    def delete_property(self, property_id: int, background_tasks: Optional[BackgroundTasks] = None) -> bool:
         """Delete property"""
         property_obj = self.get_property_by_id(property_id)
         if property_obj:
+            previous_cell = self._market_cell(property_obj)
+            matched_clients = ClientMatchingService(self.db).clients_matching(property_id)
             self.db.delete(property_obj)
             self.db.commit()
+            self._after_property_delete(property_id, previous_cell, matched_clients, background_tasks)
             return True
         return False
     
-    def search_properties(self, search_term: str) -> List[Property]:
-        """Search properties by title, description, or address"""
-        return self.db.query(Property).options(
-            joinedload(Property.agent),
-            joinedload(Property.images)
+    def search_properties(self, search_term: str, skip: int = 0, limit: int = 20) -> Dict[str, Any]:
+        """Ranked full-text search over title, description, address and city"""
+        if self.db.bind.dialect.name != "postgresql":
+            return self._search_properties_in_process(search_term, skip, limit)
+        
+        ts_query = func.websearch_to_tsquery('english', search_term)
+        search_vector = literal_column('properties.search_vector')
+        rank = func.ts_rank_cd(search_vector, ts_query) + func.similarity(Property.address, search_term)
+        snippet = func.ts_headline(
+            'english', func.coalesce(Property.description, Property.title), ts_query, SEARCH_HEADLINE_OPTIONS
+        )
+        
+        rows = self._property_card_query().add_columns(
+            rank.label('rank'),
+            snippet.label('snippet'),
+            func.count().over().label('total')
         ).filter(
             or_(
-                Property.title.ilike(f"%{search_term}%"),
-                Property.description.ilike(f"%{search_term}%"),
-                Property.address.ilike(f"%{search_term}%"),
-                Property.city.ilike(f"%{search_term}%")
+                search_vector.op('@@')(ts_query),
+                Property.address.op('%')(search_term)
             )
-        ).all()
+        ).order_by(desc('rank'), Property.id).offset(skip).limit(limit).all()
+        
+        return {
+            "properties": [self._search_result(row, row.rank, row.snippet) for row in rows],
+            "total": rows[0].total if rows else 0,
+            "skip": skip,
+            "limit": limit
+        }
+    
+    def _search_properties_in_process(self, search_term: str, skip: int, limit: int) -> Dict[str, Any]:
+        """Search fallback for databases without tsvector support"""
+        if not property_search_index.is_built:
+            property_search_index.build(self.db.query(
+                Property.id, Property.title, Property.description, Property.address, Property.city
+            ).yield_per(1000))
+        
+        matches = property_search_index.search(search_term)
+        page = matches[skip:skip + limit]
+        rows = {
+            row.id: row for row in self._property_card_query().filter(
+                Property.id.in_([property_id for property_id, _, _ in page])
+            ).all()
+        } if page else {}
+        
+        return {
+            "properties": [
+                self._search_result(rows[property_id], rank, snippet)
+                for property_id, rank, snippet in page if property_id in rows
+            ],
+            "total": len(matches),
+            "skip": skip,
+            "limit": limit
+        }
+    
+    def _search_result(self, row, rank: float, snippet: Optional[str]) -> Dict[str, Any]:
+        return {**self._property_card(row), "rank": float(rank or 0), "snippet": snippet}
+    
+    def _market_cell(self, property_obj: Property):
+        return MarketStatsService(self.db).cell_for(
+            property_obj.city, property_obj.property_type, property_obj.created_at
+        )
+    
+    def _after_property_write(self, property_obj: Property, previous_cell=None, rescore: bool = True,
+                              background_tasks: Optional[BackgroundTasks] = None) -> None:
+        """Keep in-process indexes and rollups in step with a committed property write"""
+        property_search_index.upsert(property_obj)
+        property_facet_index.upsert(property_obj)
+        cma_engine.invalidate(property_obj.id, property_obj.city)
+        cells = [cell for cell in (previous_cell, self._market_cell(property_obj)) if cell]
+        self._refresh_market_stats(cells)
+        if rescore:
+            # Scoring reads every client, so it stays off the request when it can
+            if background_tasks is not None:
+                background_tasks.add_task(run_property_match_job, property_obj.id)
+            else:
+                ClientMatchingService(self.db).refresh_property(property_obj.id)
+        SavedSearchService(self.db).alert_for_properties([property_obj])
+    
+    def _refresh_market_stats(self, cells) -> None:
+        """Refresh the rollup for a write that has already committed; a failure here must not fail it"""
+        try:
+            MarketStatsService(self.db).refresh_cells(cells)
+        except Exception:
+            # The scheduled rebuild (refresh_market_stats.py) repairs any cell left stale
+            self.db.rollback()
+            logger.exception("Market stats refresh failed for %s", cells)
+    
+    def _after_property_delete(self, property_id: int, previous_cell=None, matched_clients=(),
+                               background_tasks: Optional[BackgroundTasks] = None) -> None:
+        property_search_index.remove(property_id)
+        property_facet_index.remove(property_id)
+        cma_engine.invalidate(property_id)
+        if previous_cell:
+            self._refresh_market_stats([previous_cell])
+        # The delete cascades to their match rows; refill the slot it left
+        if background_tasks is not None:
+            background_tasks.add_task(run_client_match_job, list(matched_clients))
+        else:
+            ClientMatchingService(self.db).refresh_clients(matched_clients)
     
     def get_property_analytics(self, property_id: int) -> Dict[str, Any]:
         """Get analytics for a specific property"""
-        property_obj = self.get_property_by_id(property_id)
+        property_obj = self.db.query(Property).filter(Property.id == property_id).first()
         if not property_obj:
             return {}
         
-        showings_count = self.db.query(PropertyShowing).filter(
-            PropertyShowing.property_id == property_id
-        ).count()
-        
-        valuations = self.db.query(PropertyValuation).filter(
+        valuations_count = self.db.query(func.count(PropertyValuation.id)).filter(
             PropertyValuation.property_id == property_id
-        ).order_by(desc(PropertyValuation.valuation_date)).all()
+        ).scalar()
         
         return {
             "property_id": property_id,
-            "showings_count": showings_count,
-            "valuations_count": len(valuations),
-            "latest_valuation": valuations[0].valuation_amount if valuations else None,
+            "showings_count": property_obj.showings_count or 0,
+            "valuations_count": valuations_count,
+            "latest_valuation": property_obj.latest_valuation_amount,
+            "latest_valuation_date": property_obj.latest_valuation_date,
             "days_on_market": (datetime.now() - property_obj.created_at).days,
-            "images_count": len(property_obj.images),
-            "documents_count": len(property_obj.documents)
+            "images_count": property_obj.images_count or 0,
+            "documents_count": property_obj.documents_count or 0
         }
     
+    def _adjust_counter(self, property_id: int, column, delta: int) -> None:
+        """Atomically bump a denormalized counter inside the caller's transaction"""
+        self.db.execute(
+            update(Property).where(Property.id == property_id).values(
+                {column: func.coalesce(column, 0) + delta}
+            )
+        )
+    
+    def recompute_property_counters(self) -> int:
+        """Repair job: recompute every counter and latest valuation in one statement"""
+        def child_count(model):
+            return select(func.count(model.id)).where(model.property_id == Property.id).correlate(Property).scalar_subquery()
+        
+        latest_amount = select(PropertyValuation.valuation_amount).where(
+            PropertyValuation.property_id == Property.id
+        ).order_by(desc(PropertyValuation.valuation_date), desc(PropertyValuation.id)).limit(1).correlate(Property).scalar_subquery()
+        latest_date = select(func.max(PropertyValuation.valuation_date)).where(
+            PropertyValuation.property_id == Property.id
+        ).correlate(Property).scalar_subquery()
+        
+        result = self.db.execute(
+            update(Property).values(
+                images_count=child_count(PropertyImage),
+                documents_count=child_count(PropertyDocument),
+                showings_count=child_count(PropertyShowing),
+                latest_valuation_amount=latest_amount,
+                latest_valuation_date=latest_date
+            )
+        )
+        self.db.commit()
+        return result.rowcount
+    
     def add_property_image(self, property_id: int, image_data: Dict) -> PropertyImage:
         """Add image to property"""
         image_data['property_id'] = property_id
         image_obj = PropertyImage(**image_data)
         self.db.add(image_obj)
+        self._adjust_counter(property_id, Property.images_count, 1)
         self.db.commit()
         self.db.refresh(image_obj)
         return image_obj
@@ -122,6 +419,7 @@ class PropertyService:
         document_data['property_id'] = property_id
         document_obj = PropertyDocument(**document_data)
         self.db.add(document_obj)
+        self._adjust_counter(property_id, Property.documents_count, 1)
         self.db.commit()
         self.db.refresh(document_obj)
         return document_obj
@@ -131,6 +429,7 @@ class PropertyService:
         showing_data['property_id'] = property_id
         showing_obj = PropertyShowing(**showing_data)
         self.db.add(showing_obj)
+        self._adjust_counter(property_id, Property.showings_count, 1)
         self.db.commit()
         self.db.refresh(showing_obj)
         return showing_obj
@@ -140,6 +439,22 @@ class PropertyService:
         valuation_data['property_id'] = property_id
         valuation_obj = PropertyValuation(**valuation_data)
         self.db.add(valuation_obj)
+        self.db.flush()
+        
+        # valuation_date may come from the server default, so compare in SQL
+        valuation_date = select(PropertyValuation.valuation_date).where(
+            PropertyValuation.id == valuation_obj.id
+        ).scalar_subquery()
+        is_latest = or_(
+            Property.latest_valuation_date.is_(None),
+            Property.latest_valuation_date <= valuation_date
+        )
+        self.db.execute(
+            update(Property).where(Property.id == property_id).values(
+                latest_valuation_amount=case((is_latest, valuation_obj.valuation_amount), else_=Property.latest_valuation_amount),
+                latest_valuation_date=case((is_latest, valuation_date), else_=Property.latest_valuation_date)
+            )
+        )
         self.db.commit()
         self.db.refresh(valuation_obj)
         return valuation_obj
@@ -155,6 +470,7 @@ class PropertyService:
         image = self.db.query(PropertyImage).filter(PropertyImage.id == image_id).first()
         if image:
             self.db.delete(image)
+            self._adjust_counter(image.property_id, Property.images_count, -1)
             self.db.commit()
             return True
         return False
@@ -170,6 +486,7 @@ class PropertyService:
         document = self.db.query(PropertyDocument).filter(PropertyDocument.id == document_id).first()
         if document:
             self.db.delete(document)
+            self._adjust_counter(document.property_id, Property.documents_count, -1)
             self.db.commit()
             return True
         return False
@@ -190,47 +507,6 @@ class PropertyService:
             self.db.refresh(showing)
         return showing
     
-    async def bulk_import_properties(self, file, agent_id: int) -> Dict[str, Any]:
-        """Bulk import properties from CSV file"""
-        import csv
-        import io
-        
-        content = await file.read()
-        csv_content = content.decode('utf-8')
-        reader = csv.DictReader(io.StringIO(csv_content))
-        
-        created_count = 0
-        failed_count = 0
-        errors = []
-        
-        for row in reader:
-            try:
-                property_data = {
-                    'title': row.get('title', ''),
-                    'description': row.get('description'),
-                    'property_type': row.get('property_type', 'residential'),
-                    'price': float(row.get('price', 0)),
-                    'bedrooms': int(row.get('bedrooms', 0)) if row.get('bedrooms') else None,
-                    'bathrooms': int(row.get('bathrooms', 0)) if row.get('bathrooms') else None,
-                    'square_feet': float(row.get('square_feet', 0)) if row.get('square_feet') else None,
-                    'address': row.get('address', ''),
-                    'city': row.get('city', ''),
-                    'state': row.get('state', ''),
-                    'zip_code': row.get('zip_code', ''),
-                    'agent_id': agent_id
-                }
-                self.create_property(property_data)
-                created_count += 1
-            except Exception as e:
-                failed_count += 1
-                errors.append(f"Row {reader.line_num}: {str(e)}")
-        
-        return {
-            'created_count': created_count,
-            'failed_count': failed_count,
-            'errors': errors[:10]  # Limit to first 10 errors
-        }
-    
     def compare_properties(self, property_ids: List[int]) -> Dict[str, Any]:
         """Compare multiple properties"""
         properties = self.db.query(Property).filter(Property.id.in_(property_ids)).all()
@@ -257,27 +533,33 @@ class PropertyService:
         
         return {'properties': comparison_data}
     
-    def get_properties_map_data(self, bounds: Optional[str] = None) -> List[Dict[str, Any]]:
+    def get_properties_map_data(self, bounds: Optional[str] = None, latitude: Optional[float] = None,
+                                longitude: Optional[float] = None, radius_km: Optional[float] = None,
+                                polygon: Optional[str] = None) -> List[Dict[str, Any]]:
         """Get properties for map display"""
         query = self.db.query(Property).filter(
             Property.latitude.isnot(None),
             Property.longitude.isnot(None)
         )
         
-        if bounds:
-            try:
-                lat1, lng1, lat2, lng2 = map(float, bounds.split(','))
-                query = query.filter(
-                    Property.latitude.between(min(lat1, lat2), max(lat1, lat2)),
-                    Property.longitude.between(min(lng1, lng2), max(lng1, lng2))
-                )
-            except ValueError:
-                pass  # Invalid bounds format, return all properties
+        query, polygon_vertices = self._apply_spatial_filter(query, {
+            'bounds': bounds,
+            'latitude': latitude,
+            'longitude': longitude,
+            'radius_km': radius_km,
+            'polygon': polygon
+        })
         
         properties = query.all()
+        if polygon_vertices:
+            properties = [
+                prop for prop in properties
+                if point_in_polygon(prop.latitude, prop.longitude, polygon_vertices)
+            ]
         
-        return [
-            {
+        map_data = []
+        for prop in properties:
+            item = {
                 'id': prop.id,
                 'title': prop.title,
                 'price': prop.price,
@@ -289,25 +571,23 @@ class PropertyService:
                 'bedrooms': prop.bedrooms,
                 'bathrooms': prop.bathrooms
             }
-            for prop in properties
-        ]
+            if latitude is not None and longitude is not None and radius_km and not polygon:
+                item['distance_km'] = round(haversine_km(latitude, longitude, prop.latitude, prop.longitude), 3)
+            map_data.append(item)
+        
+        return map_data
     
-    def generate_cma_report(self, property_id: int) -> Dict[str, Any]:
+    def generate_cma_report(self, property_id: int, k: int = 5) -> Dict[str, Any]:
         """Generate Comparative Market Analysis report"""
         property_obj = self.get_property_by_id(property_id)
         if not property_obj:
             return {}
         
-        # Find comparable properties
-        comparables = self.db.query(Property).filter(
-            Property.id != property_id,
-            Property.city == property_obj.city,
-            Property.property_type == property_obj.property_type,
-            Property.bedrooms.between((property_obj.bedrooms or 0) - 1, (property_obj.bedrooms or 0) + 1),
-            Property.price.between(property_obj.price * 0.8, property_obj.price * 1.2)
-        ).limit(5).all()
+        # Rank every same-type property in the city by weighted feature distance
+        result = cma_engine.find_comparables(self.db, property_obj, k=k)
+        comparables = result["comparables"]
         
-        avg_price = sum(comp.price for comp in comparables) / len(comparables) if comparables else property_obj.price
+        avg_price = result["estimated_value"] or property_obj.price
         
         return {
             "property_id": property_id,
@@ -316,20 +596,14 @@ class PropertyService:
                 "price": property_obj.price,
                 "bedrooms": property_obj.bedrooms,
                 "bathrooms": property_obj.bathrooms,
-                "square_feet": property_obj.square_feet
+                "square_feet": property_obj.square_feet,
+                "year_built": property_obj.year_built
             },
-            "comparables": [
-                {
-                    "address": comp.address,
-                    "price": comp.price,
-                    "bedrooms": comp.bedrooms,
-                    "bathrooms": comp.bathrooms,
-                    "square_feet": comp.square_feet
-                }
-                for comp in comparables
-            ],
+            "comparables": comparables,
             "market_analysis": {
                 "average_price": avg_price,
+                "estimated_value": result["estimated_value"],
+                "confidence": result["confidence"],
                 "price_variance": ((property_obj.price - avg_price) / avg_price * 100) if avg_price else 0,
                 "recommendation": "competitive" if abs(property_obj.price - avg_price) / avg_price < 0.1 else "adjust_price"
             }
@@ -357,28 +631,47 @@ class PropertyService:
         if not property_obj:
             return {}
         
-        # Market statistics for the area
-        area_properties = self.db.query(Property).filter(
-            Property.city == property_obj.city,
-            Property.property_type == property_obj.property_type
-        ).all()
+        # Market statistics for the area come from the monthly rollup
+        market_stats = MarketStatsService(self.db)
+        monthly = market_stats.get_area_stats(property_obj.city, property_obj.property_type)
+        totals = market_stats.get_area_totals(property_obj.city, property_obj.property_type)
         
-        if not area_properties:
+        if not totals["count"]:
             return {"message": "Insufficient market data"}
         
-        avg_price = sum(prop.price for prop in area_properties) / len(area_properties)
-        avg_days_on_market = sum(
-            (datetime.now() - prop.created_at).days for prop in area_properties
-        ) / len(area_properties)
+        avg_price = totals["total_price"] / totals["count"]
+        avg_days_on_market = totals["total_days_on_market"] / totals["count"]
+        trend = market_stats.price_trend(monthly)
+        
+        if avg_days_on_market < 30:
+            market_health = "sellers_market"
+        elif avg_days_on_market > 90:
+            market_health = "buyers_market"
+        else:
+            market_health = "balanced"
         
         return {
             "property_id": property_id,
             "market_area": property_obj.city,
-            "total_properties": len(area_properties),
+            "total_properties": totals["count"],
             "average_price": avg_price,
             "average_days_on_market": avg_days_on_market,
-            "price_trends": "stable",
-            "market_health": "balanced",
+            "price_trends": trend["direction"],
+            "month_over_month_change": trend["month_over_month_change"],
+            "monthly_stats": [
+                {
+                    "month": stat.month.isoformat(),
+                    "listing_count": stat.listing_count,
+                    "sold_count": stat.sold_count,
+                    "mean_price": stat.mean_price,
+                    "median_price": stat.median_price,
+                    "mean_price_per_sqft": stat.mean_price_per_sqft,
+                    "median_price_per_sqft": stat.median_price_per_sqft,
+                    "mean_days_on_market": stat.mean_days_on_market
+                }
+                for stat in monthly
+            ],
+            "market_health": market_health,
             "report_date": datetime.now().isoformat()
         }
     
@@ -453,41 +746,63 @@ class PropertyService:
             "kit_status": "ready"
         }
     
-    async def upload_property_images(self, property_id: int, images) -> List[PropertyImage]:
-        """Upload multiple images for a property"""
-        import os
-        import uuid
+    async def upload_property_images(self, property_id: int, images) -> Tuple[List[PropertyImage], List[Dict[str, str]]]:
+        """Upload multiple images for a property, generating responsive variants in parallel"""
+        os.makedirs(PROPERTY_IMAGE_DIR, exist_ok=True)
+        
+        async def process(image) -> Dict[str, Any]:
+            base_name = uuid.uuid4().hex
+            file_extension = image.filename.split('.')[-1].lower() if '.' in image.filename else 'jpg'
+            source_path = os.path.join(PROPERTY_IMAGE_DIR, f"{base_name}_original.{file_extension}")
+            
+            async with aiofiles.open(source_path, "wb") as f:
+                while True:
+                    chunk = await image.read(1024 * 1024)
+                    if not chunk:
+                        break
+                    await f.write(chunk)
+            
+            try:
+                return await generate_variants(source_path, PROPERTY_IMAGE_DIR, base_name)
+            finally:
+                # The original still carries EXIF (GPS etc.), so only the stripped variants are kept
+                os.remove(source_path)
+        
+        results = await asyncio.gather(*[process(image) for image in images], return_exceptions=True)
         
         uploaded_images = []
-        upload_dir = "uploads/properties"
-        os.makedirs(upload_dir, exist_ok=True)
-        
-        for index, image in enumerate(images):
-            # Generate unique filename
-            file_extension = image.filename.split('.')[-1] if '.' in image.filename else 'jpg'
-            filename = f"{uuid.uuid4()}.{file_extension}"
-            file_path = os.path.join(upload_dir, filename)
-            
-            # Save file
-            content = await image.read()
-            with open(file_path, "wb") as f:
-                f.write(content)
+        failed = []
+        for index, (image, result) in enumerate(zip(images, results)):
+            if isinstance(result, Exception):
+                failed.append({"filename": image.filename, "error": str(result)})
+                continue
             
-            # Create database record
-            image_data = {
-                'property_id': property_id,
-                'image_url': f"/uploads/properties/{filename}",
-                'caption': image.filename,
-                'is_primary': index == 0,
-                'order_index': index
+            variants = {
+                name: {
+                    "width": variant["width"],
+                    "height": variant["height"],
+                    **{fmt: f"/{PROPERTY_IMAGE_DIR}/{filename}" for fmt, filename in variant["files"].items()}
+                }
+                for name, variant in result["variants"].items()
             }
-            
-            image_obj = PropertyImage(**image_data)
+            image_obj = PropertyImage(
+                property_id=property_id,
+                image_url=variants["full"]["jpg"],
+                caption=image.filename,
+                # The first image that made it, even if an earlier upload failed
+                is_primary=not uploaded_images,
+                order_index=index,
+                width=result["width"],
+                height=result["height"],
+                variants=variants
+            )
             self.db.add(image_obj)
             uploaded_images.append(image_obj)
         
+        if uploaded_images:
+            self._adjust_counter(property_id, Property.images_count, len(uploaded_images))
         self.db.commit()
         for img in uploaded_images:
             self.db.refresh(img)
         
-        return uploaded_images
\ No newline at end of file
+        return uploaded_images, failed
@@ -0,0 +1,182 @@
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import func, update
+from sqlalchemy.orm import Session
+from ..core.address_utils import address_key, normalize_address, street_position
+from ..core.geo_utils import encode_geohash
+from ..models.property import Property
+
+# ~38m x 19m cells; listings in the same cell with the same house and unit number are duplicates
+DUPLICATE_GEOHASH_PRECISION = 8
+CLUSTER_BATCH_SIZE = 5000
+
+class PropertyDuplicateService:
+    """Finds listings that describe the same address.
+
+    Two listings are duplicates when their address_key (hash of the canonical
+    street and unit, city and state) matches, or when they share a house and
+    unit number inside the same small geohash cell, which catches city/street
+    spelling variants. Different units of one building are never duplicates.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def sync_address_key(self, property_obj: Property) -> None:
+        property_obj.address_key = address_key(property_obj.address, property_obj.city, property_obj.state)
+
+    def find_duplicates(self, address: Optional[str], city: Optional[str], state: Optional[str],
+                        latitude: Optional[float] = None, longitude: Optional[float] = None,
+                        exclude_id: Optional[int] = None) -> List[int]:
+        """Ids of existing listings at the same address, via the address_key and geohash indexes"""
+        duplicates = set()
+        key = address_key(address, city, state)
+        if key:
+            duplicates.update(
+                property_id for (property_id,) in
+                self.db.query(Property.id).filter(Property.address_key == key)
+            )
+
+        position = street_position(normalize_address(address))
+        if position and latitude is not None and longitude is not None:
+            cell = encode_geohash(latitude, longitude, DUPLICATE_GEOHASH_PRECISION)
+            nearby = self.db.query(Property.id, Property.address).filter(Property.geohash.like(f"{cell}%"))
+            duplicates.update(
+                row.id for row in nearby if street_position(normalize_address(row.address)) == position
+            )
+
+        duplicates.discard(exclude_id)
+        return sorted(duplicates)
+
+    def canonical_listing_id(self, duplicate_ids: List[int]) -> Optional[int]:
+        """Earliest listing of the cluster the given duplicates belong to"""
+        if not duplicate_ids:
+            return None
+        return self.db.query(
+            func.min(func.coalesce(Property.duplicate_of_id, Property.id))
+        ).filter(Property.id.in_(duplicate_ids)).scalar()
+
+    def existing_keys(self, keys: List[str]) -> Dict[str, int]:
+        """address_key -> canonical listing id for the keys already in the table"""
+        if not keys:
+            return {}
+        rows = self.db.query(
+            Property.address_key, func.min(func.coalesce(Property.duplicate_of_id, Property.id))
+        ).filter(Property.address_key.in_(keys)).group_by(Property.address_key).all()
+        return dict(rows)
+
+    def cluster_duplicates(self) -> Dict[str, int]:
+        """Backfill address keys and link every duplicate to the earliest listing in its cluster.
+
+        Streams the table in keyset pages and unions listings by address_key and
+        by (geohash cell, house and unit number); only rows whose link changes are written.
+        """
+        parent: Dict[int, int] = {}
+
+        def find(property_id: int) -> int:
+            root = property_id
+            while parent[root] != root:
+                root = parent[root]
+            while parent[property_id] != root:
+                parent[property_id], property_id = root, parent[property_id]
+            return root
+
+        def union(a: int, b: int) -> None:
+            root_a, root_b = find(a), find(b)
+            if root_a != root_b:
+                parent[max(root_a, root_b)] = min(root_a, root_b)
+
+        first_by_key: Dict[Tuple[str, str], int] = {}
+        current_links: Dict[int, Optional[int]] = {}
+        backfilled = 0
+        last_id = 0
+        while True:
+            rows = self.db.query(
+                Property.id, Property.address, Property.city, Property.state,
+                Property.geohash, Property.address_key, Property.duplicate_of_id
+            ).filter(Property.id > last_id).order_by(Property.id).limit(CLUSTER_BATCH_SIZE).all()
+            if not rows:
+                break
+
+            key_updates = []
+            for row in rows:
+                parent[row.id] = row.id
+                current_links[row.id] = row.duplicate_of_id
+                key = address_key(row.address, row.city, row.state)
+                if key != row.address_key:
+                    key_updates.append({"id": row.id, "address_key": key})
+
+                cluster_keys = []
+                if key:
+                    cluster_keys.append(("address", key))
+                position = street_position(normalize_address(row.address))
+                if position and row.geohash:
+                    cluster_keys.append((row.geohash[:DUPLICATE_GEOHASH_PRECISION], position))
+                for cluster_key in cluster_keys:
+                    if cluster_key in first_by_key:
+                        union(first_by_key[cluster_key], row.id)
+                    else:
+                        first_by_key[cluster_key] = row.id
+
+            if key_updates:
+                self.db.execute(update(Property), key_updates)
+                self.db.commit()
+                backfilled += len(key_updates)
+            last_id = rows[-1].id
+
+        cluster_sizes: Dict[int, int] = defaultdict(int)
+        link_updates = []
+        for property_id, current in current_links.items():
+            root = find(property_id)
+            cluster_sizes[root] += 1
+            link = root if root != property_id else None
+            if link != current:
+                link_updates.append({"id": property_id, "duplicate_of_id": link})
+
+        for start in range(0, len(link_updates), CLUSTER_BATCH_SIZE):
+            self.db.execute(update(Property), link_updates[start:start + CLUSTER_BATCH_SIZE])
+            self.db.commit()
+
+        return {
+            "properties_scanned": len(current_links),
+            "address_keys_backfilled": backfilled,
+            "clusters": sum(1 for size in cluster_sizes.values() if size > 1),
+            "duplicates": sum(size - 1 for size in cluster_sizes.values()),
+            "links_updated": len(link_updates)
+        }
+
+    def get_duplicate_clusters(self, skip: int = 0, limit: int = 50) -> Dict[str, Any]:
+        """Clusters found by the last run, keyed by their canonical listing"""
+        roots_query = self.db.query(Property.duplicate_of_id).filter(
+            Property.duplicate_of_id.isnot(None)
+        ).distinct()
+        total = roots_query.count()
+        roots = [root for (root,) in roots_query.order_by(Property.duplicate_of_id).offset(skip).limit(limit)]
+
+        members: Dict[int, List[Dict[str, Any]]] = defaultdict(list)
+        if roots:
+            rows = self.db.query(
+                Property.id, Property.title, Property.address, Property.city, Property.state,
+                Property.price, Property.status, Property.agent_id, Property.created_at, Property.duplicate_of_id
+            ).filter(
+                (Property.id.in_(roots)) | (Property.duplicate_of_id.in_(roots))
+            ).order_by(Property.id).all()
+            for row in rows:
+                members[row.duplicate_of_id or row.id].append({
+                    "id": row.id,
+                    "title": row.title,
+                    "address": row.address,
+                    "city": row.city,
+                    "state": row.state,
+                    "price": row.price,
+                    "status": row.status.value if row.status else None,
+                    "agent_id": row.agent_id,
+                    "created_at": row.created_at
+                })
+
+        return {
+            "clusters": [{"canonical_id": root, "listings": members[root]} for root in roots],
+            "total": total,
+            "skip": skip,
+            "limit": limit
+        }
@@ -0,0 +1,223 @@
+import threading
+import time
+from array import array
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+FACET_FIELDS = ("status", "property_type", "city", "bedrooms", "bathrooms")
+# Rebuild periodically so writes made by other worker processes show up
+FACET_INDEX_MAX_AGE_SECONDS = 300
+
+def _price_bucket_edges() -> List[float]:
+    edges = [0.0]
+    for exponent in range(4, 11):
+        for multiplier in (1, 2.5, 5):
+            edges.append(float(multiplier * 10 ** exponent))
+    return edges
+
+PRICE_BUCKET_EDGES = _price_bucket_edges()
+
+def _facet_value(field: str, value: Any) -> Any:
+    if value is None:
+        return None
+    if hasattr(value, "value"):
+        return value.value
+    if field == "city":
+        return value.strip().lower()
+    return value
+
+def _price_bucket(price: Optional[float]) -> Optional[int]:
+    if price is None:
+        return None
+    for index in range(len(PRICE_BUCKET_EDGES) - 1, -1, -1):
+        if price >= PRICE_BUCKET_EDGES[index]:
+            return index
+    return 0
+
+def _iter_bits(bitmap: int):
+    while bitmap:
+        low_bit = bitmap & -bitmap
+        yield low_bit.bit_length() - 1
+        bitmap ^= low_bit
+
+class PropertyFacetIndex:
+    """In-memory bitmap index over the property listing filters.
+
+    Each property occupies a slot; every facet value keeps an int bitmap of the
+    slots holding it, so filtering is bitwise AND and counting is popcount.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._slots: Dict[int, int] = {}
+        self._ids = array("q")
+        self._prices = array("d")
+        self._free_slots: List[int] = []
+        self._all = 0
+        self._bitmaps: Dict[str, Dict[Any, int]] = {field: defaultdict(int) for field in FACET_FIELDS}
+        self._price_buckets: Dict[int, int] = defaultdict(int)
+        self._labels: Dict[str, Any] = {}
+        self._values: Dict[int, Dict[str, Any]] = {}
+        self.built_at: Optional[float] = None
+
+    @property
+    def is_stale(self) -> bool:
+        return self.built_at is None or time.monotonic() - self.built_at > FACET_INDEX_MAX_AGE_SECONDS
+
+    def build(self, rows) -> None:
+        """Rebuild from rows exposing id, price and the facet fields"""
+        with self._lock:
+            self._reset()
+            for row in rows:
+                self._add(row)
+            self.built_at = time.monotonic()
+
+    def invalidate(self) -> None:
+        """Drop the index so the next query rebuilds it, e.g. after a bulk load"""
+        with self._lock:
+            self._reset()
+
+    def upsert(self, row) -> None:
+        if self.built_at is None:
+            return
+        with self._lock:
+            self._remove(row.id)
+            self._add(row)
+
+    def remove(self, property_id: int) -> None:
+        if self.built_at is None:
+            return
+        with self._lock:
+            self._remove(property_id)
+
+    def query(self, filters: Dict[str, Any], skip: int = 0, limit: int = 20) -> Dict[str, Any]:
+        """Return matching ids (newest first) for the page, plus facet counts and a price histogram.
+
+        Facet counts for a field ignore that field's own filter, so the UI can
+        show the alternatives the user could switch to.
+        """
+        with self._lock:
+            masks = {field: self._field_mask(field, filters) for field in FACET_FIELDS}
+            masks["price"] = self._price_mask(filters.get("min_price"), filters.get("max_price"))
+
+            matching = self._all
+            for mask in masks.values():
+                matching &= mask
+
+            facets = {}
+            for field in FACET_FIELDS:
+                others = self._all
+                for name, mask in masks.items():
+                    if name != field:
+                        others &= mask
+                counts = {
+                    self._labels.get(f"{field}:{value}", value): (bitmap & others).bit_count()
+                    for value, bitmap in self._bitmaps[field].items() if value is not None
+                }
+                facets[field] = {value: count for value, count in sorted(
+                    counts.items(), key=lambda item: (-item[1], str(item[0]))
+                ) if count}
+
+            price_others = self._all
+            for name, mask in masks.items():
+                if name != "price":
+                    price_others &= mask
+            histogram = []
+            for index, bitmap in sorted(self._price_buckets.items()):
+                count = (bitmap & price_others).bit_count()
+                if count:
+                    histogram.append({
+                        "min": PRICE_BUCKET_EDGES[index],
+                        "max": PRICE_BUCKET_EDGES[index + 1] if index + 1 < len(PRICE_BUCKET_EDGES) else None,
+                        "count": count
+                    })
+
+            matching_ids = sorted((self._ids[slot] for slot in _iter_bits(matching)), reverse=True)
+
+        return {
+            "ids": matching_ids[skip:skip + limit],
+            "total": len(matching_ids),
+            "facets": facets,
+            "price_histogram": histogram
+        }
+
+    def _field_mask(self, field: str, filters: Dict[str, Any]) -> int:
+        value = filters.get(field)
+        if value is None:
+            return self._all
+        bitmaps = self._bitmaps[field]
+        if field in ("bedrooms", "bathrooms"):
+            # Listing filters treat room counts as minimums
+            mask = 0
+            for room_count, bitmap in bitmaps.items():
+                if room_count is not None and room_count >= value:
+                    mask |= bitmap
+            return mask
+        return bitmaps.get(_facet_value(field, value), 0)
+
+    def _price_mask(self, min_price: Optional[float], max_price: Optional[float]) -> int:
+        if min_price is None and max_price is None:
+            return self._all
+        low = min_price if min_price is not None else float("-inf")
+        high = max_price if max_price is not None else float("inf")
+        mask = 0
+        for index, bitmap in self._price_buckets.items():
+            bucket_low = PRICE_BUCKET_EDGES[index]
+            bucket_high = PRICE_BUCKET_EDGES[index + 1] if index + 1 < len(PRICE_BUCKET_EDGES) else float("inf")
+            if bucket_low >= low and bucket_high <= high:
+                mask |= bitmap
+            elif bucket_high > low and bucket_low <= high:
+                # Boundary bucket: check the individual prices
+                for slot in _iter_bits(bitmap):
+                    if low <= self._prices[slot] <= high:
+                        mask |= 1 << slot
+        return mask
+
+    def _add(self, row) -> None:
+        if self._free_slots:
+            slot = self._free_slots.pop()
+            self._ids[slot] = row.id
+            self._prices[slot] = row.price or 0.0
+        else:
+            slot = len(self._ids)
+            self._ids.append(row.id)
+            self._prices.append(row.price or 0.0)
+        bit = 1 << slot
+        self._slots[row.id] = slot
+        self._all |= bit
+
+        values = {}
+        for field in FACET_FIELDS:
+            raw = getattr(row, field)
+            value = _facet_value(field, raw)
+            values[field] = value
+            self._bitmaps[field][value] |= bit
+            if field == "city" and value is not None:
+                self._labels.setdefault(f"city:{value}", raw.strip())
+        bucket = _price_bucket(row.price)
+        values["price_bucket"] = bucket
+        if bucket is not None:
+            self._price_buckets[bucket] |= bit
+        self._values[slot] = values
+
+    def _remove(self, property_id: int) -> None:
+        slot = self._slots.pop(property_id, None)
+        if slot is None:
+            return
+        bit = 1 << slot
+        values = self._values.pop(slot)
+        for field in FACET_FIELDS:
+            self._bitmaps[field][values[field]] &= ~bit
+            if not self._bitmaps[field][values[field]]:
+                del self._bitmaps[field][values[field]]
+        if values["price_bucket"] is not None:
+            self._price_buckets[values["price_bucket"]] &= ~bit
+            if not self._price_buckets[values["price_bucket"]]:
+                del self._price_buckets[values["price_bucket"]]
+        self._all &= ~bit
+        self._free_slots.append(slot)
+
+property_facet_index = PropertyFacetIndex()
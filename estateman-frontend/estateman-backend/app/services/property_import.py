@@ -0,0 +1,329 @@
+import csv
+import io
+import math
+import os
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+from fastapi import UploadFile
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..core.datetime_utils import utc_now
+from ..core.geo_utils import encode_geohash
+from ..core.address_utils import address_key
+from ..models.property import Property, PropertyImportJob, PropertyStatus, PropertyType
+from .property_search import property_search_index
+from .property_facets import property_facet_index
+from .cma_engine import cma_engine
+from .market_stats import MarketStatsService
+from .client_matching import ClientMatchingService
+from .saved_search import SavedSearchService
+from .property_duplicates import PropertyDuplicateService
+
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+IMPORT_CHUNK_ROWS = 2000
+
+REQUIRED_COLUMNS = ("title", "price", "address", "city")
+TEXT_COLUMNS = ("title", "description", "address", "city", "state", "zip_code")
+NUMERIC_COLUMNS = {
+    "price": float,
+    "bedrooms": int,
+    "bathrooms": int,
+    "square_feet": float,
+    "lot_size": float,
+    "year_built": int,
+    "latitude": float,
+    "longitude": float
+}
+# Column order used for COPY; enum columns are written as their SQL labels (member names)
+COPY_COLUMNS = (
+    "title", "description", "property_type", "status", "price", "bedrooms", "bathrooms",
+    "square_feet", "lot_size", "year_built", "address", "city", "state", "zip_code",
+    "latitude", "longitude", "geohash", "address_key", "agent_id"
+)
+COPY_NULL = "\\N"
+
+class PropertyImportService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    async def start_import(self, file: UploadFile, agent_id: int) -> PropertyImportJob:
+        """Stream the upload to disk and queue an import job for it"""
+        os.makedirs(settings.IMPORT_FILE_DIR, exist_ok=True)
+        upload_path = os.path.join(settings.IMPORT_FILE_DIR, f"{uuid.uuid4()}.csv")
+
+        with open(upload_path, "wb") as f:
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_BYTES)
+                if not chunk:
+                    break
+                f.write(chunk)
+
+        job = PropertyImportJob(
+            agent_id=agent_id,
+            file_name=file.filename,
+            upload_path=upload_path,
+            status="pending"
+        )
+        self.db.add(job)
+        self.db.commit()
+        self.db.refresh(job)
+        return job
+
+    def get_job(self, job_id: int, agent_id: Optional[int] = None) -> Optional[PropertyImportJob]:
+        """The job, or None if it doesn't exist or `agent_id` is given and doesn't own it"""
+        query = self.db.query(PropertyImportJob).filter(PropertyImportJob.id == job_id)
+        if agent_id is not None:
+            query = query.filter(PropertyImportJob.agent_id == agent_id)
+        return query.first()
+
+    def run_import(self, job_id: int) -> PropertyImportJob:
+        """Parse, validate and insert the uploaded CSV chunk by chunk"""
+        job = self.get_job(job_id)
+        job.status = "running"
+        job.started_at = utc_now()
+        # Random name, so the path says nothing about other jobs
+        job.error_file_path = os.path.join(settings.IMPORT_FILE_DIR, f"{uuid.uuid4()}_errors.csv")
+        self.db.commit()
+        self._imported_cells = set()
+        self._seen_keys: Dict[str, int] = {}
+
+        try:
+            with open(job.upload_path, newline="", encoding="utf-8-sig") as source, \
+                    open(job.error_file_path, "w", newline="", encoding="utf-8") as error_file:
+                reader = csv.DictReader(source)
+                error_writer = csv.writer(error_file)
+                error_writer.writerow(["row_number", "error"] + list(reader.fieldnames or []))
+
+                chunk: List[Tuple[int, Dict[str, str]]] = []
+                # Header is line 1, so data rows start at 2
+                for row_number, row in enumerate(reader, start=2):
+                    chunk.append((row_number, row))
+                    if len(chunk) >= IMPORT_CHUNK_ROWS:
+                        self._import_chunk(job, chunk, reader.fieldnames, error_writer)
+                        chunk = []
+                if chunk:
+                    self._import_chunk(job, chunk, reader.fieldnames, error_writer)
+
+            job.status = "completed"
+        except Exception as e:
+            self.db.rollback()
+            job.status = "failed"
+            job.error_message = str(e)
+
+        job.completed_at = utc_now()
+        self.db.commit()
+        # The source CSV is not needed once the job has run; rejected rows are in the error report
+        try:
+            os.remove(job.upload_path)
+        except OSError:
+            pass
+
+        if job.created_count:
+            property_search_index.invalidate()
+            property_facet_index.invalidate()
+            cma_engine.invalidate_all()
+            # Imported rows are all listed this month, so only those cells change
+            market_stats = MarketStatsService(self.db)
+            market_stats.refresh_cells(
+                market_stats.cell_for(city, property_type, utc_now()) for city, property_type in self._imported_cells
+            )
+            ClientMatchingService(self.db).rebuild()
+            self._alert_saved_searches(job)
+        return job
+
+    def _alert_saved_searches(self, job: PropertyImportJob) -> None:
+        """Run the imported listings through saved-search alerts a chunk at a time"""
+        saved_searches = SavedSearchService(self.db)
+        last_id = 0
+        while True:
+            # Keyset pages rather than a streaming cursor, since each alert batch commits
+            chunk = self.db.query(
+                Property.id, Property.title, Property.city, Property.property_type,
+                Property.price, Property.bedrooms, Property.status
+            ).filter(
+                Property.agent_id == job.agent_id,
+                Property.created_at >= job.started_at,
+                Property.id > last_id
+            ).order_by(Property.id).limit(IMPORT_CHUNK_ROWS).all()
+            if not chunk:
+                break
+            saved_searches.alert_for_properties(chunk)
+            last_id = chunk[-1].id
+
+    def _import_chunk(self, job: PropertyImportJob, chunk: List[Tuple[int, Dict[str, str]]],
+                      fieldnames: List[str], error_writer) -> None:
+        records, failures = self.validate_chunk(chunk, job.agent_id)
+        records = self._reject_duplicates(records, failures)
+
+        if records:
+            self._imported_cells.update((record["city"], record["property_type"]) for _, record in records)
+            try:
+                self._insert_records([record for _, record in records])
+                self.db.commit()
+                job.created_count += len(records)
+            except Exception:
+                # Retry row by row so one bad row doesn't fail the whole chunk
+                self.db.rollback()
+                created, row_failures = self._insert_individually(records)
+                job.created_count += created
+                failures.extend(row_failures)
+
+        raw_rows = dict(chunk)
+        for row_number, error in sorted(failures):
+            raw = raw_rows[row_number]
+            error_writer.writerow([row_number, error] + [raw.get(name) for name in fieldnames])
+
+        job.rows_processed += len(chunk)
+        job.failed_count += len(failures)
+        self.db.commit()
+
+    def validate_chunk(self, chunk: List[Tuple[int, Dict[str, str]]],
+                       agent_id: int) -> Tuple[List[Tuple[int, Dict[str, Any]]], List[Tuple[int, str]]]:
+        """Validate a chunk column by column.
+
+        Returns (row_number, record) pairs ready to insert and (row_number, error)
+        pairs for every row that failed.
+        """
+        size = len(chunk)
+        errors: List[List[str]] = [[] for _ in range(size)]
+        columns: Dict[str, List[Any]] = {}
+
+        for name in TEXT_COLUMNS:
+            columns[name] = [(row.get(name) or "").strip() for _, row in chunk]
+
+        for name, caster in NUMERIC_COLUMNS.items():
+            values = []
+            for index, (_, row) in enumerate(chunk):
+                raw = (row.get(name) or "").strip()
+                if not raw:
+                    values.append(None)
+                    continue
+                try:
+                    number = float(raw)
+                    if not math.isfinite(number):
+                        raise ValueError(raw)
+                    values.append(caster(number))
+                except ValueError:
+                    values.append(None)
+                    errors[index].append(f"invalid {name} '{raw}'")
+            columns[name] = values
+
+        property_types = []
+        for index, (_, row) in enumerate(chunk):
+            raw = (row.get("property_type") or PropertyType.RESIDENTIAL.value).strip().lower()
+            try:
+                property_types.append(PropertyType(raw))
+            except ValueError:
+                property_types.append(None)
+                errors[index].append(f"invalid property_type '{raw}'")
+
+        for name in REQUIRED_COLUMNS:
+            for index, value in enumerate(columns[name]):
+                if value in (None, "") and not any(name in error for error in errors[index]):
+                    errors[index].append(f"missing {name}")
+
+        for index in range(size):
+            price = columns["price"][index]
+            if price is not None and price < 0:
+                errors[index].append("price must not be negative")
+            latitude, longitude = columns["latitude"][index], columns["longitude"][index]
+            if (latitude is None) != (longitude is None):
+                errors[index].append("latitude and longitude must be provided together")
+            elif latitude is not None and not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+                errors[index].append("latitude/longitude out of range")
+
+        records = []
+        failures = []
+        for index, (row_number, _) in enumerate(chunk):
+            if errors[index]:
+                failures.append((row_number, "; ".join(errors[index])))
+                continue
+            record = {name: columns[name][index] for name in TEXT_COLUMNS + tuple(NUMERIC_COLUMNS)}
+            record["description"] = record["description"] or None
+            record["property_type"] = property_types[index]
+            record["status"] = PropertyStatus.ACTIVE
+            record["agent_id"] = agent_id
+            record["geohash"] = (
+                encode_geohash(record["latitude"], record["longitude"])
+                if record["latitude"] is not None else None
+            )
+            record["address_key"] = address_key(record["address"], record["city"], record["state"])
+            records.append((row_number, record))
+
+        return records, failures
+
+    def _reject_duplicates(self, records: List[Tuple[int, Dict[str, Any]]],
+                           failures: List[Tuple[int, str]]) -> List[Tuple[int, Dict[str, Any]]]:
+        """Drop rows whose address already exists, in the table or earlier in the file.
+
+        One indexed address_key lookup per chunk; the nearby-geohash check is left
+        to the batch clustering job.
+        """
+        existing = PropertyDuplicateService(self.db).existing_keys(
+            list({record["address_key"] for _, record in records if record["address_key"]})
+        )
+        unique = []
+        for row_number, record in records:
+            key = record["address_key"]
+            if key in existing:
+                failures.append((row_number, f"duplicate of property {existing[key]}"))
+            elif key in self._seen_keys:
+                failures.append((row_number, f"duplicate of row {self._seen_keys[key]}"))
+            else:
+                if key:
+                    self._seen_keys[key] = row_number
+                unique.append((row_number, record))
+        return unique
+
+    def _insert_records(self, records: List[Dict[str, Any]]) -> None:
+        if self.db.bind.dialect.name == "postgresql":
+            self._copy_records(records)
+        else:
+            self.db.execute(insert(Property), records)
+
+    def _copy_records(self, records: List[Dict[str, Any]]) -> None:
+        """Bulk load a chunk through COPY FROM STDIN"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for record in records:
+            writer.writerow([self._copy_value(record[name]) for name in COPY_COLUMNS])
+        buffer.seek(0)
+
+        cursor = self.db.connection().connection.cursor()
+        try:
+            cursor.copy_expert(
+                f"COPY properties ({', '.join(COPY_COLUMNS)}) FROM STDIN WITH (FORMAT csv, NULL '{COPY_NULL}')",
+                buffer
+            )
+        finally:
+            cursor.close()
+
+    def _copy_value(self, value: Any) -> Any:
+        if value is None:
+            return COPY_NULL
+        if isinstance(value, (PropertyType, PropertyStatus)):
+            return value.name
+        return value
+
+    def _insert_individually(self, records: List[Tuple[int, Dict[str, Any]]]) -> Tuple[int, List[Tuple[int, str]]]:
+        created = 0
+        failures = []
+        for row_number, record in records:
+            try:
+                with self.db.begin_nested():
+                    self.db.execute(insert(Property), [record])
+                created += 1
+            except Exception as e:
+                failures.append((row_number, str(getattr(e, "orig", e)).strip()))
+        self.db.commit()
+        return created, failures
+
+def run_property_import_job(job_id: int) -> None:
+    """Background task entry point; uses its own session since the request's is closed"""
+    db = SessionLocal()
+    try:
+        PropertyImportService(db).run_import(job_id)
+    finally:
+        db.close()
@@ -0,0 +1,139 @@
+import math
+import re
+import threading
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+# Field weights mirror the setweight() labels on properties.search_vector (A/B/B/C)
+FIELD_WEIGHTS = {
+    "title": 4.0,
+    "address": 2.0,
+    "city": 2.0,
+    "description": 1.0
+}
+SNIPPET_WORDS = 20
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Lowercase alphanumeric tokens"""
+    return _TOKEN_RE.findall(text.lower()) if text else []
+
+def highlight(text: Optional[str], terms: List[str], max_words: int = SNIPPET_WORDS) -> Optional[str]:
+    """Build a snippet around the first matching word, wrapping matches in <mark>"""
+    if not text:
+        return None
+    words = text.split()
+
+    def matches(word: str) -> bool:
+        return any(token.startswith(term) for token in tokenize(word) for term in terms)
+
+    first = next((i for i, word in enumerate(words) if matches(word)), 0)
+    start = max(0, first - max_words // 4)
+    window = words[start:start + max_words]
+    snippet = " ".join(f"<mark>{word}</mark>" if matches(word) else word for word in window)
+    if start > 0:
+        snippet = "... " + snippet
+    if start + max_words < len(words):
+        snippet += " ..."
+    return snippet
+
+class PropertySearchIndex:
+    """In-process inverted index used when the database has no tsvector support (e.g. SQLite)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings: Dict[str, Dict[int, float]] = defaultdict(dict)
+        self._documents: Dict[int, Dict[str, Optional[str]]] = {}
+        self.is_built = False
+
+    def build(self, rows) -> None:
+        """Rebuild from rows exposing id, title, description, address and city"""
+        with self._lock:
+            self._postings = defaultdict(dict)
+            self._documents = {}
+            for row in rows:
+                self._add(row)
+            self.is_built = True
+
+    def invalidate(self) -> None:
+        """Drop the index so the next search rebuilds it, e.g. after a bulk load"""
+        with self._lock:
+            self._postings = defaultdict(dict)
+            self._documents = {}
+            self.is_built = False
+
+    def upsert(self, row) -> None:
+        """Index or re-index a single property"""
+        if not self.is_built:
+            return
+        with self._lock:
+            self._remove(row.id)
+            self._add(row)
+
+    def remove(self, property_id: int) -> None:
+        if not self.is_built:
+            return
+        with self._lock:
+            self._remove(property_id)
+
+    def search(self, search_term: str) -> List[Tuple[int, float, Optional[str]]]:
+        """Return (property_id, rank, snippet) for every match, best first.
+
+        All terms must match; the last term matches as a prefix so results
+        update while the user is still typing.
+        """
+        terms = tokenize(search_term)
+        if not terms:
+            return []
+
+        with self._lock:
+            total_docs = max(len(self._documents), 1)
+            scores: Optional[Dict[int, float]] = None
+            for position, term in enumerate(terms):
+                if position == len(terms) - 1:
+                    keys = [key for key in self._postings if key.startswith(term)]
+                else:
+                    keys = [term] if term in self._postings else []
+
+                term_scores: Dict[int, float] = defaultdict(float)
+                for key in keys:
+                    postings = self._postings[key]
+                    idf = math.log(1 + total_docs / len(postings))
+                    for property_id, weight in postings.items():
+                        term_scores[property_id] += weight * idf
+
+                if scores is None:
+                    scores = dict(term_scores)
+                else:
+                    scores = {pid: score + term_scores[pid] for pid, score in scores.items() if pid in term_scores}
+                if not scores:
+                    return []
+
+            ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+            results = []
+            for property_id, score in ranked:
+                document = self._documents[property_id]
+                snippet = highlight(document["description"] or document["title"], terms)
+                results.append((property_id, round(score, 4), snippet))
+            return results
+
+    def _add(self, row) -> None:
+        document = {field: getattr(row, field) for field in FIELD_WEIGHTS}
+        self._documents[row.id] = document
+        for field, weight in FIELD_WEIGHTS.items():
+            for token in tokenize(document[field]):
+                self._postings[token][row.id] = self._postings[token].get(row.id, 0.0) + weight
+
+    def _remove(self, property_id: int) -> None:
+        document = self._documents.pop(property_id, None)
+        if not document:
+            return
+        for field in FIELD_WEIGHTS:
+            for token in set(tokenize(document[field])):
+                postings = self._postings.get(token)
+                if postings is not None:
+                    postings.pop(property_id, None)
+                    if not postings:
+                        del self._postings[token]
+
+property_search_index = PropertySearchIndex()
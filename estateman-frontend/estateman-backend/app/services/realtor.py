@@ -269,8 +269,9 @@ class RealtorService:
             for partner in downline
         ]
 
-    def get_network_tree(self, realtor_id: int) -> Dict[str, Any]:
+    def get_network_tree(self, realtor_id: int, depth: int = 3) -> Dict[str, Any]:
         from app.models.mlm import MLMPartner
+        from app.services.mlm_tree import MLMTreeService
         
         realtor = self.get_realtor(realtor_id)
         if not realtor or not realtor.user_id:
@@ -283,19 +284,7 @@ class RealtorService:
         if not mlm_partner:
             return {"root": None}
         
-        def build_tree_node(partner):
-            children = self.db.query(MLMPartner).join(User).filter(
-                MLMPartner.sponsor_id == partner.id
-            ).all()
-            
-            return {
-                "id": partner.id,
-                "name": f"{partner.user.first_name} {partner.user.last_name}" if partner.user else "Unknown",
-                "level": partner.level.value,
-                "children": [build_tree_node(child) for child in children]
-            }
-        
-        return {"root": build_tree_node(mlm_partner)}
+        return {"root": MLMTreeService(self.db).get_tree(mlm_partner.id, depth)}
 
     def get_realtor_leads(self, realtor_id: int, skip: int = 0, limit: int = 50) -> List[Dict[str, Any]]:
         from app.models.client import Lead, Client
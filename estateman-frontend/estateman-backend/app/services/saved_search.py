@@ -0,0 +1,273 @@
+import threading
+import time
+from bisect import bisect_right
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy.orm import Session
+from ..core.datetime_utils import utc_now
+from ..models.notification import NotificationCategory, NotificationType
+from ..models.property import PropertyStatus, PropertyType, SavedSearch, SavedSearchAlert
+from ..schemas.notification import NotificationCreate
+from .notification import NotificationService
+from .property_facets import PRICE_BUCKET_EDGES
+
+# Rebuild periodically so searches saved through other worker processes show up
+SAVED_SEARCH_INDEX_MAX_AGE_SECONDS = 300
+ALERT_BATCH_SIZE = 500
+ALERT_LISTING_PREVIEW = 3
+
+Criteria = Tuple[Optional[str], Optional[str], Optional[float], Optional[float], Optional[int]]
+
+def _normalize_city(city: Optional[str]) -> Optional[str]:
+    if not city:
+        return None
+    return city.strip().lower() or None
+
+def _type_value(property_type: Any) -> Optional[str]:
+    if property_type is None:
+        return None
+    return property_type.value if hasattr(property_type, "value") else PropertyType(property_type).value
+
+def _price_band(price: float) -> int:
+    return max(bisect_right(PRICE_BUCKET_EDGES, price) - 1, 0)
+
+class SavedSearchIndex:
+    """Reverse index from listing attributes to the saved searches they satisfy.
+
+    Each search is posted under its city, property type, every price band its
+    range overlaps and its bedroom minimum (None/0 meaning "any"). Matching a
+    listing walks only the smallest of those posting groups and checks the
+    exact criteria, instead of evaluating every saved search.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._criteria: Dict[int, Criteria] = {}
+        self._by_city: Dict[Optional[str], Set[int]] = defaultdict(set)
+        self._by_type: Dict[Optional[str], Set[int]] = defaultdict(set)
+        self._by_band: Dict[int, Set[int]] = defaultdict(set)
+        self._by_min_bedrooms: Dict[int, Set[int]] = defaultdict(set)
+        self.built_at: Optional[float] = None
+
+    @property
+    def is_stale(self) -> bool:
+        return self.built_at is None or time.monotonic() - self.built_at > SAVED_SEARCH_INDEX_MAX_AGE_SECONDS
+
+    def build(self, rows) -> None:
+        """Rebuild from active SavedSearch rows"""
+        with self._lock:
+            self._reset()
+            for row in rows:
+                self._add(row)
+            self.built_at = time.monotonic()
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._reset()
+
+    def upsert(self, row) -> None:
+        if self.built_at is None:
+            return
+        with self._lock:
+            self._remove(row.id)
+            if row.is_active:
+                self._add(row)
+
+    def remove(self, search_id: int) -> None:
+        if self.built_at is None:
+            return
+        with self._lock:
+            self._remove(search_id)
+
+    def match(self, city: Optional[str], property_type: Any, price: Optional[float],
+              bedrooms: Optional[int]) -> List[int]:
+        """Ids of the saved searches a listing with these attributes satisfies"""
+        city = _normalize_city(city)
+        property_type = _type_value(property_type)
+        with self._lock:
+            groups = [
+                [self._by_city.get(city, set()), self._by_city.get(None, set())],
+                [self._by_type.get(property_type, set()), self._by_type.get(None, set())],
+                [searches for minimum, searches in self._by_min_bedrooms.items() if minimum <= (bedrooms or 0)]
+            ]
+            if price is not None:
+                groups.append([self._by_band.get(_price_band(price), set())])
+
+            smallest = min(groups, key=lambda group: sum(len(searches) for searches in group))
+            matches = [
+                search_id
+                for searches in smallest
+                for search_id in searches
+                if self._satisfies(self._criteria[search_id], city, property_type, price, bedrooms)
+            ]
+        return sorted(matches)
+
+    def _satisfies(self, criteria: Criteria, city: Optional[str], property_type: Optional[str],
+                   price: Optional[float], bedrooms: Optional[int]) -> bool:
+        search_city, search_type, min_price, max_price, min_bedrooms = criteria
+        if search_city is not None and search_city != city:
+            return False
+        if search_type is not None and search_type != property_type:
+            return False
+        if min_price is not None and (price is None or price < min_price):
+            return False
+        if max_price is not None and (price is None or price > max_price):
+            return False
+        if min_bedrooms and (bedrooms or 0) < min_bedrooms:
+            return False
+        return True
+
+    def _postings(self, criteria: Criteria):
+        """(posting dict, key) pairs a search with these criteria is listed under"""
+        city, property_type, min_price, max_price, min_bedrooms = criteria
+        first = _price_band(min_price) if min_price is not None else 0
+        last = _price_band(max_price) if max_price is not None else len(PRICE_BUCKET_EDGES) - 1
+        yield self._by_city, city
+        yield self._by_type, property_type
+        yield self._by_min_bedrooms, min_bedrooms or 0
+        for band in range(first, last + 1):
+            yield self._by_band, band
+
+    def _add(self, row) -> None:
+        criteria = (
+            _normalize_city(row.city), _type_value(row.property_type),
+            row.min_price, row.max_price, row.min_bedrooms
+        )
+        self._criteria[row.id] = criteria
+        for postings, key in self._postings(criteria):
+            postings[key].add(row.id)
+
+    def _remove(self, search_id: int) -> None:
+        criteria = self._criteria.pop(search_id, None)
+        if criteria is None:
+            return
+        for postings, key in self._postings(criteria):
+            searches = postings.get(key)
+            if searches is not None:
+                searches.discard(search_id)
+                if not searches:
+                    del postings[key]
+
+saved_search_index = SavedSearchIndex()
+
+class SavedSearchService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def _ensure_index(self) -> None:
+        if saved_search_index.is_stale:
+            saved_search_index.build(
+                self.db.query(SavedSearch).filter(SavedSearch.is_active == True).yield_per(5000)
+            )
+
+    def create_saved_search(self, user_id: int, search_data: Dict) -> SavedSearch:
+        search = SavedSearch(user_id=user_id, **search_data)
+        search.city = _normalize_city(search.city)
+        self.db.add(search)
+        self.db.commit()
+        self.db.refresh(search)
+        saved_search_index.upsert(search)
+        return search
+
+    def get_saved_searches(self, user_id: int, client_id: Optional[int] = None) -> List[SavedSearch]:
+        query = self.db.query(SavedSearch).filter(SavedSearch.user_id == user_id)
+        if client_id is not None:
+            query = query.filter(SavedSearch.client_id == client_id)
+        return query.order_by(SavedSearch.created_at.desc()).all()
+
+    def delete_saved_search(self, search_id: int, user_id: int) -> bool:
+        search = self.db.query(SavedSearch).filter(
+            SavedSearch.id == search_id, SavedSearch.user_id == user_id
+        ).first()
+        if not search:
+            return False
+        self.db.query(SavedSearchAlert).filter(
+            SavedSearchAlert.saved_search_id == search_id
+        ).delete(synchronize_session=False)
+        self.db.delete(search)
+        self.db.commit()
+        saved_search_index.remove(search_id)
+        return True
+
+    def find_matching_searches(self, property_obj) -> List[int]:
+        self._ensure_index()
+        return saved_search_index.match(
+            property_obj.city, property_obj.property_type, property_obj.price, property_obj.bedrooms
+        )
+
+    def alert_for_properties(self, properties: Iterable) -> int:
+        """Notify owners of saved searches that new or changed active listings now match.
+
+        Each (search, property) pair alerts once. Matches are grouped into one
+        notification per search and written in batches. Returns the number of
+        notifications sent.
+        """
+        matched: Dict[int, List] = defaultdict(list)
+        for property_obj in properties:
+            if property_obj.status != PropertyStatus.ACTIVE:
+                continue
+            for search_id in self.find_matching_searches(property_obj):
+                matched[search_id].append(property_obj)
+        if not matched:
+            return 0
+
+        property_ids = {property_obj.id for listings in matched.values() for property_obj in listings}
+        already_alerted = set(
+            self.db.query(SavedSearchAlert.saved_search_id, SavedSearchAlert.property_id).filter(
+                SavedSearchAlert.saved_search_id.in_(list(matched)),
+                SavedSearchAlert.property_id.in_(list(property_ids))
+            ).all()
+        )
+        searches = {
+            search.id: search for search in self.db.query(SavedSearch).filter(
+                SavedSearch.id.in_(list(matched)), SavedSearch.is_active == True
+            )
+        }
+
+        notification_service = NotificationService(self.db)
+        now = utc_now()
+        batch: List[NotificationCreate] = []
+        sent = 0
+        for search_id, listings in matched.items():
+            search = searches.get(search_id)
+            listings = [p for p in listings if (search_id, p.id) not in already_alerted]
+            if search is None or not listings:
+                continue
+
+            self.db.bulk_save_objects([
+                SavedSearchAlert(saved_search_id=search_id, property_id=p.id) for p in listings
+            ])
+            search.last_alerted_at = now
+            batch.append(self._alert_notification(search, listings))
+
+            if len(batch) >= ALERT_BATCH_SIZE:
+                sent += notification_service.create_notifications(batch)
+                batch = []
+        sent += notification_service.create_notifications(batch)
+        self.db.commit()
+        return sent
+
+    def _alert_notification(self, search: SavedSearch, listings: List) -> NotificationCreate:
+        if len(listings) == 1:
+            title = f"New listing matches \"{search.name}\""
+        else:
+            title = f"{len(listings)} new listings match \"{search.name}\""
+        names = ", ".join(f"{p.title} ({p.city}, ${p.price:,.0f})" for p in listings[:ALERT_LISTING_PREVIEW])
+        if len(listings) > ALERT_LISTING_PREVIEW:
+            names += f" and {len(listings) - ALERT_LISTING_PREVIEW} more"
+
+        return NotificationCreate(
+            title=title,
+            message=names,
+            notification_type=NotificationType.INFO,
+            category=NotificationCategory.LEADS,
+            user_id=search.user_id,
+            data={
+                "saved_search_id": search.id,
+                "client_id": search.client_id,
+                "property_ids": [p.id for p in listings]
+            }
+        )
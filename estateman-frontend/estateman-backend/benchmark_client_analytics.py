@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""Client analytics overview: six separate aggregates vs one FILTER pass vs the cache.
+
+    python benchmark_client_analytics.py --seed      # top up to 1M synthetic clients first
+    python benchmark_client_analytics.py --cleanup   # remove the synthetic clients
+"""
+
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import desc, func, text
+from app.core.database import engine, SessionLocal
+from app.models.client import Client, ClientStatus
+from app.services.client import ClientService
+from app.services.client_analytics import client_analytics_cache, compute_client_analytics
+
+BENCH_CLIENTS = 1000000
+BENCH_EMAIL_DOMAIN = "bench.invalid"
+RUNS = 10
+
+def seed_clients(target: int) -> int:
+    """Insert synthetic clients until the table holds at least `target` rows"""
+    with engine.connect() as connection:
+        existing = connection.execute(text("SELECT count(*) FROM clients")).scalar()
+        missing = max(target - existing, 0)
+        if missing:
+            connection.execute(text("""
+                INSERT INTO clients (client_id, first_name, last_name, email, status, lead_score,
+                                     engagement_level, loyalty_points, loyalty_tier, total_spent, lead_source)
+                SELECT 'B' || n, 'Bench', 'Client ' || n, 'client' || n || '@' || :domain,
+                       (ARRAY['LEAD', 'ACTIVE', 'INACTIVE', 'CONVERTED'])[1 + n % 4]::clientstatus,
+                       n % 101, 'low', n % 12000, 'BRONZE', 0,
+                       (ARRAY['referral', 'website', 'social_media', 'google_ads', 'walk_in', 'cold_call', NULL])[1 + n % 7]
+                FROM generate_series(1, :missing) AS n
+            """), {"domain": BENCH_EMAIL_DOMAIN, "missing": missing})
+            connection.execute(text("ANALYZE clients"))
+            connection.commit()
+    return missing
+
+def cleanup_clients() -> int:
+    with engine.connect() as connection:
+        deleted = connection.execute(
+            text("DELETE FROM clients WHERE email LIKE :pattern"), {"pattern": f"%@{BENCH_EMAIL_DOMAIN}"}
+        ).rowcount
+        connection.commit()
+    return deleted
+
+def legacy_analytics(db):
+    """The previous implementation: one query per figure plus the source group-by"""
+    total_clients = db.query(Client).count()
+    active_clients = db.query(Client).filter(Client.status == ClientStatus.ACTIVE).count()
+    leads_count = db.query(Client).filter(Client.status == ClientStatus.LEAD).count()
+    avg_score = db.query(func.avg(Client.lead_score)).scalar() or 0
+    total_points = db.query(func.sum(Client.loyalty_points)).scalar() or 0
+    top_sources = db.query(
+        Client.lead_source, func.count(Client.id).label('count')
+    ).filter(Client.lead_source.isnot(None)).group_by(Client.lead_source).order_by(desc('count')).limit(5).all()
+    return total_clients, active_clients, leads_count, avg_score, total_points, top_sources
+
+def time_call(call) -> float:
+    """Median wall time in milliseconds over RUNS executions"""
+    timings = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        call()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return timings[len(timings) // 2]
+
+def main():
+    if "--cleanup" in sys.argv:
+        print(f"Removed {cleanup_clients()} synthetic clients")
+        return
+    if "--seed" in sys.argv:
+        print(f"Seeded {seed_clients(BENCH_CLIENTS)} synthetic clients")
+
+    db = SessionLocal()
+    try:
+        client_count = db.query(func.count(Client.id)).scalar()
+        service = ClientService(db)
+
+        def run_cached():
+            service.get_client_analytics()
+
+        client_analytics_cache.invalidate()
+        service.get_client_analytics()
+        results = [
+            ("six queries (before)", 6, time_call(lambda: legacy_analytics(db))),
+            ("single FILTER pass (after)", 1, time_call(lambda: compute_client_analytics(db))),
+            ("cached (after)", 0, time_call(run_cached))
+        ]
+    finally:
+        db.close()
+
+    print(f"Client analytics benchmark ({client_count} clients, median of {RUNS} runs)")
+    print(f"{'variant':<30}{'queries':>10}{'latency (ms)':>16}")
+    for name, queries, latency in results:
+        print(f"{name:<30}{queries:>10}{latency:>16.1f}")
+
+if __name__ == "__main__":
+    main()
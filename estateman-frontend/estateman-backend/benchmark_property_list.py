@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import text
+from sqlalchemy.orm import joinedload
+from app.core.database import engine, SessionLocal
+from app.models.property import Property
+from app.services.property import PropertyService
+
+PAGE_SIZE = 100
+RUNS = 10
+
+def create_list_indexes():
+    """Index the child foreign keys used by the card projection subqueries"""
+    with engine.connect() as connection:
+        connection.execute(text("CREATE INDEX IF NOT EXISTS ix_property_images_property_id ON property_images (property_id)"))
+        connection.execute(text("CREATE INDEX IF NOT EXISTS ix_property_documents_property_id ON property_documents (property_id)"))
+        connection.commit()
+
+def count_rows(query) -> int:
+    """Execute a query's SQL directly to count the rows sent by the database"""
+    sql = str(query.statement.compile(engine, compile_kwargs={"literal_binds": True}))
+    with engine.connect() as connection:
+        return len(connection.exec_driver_sql(sql).fetchall())
+
+def time_query(run_query) -> float:
+    """Median wall time in milliseconds over RUNS executions"""
+    timings = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        run_query()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return timings[len(timings) // 2]
+
+def main():
+    create_list_indexes()
+    db = SessionLocal()
+    try:
+        service = PropertyService(db)
+
+        # Previous list query: agent, images and documents joined together
+        eager_query = db.query(Property).options(
+            joinedload(Property.agent),
+            joinedload(Property.images),
+            joinedload(Property.documents)
+        ).limit(PAGE_SIZE)
+
+        def run_eager():
+            db.expunge_all()
+            eager_query.all()
+
+        card_query = service._property_card_query().order_by(Property.id).limit(PAGE_SIZE)
+
+        def run_cards():
+            service.get_properties(limit=PAGE_SIZE)
+
+        results = [
+            ("joinedload (before)", count_rows(eager_query), time_query(run_eager)),
+            ("card projection (after)", count_rows(card_query), time_query(run_cards))
+        ]
+    finally:
+        db.close()
+
+    print(f"Property list benchmark (page size {PAGE_SIZE}, median of {RUNS} runs)")
+    print(f"{'query':<26}{'rows transferred':>18}{'latency (ms)':>16}")
+    for name, rows, latency in results:
+        print(f"{name:<26}{rows:>18}{latency:>16.1f}")
+
+if __name__ == "__main__":
+    main()
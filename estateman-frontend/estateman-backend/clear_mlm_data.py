@@ -15,6 +15,7 @@ def clear_mlm_data():
     clear_sql = """
     DELETE FROM mlm_commissions;
     DELETE FROM referral_activities;
+    DELETE FROM mlm_partner_closure;
     DELETE FROM mlm_partners;
     """
     
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""Find duplicate listings across the whole properties table.
+
+Adds the address_key/duplicate_of_id columns if needed, backfills address keys
+and links every duplicate to the earliest listing at the same address. Safe to
+re-run; run it nightly (e.g. from cron) to catch duplicates created by edits.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import text
+from app.core.database import engine, SessionLocal
+from app.services.property_duplicates import PropertyDuplicateService
+
+def add_duplicate_columns():
+    """Add the duplicate-detection columns and their indexes"""
+    create_sql = """
+    ALTER TABLE properties ADD COLUMN IF NOT EXISTS address_key VARCHAR(32);
+    ALTER TABLE properties ADD COLUMN IF NOT EXISTS duplicate_of_id INTEGER REFERENCES properties(id) ON DELETE SET NULL;
+    CREATE INDEX IF NOT EXISTS ix_properties_address_key ON properties (address_key);
+    CREATE INDEX IF NOT EXISTS ix_properties_duplicate_of_id ON properties (duplicate_of_id)
+    """
+    with engine.connect() as connection:
+        for statement in create_sql.split(';'):
+            if statement.strip():
+                connection.execute(text(statement))
+        connection.commit()
+
+if __name__ == "__main__":
+    try:
+        add_duplicate_columns()
+        db = SessionLocal()
+        try:
+            result = PropertyDuplicateService(db).cluster_duplicates()
+        finally:
+            db.close()
+        print(
+            f"✅ Scanned {result['properties_scanned']} properties: "
+            f"{result['clusters']} duplicate clusters, {result['duplicates']} duplicates "
+            f"({result['links_updated']} links updated, {result['address_keys_backfilled']} keys backfilled)"
+        )
+    except Exception as e:
+        print(f"❌ Error clustering duplicate listings: {e}")
+        sys.exit(1)
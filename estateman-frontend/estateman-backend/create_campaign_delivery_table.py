@@ -0,0 +1,22 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import text
+from app.core.database import engine
+from app.models.client import CampaignDelivery
+
+if __name__ == "__main__":
+    print("Creating campaign delivery table...")
+    try:
+        CampaignDelivery.__table__.create(bind=engine, checkfirst=True)
+        with engine.connect() as connection:
+            connection.execute(text("ALTER TABLE communication_campaigns ADD COLUMN IF NOT EXISTS error TEXT"))
+            connection.execute(text("ALTER TABLE communication_campaigns ADD COLUMN IF NOT EXISTS claimed_at TIMESTAMP WITH TIME ZONE"))
+            connection.commit()
+        print("✅ Campaign delivery table created successfully!")
+    except Exception as e:
+        print(f"❌ Error creating campaign delivery table: {e}")
+        sys.exit(1)
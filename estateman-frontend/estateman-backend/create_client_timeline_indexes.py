@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine, text
+from app.core.config import settings
+
+def create_client_timeline_indexes():
+    """Add the (client_id, created_at, id) indexes that back each client timeline source"""
+    
+    engine = create_engine(settings.DATABASE_URL)
+    
+    create_index_sql = """
+    CREATE INDEX IF NOT EXISTS ix_client_interactions_client_created ON client_interactions (client_id, created_at);
+    CREATE INDEX IF NOT EXISTS ix_leads_client_created ON leads (client_id, created_at, id);
+    CREATE INDEX IF NOT EXISTS ix_loyalty_transactions_client_created ON loyalty_transactions (client_id, created_at, id);
+    CREATE INDEX IF NOT EXISTS ix_transactions_client_created ON transactions (client_id, created_at, id);
+    CREATE INDEX IF NOT EXISTS ix_transaction_documents_transaction_created ON transaction_documents (transaction_id, created_at, id)
+    """
+    
+    try:
+        with engine.connect() as connection:
+            for statement in create_index_sql.split(';'):
+                if statement.strip():
+                    connection.execute(text(statement))
+            connection.commit()
+        
+        print("✅ Client timeline indexes created successfully!")
+        
+    except Exception as e:
+        print(f"❌ Error creating client timeline indexes: {e}")
+        return False
+    
+    return True
+
+if __name__ == "__main__":
+    print("Creating client timeline indexes...")
+    success = create_client_timeline_indexes()
+    
+    if not success:
+        sys.exit(1)
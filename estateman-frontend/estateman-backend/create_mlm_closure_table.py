@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""Create the MLM sponsor-tree closure table and fill it from mlm_partners.sponsor_id.
+
+Safe to re-run: the closure is regenerated from scratch each time.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import text
+from app.core.database import engine, SessionLocal
+from app.models.mlm import MLMPartnerClosure
+from app.services.mlm_network import MLMNetworkService
+
+if __name__ == "__main__":
+    print("Building MLM closure table...")
+    try:
+        MLMPartnerClosure.__table__.create(bind=engine, checkfirst=True)
+        with engine.connect() as connection:
+            connection.execute(text("CREATE INDEX IF NOT EXISTS ix_mlm_partners_sponsor_id ON mlm_partners (sponsor_id)"))
+            connection.commit()
+        db = SessionLocal()
+        try:
+            rows = MLMNetworkService(db).rebuild()
+        finally:
+            db.close()
+        print(f"✅ MLM closure table built ({rows} ancestor/descendant rows)")
+    except Exception as e:
+        print(f"❌ Error building MLM closure table: {e}")
+        sys.exit(1)
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine, text
+from app.core.config import settings
+
+def create_property_search_index():
+    """Add the weighted tsvector column and the GIN/trigram indexes used by property search"""
+    
+    engine = create_engine(settings.DATABASE_URL)
+    
+    create_index_sql = """
+    CREATE EXTENSION IF NOT EXISTS pg_trgm;
+    
+    ALTER TABLE properties ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(address, '')), 'B') ||
+            setweight(to_tsvector('english', coalesce(city, '')), 'B') ||
+            setweight(to_tsvector('english', coalesce(description, '')), 'C')
+        ) STORED;
+    
+    CREATE INDEX IF NOT EXISTS idx_properties_search_vector ON properties USING GIN (search_vector);
+    CREATE INDEX IF NOT EXISTS idx_properties_address_trgm ON properties USING GIN (address gin_trgm_ops)
+    """
+    
+    try:
+        with engine.connect() as connection:
+            for statement in create_index_sql.split(';'):
+                if statement.strip():
+                    connection.execute(text(statement))
+            connection.commit()
+        
+        print("✅ Property search indexes created successfully!")
+        
+    except Exception as e:
+        print(f"❌ Error creating property search indexes: {e}")
+        return False
+    
+    return True
+
+if __name__ == "__main__":
+    print("Creating property search indexes...")
+    success = create_property_search_index()
+    
+    if not success:
+        sys.exit(1)
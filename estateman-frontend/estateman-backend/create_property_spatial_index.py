@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine, text
+from app.core.config import settings
+from app.core.geo_utils import encode_geohash
+
+BATCH_SIZE = 1000
+
+def create_geohash_index(engine):
+    """Add the geohash column, backfill it and index it for prefix scans"""
+    create_sql = """
+    ALTER TABLE properties ADD COLUMN IF NOT EXISTS geohash VARCHAR(12);
+    CREATE INDEX IF NOT EXISTS idx_properties_geohash ON properties (geohash varchar_pattern_ops);
+    CREATE INDEX IF NOT EXISTS idx_properties_lat_lng ON properties (latitude, longitude)
+    """
+
+    with engine.connect() as connection:
+        for statement in create_sql.split(';'):
+            if statement.strip():
+                connection.execute(text(statement))
+        connection.commit()
+
+        # Backfill in batches so large tables don't hold one giant transaction
+        updated = 0
+        last_id = 0
+        while True:
+            rows = connection.execute(text("""
+                SELECT id, latitude, longitude FROM properties
+                WHERE id > :last_id AND latitude IS NOT NULL AND longitude IS NOT NULL
+                ORDER BY id LIMIT :batch_size
+            """), {"last_id": last_id, "batch_size": BATCH_SIZE}).fetchall()
+            if not rows:
+                break
+            connection.execute(
+                text("UPDATE properties SET geohash = :geohash WHERE id = :id"),
+                [{"id": row.id, "geohash": encode_geohash(row.latitude, row.longitude)} for row in rows]
+            )
+            connection.commit()
+            updated += len(rows)
+            last_id = rows[-1].id
+
+    print(f"✅ Geohash index ready ({updated} properties backfilled)")
+
+def create_postgis_index(engine):
+    """Add a PostGIS geography column with a GiST index, if PostGIS is available"""
+    postgis_sql = """
+    CREATE EXTENSION IF NOT EXISTS postgis;
+    ALTER TABLE properties ADD COLUMN IF NOT EXISTS geog geography(Point, 4326)
+        GENERATED ALWAYS AS (
+            CASE WHEN latitude IS NOT NULL AND longitude IS NOT NULL
+                THEN ST_SetSRID(ST_MakePoint(longitude, latitude), 4326)::geography
+            END
+        ) STORED;
+    CREATE INDEX IF NOT EXISTS idx_properties_geog ON properties USING GIST (geog)
+    """
+
+    try:
+        with engine.connect() as connection:
+            for statement in postgis_sql.split(';'):
+                if statement.strip():
+                    connection.execute(text(statement))
+            connection.commit()
+        print("✅ PostGIS geography index created. Set SPATIAL_BACKEND=postgis to use it.")
+        return True
+    except Exception as e:
+        print(f"⚠️  PostGIS not available, using geohash fallback: {e}")
+        return False
+
+if __name__ == "__main__":
+    engine = create_engine(settings.DATABASE_URL)
+    print("Creating property spatial indexes...")
+
+    try:
+        create_geohash_index(engine)
+    except Exception as e:
+        print(f"❌ Error creating geohash index: {e}")
+        sys.exit(1)
+
+    create_postgis_index(engine)
+    print("\n🎉 Property spatial indexing setup completed!")
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""Create the rank_requirements table used by the monthly rank qualification run.
+
+Ranks without a row are given the starting thresholds below; rows that
+already exist are left alone, so edits made through the API survive a re-run.
+Tune them with POST /api/v1/mlm/rank-requirements/.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.database import engine, SessionLocal
+from app.models.mlm import PartnerLevel, RankRequirement
+
+# (personal volume, group volume, active legs) a partner needs in a month
+STARTING_REQUIREMENTS = {
+    PartnerLevel.ASSOCIATE: (0.0, 0.0, 0),
+    PartnerLevel.BRONZE_PARTNER: (50000.0, 250000.0, 1),
+    PartnerLevel.SILVER_PARTNER: (100000.0, 1000000.0, 2),
+    PartnerLevel.GOLD_PARTNER: (150000.0, 5000000.0, 3),
+    PartnerLevel.DIAMOND_PARTNER: (200000.0, 20000000.0, 5)
+}
+
+if __name__ == "__main__":
+    print("Creating rank requirements table...")
+    try:
+        RankRequirement.__table__.create(bind=engine, checkfirst=True)
+        db = SessionLocal()
+        try:
+            existing = {rank for (rank,) in db.query(RankRequirement.rank)}
+            missing = [rank for rank in STARTING_REQUIREMENTS if rank not in existing]
+            db.add_all([
+                RankRequirement(
+                    rank=rank,
+                    min_personal_volume=STARTING_REQUIREMENTS[rank][0],
+                    min_group_volume=STARTING_REQUIREMENTS[rank][1],
+                    min_active_legs=STARTING_REQUIREMENTS[rank][2]
+                )
+                for rank in missing
+            ])
+            db.commit()
+        finally:
+            db.close()
+        print(f"✅ Rank requirements table ready ({len(missing)} ranks seeded)")
+    except Exception as e:
+        print(f"❌ Error creating rank requirements table: {e}")
+        sys.exit(1)
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+from sqlalchemy import create_engine, text
+
+# Add the app directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.services.property import PropertyService
+
+def migrate_properties_table():
+    """Add denormalized counter/latest-valuation columns to properties and backfill them"""
+    
+    engine = create_engine(settings.DATABASE_URL)
+    
+    migration_commands = [
+        "ALTER TABLE properties ADD COLUMN IF NOT EXISTS images_count INTEGER DEFAULT 0",
+        "ALTER TABLE properties ADD COLUMN IF NOT EXISTS documents_count INTEGER DEFAULT 0",
+        "ALTER TABLE properties ADD COLUMN IF NOT EXISTS showings_count INTEGER DEFAULT 0",
+        "ALTER TABLE properties ADD COLUMN IF NOT EXISTS latest_valuation_amount DOUBLE PRECISION",
+        "ALTER TABLE properties ADD COLUMN IF NOT EXISTS latest_valuation_date TIMESTAMP WITH TIME ZONE",
+        
+        # Child foreign keys used by the counter repair subqueries
+        "CREATE INDEX IF NOT EXISTS ix_property_images_property_id ON property_images (property_id)",
+        "CREATE INDEX IF NOT EXISTS ix_property_documents_property_id ON property_documents (property_id)",
+        "CREATE INDEX IF NOT EXISTS ix_property_showings_property_id ON property_showings (property_id)",
+        "CREATE INDEX IF NOT EXISTS ix_property_valuations_property_id ON property_valuations (property_id)"
+    ]
+    
+    try:
+        with engine.connect() as connection:
+            print("Starting properties table migration...")
+            
+            for i, command in enumerate(migration_commands, 1):
+                print(f"Executing migration step {i}/{len(migration_commands)}...")
+                connection.execute(text(command))
+                connection.commit()
+                print(f"✓ Step {i} completed successfully")
+        
+        print("Backfilling property counters...")
+        db = SessionLocal()
+        try:
+            updated = PropertyService(db).recompute_property_counters()
+        finally:
+            db.close()
+        print(f"✓ Recomputed counters for {updated} properties")
+        
+        print("\n✅ Properties table migration completed successfully!")
+        
+    except Exception as e:
+        print(f"\n❌ Migration failed: {e}")
+        return False
+    
+    return True
+
+if __name__ == "__main__":
+    success = migrate_properties_table()
+    sys.exit(0 if success else 1)
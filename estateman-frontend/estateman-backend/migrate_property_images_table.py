@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+from sqlalchemy import create_engine, text
+
+# Add the app directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.config import settings
+
+def migrate_property_images_table():
+    """Add image dimension and responsive variant columns to property_images"""
+    
+    engine = create_engine(settings.DATABASE_URL)
+    
+    migration_commands = [
+        "ALTER TABLE property_images ADD COLUMN IF NOT EXISTS width INTEGER",
+        "ALTER TABLE property_images ADD COLUMN IF NOT EXISTS height INTEGER",
+        "ALTER TABLE property_images ADD COLUMN IF NOT EXISTS variants JSON"
+    ]
+    
+    try:
+        with engine.connect() as connection:
+            print("Starting property_images table migration...")
+            
+            for i, command in enumerate(migration_commands, 1):
+                print(f"Executing migration step {i}/{len(migration_commands)}...")
+                connection.execute(text(command))
+                connection.commit()
+                print(f"✓ Step {i} completed successfully")
+            
+            print("\n✅ Property images table migration completed successfully!")
+            
+    except Exception as e:
+        print(f"\n❌ Migration failed: {e}")
+        return False
+    
+    return True
+
+if __name__ == "__main__":
+    success = migrate_property_images_table()
+    sys.exit(0 if success else 1)
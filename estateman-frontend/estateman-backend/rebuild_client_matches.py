@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+"""Rebuild the client_property_matches table.
+
+Client and property writes keep their own matches current; run this nightly
+(e.g. from cron) to pick up out-of-band edits.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.database import engine, SessionLocal
+from app.models.client import ClientPropertyMatch
+from app.services.client_matching import ClientMatchingService
+
+if __name__ == "__main__":
+    try:
+        ClientPropertyMatch.__table__.create(bind=engine, checkfirst=True)
+        db = SessionLocal()
+        try:
+            created = ClientMatchingService(db).rebuild()
+        finally:
+            db.close()
+        print(f"✅ Client matches rebuilt ({created} matches)")
+    except Exception as e:
+        print(f"❌ Error rebuilding client matches: {e}")
+        sys.exit(1)
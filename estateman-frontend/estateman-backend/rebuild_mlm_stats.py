@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""Recompute every MLM partner's network statistics.
+
+Partner joins and sponsor moves update the stats of the whole upline as they
+happen; run this after bulk imports or direct edits to mlm_partners.sponsor_id,
+or nightly as a consistency check. The closure table is regenerated first so
+tree queries agree with the recomputed stats.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.database import SessionLocal
+from app.services.mlm_network import MLMNetworkService
+from app.services.mlm_tree import mlm_tree_cache
+
+if __name__ == "__main__":
+    print("Rebuilding MLM network statistics...")
+    try:
+        db = SessionLocal()
+        try:
+            network = MLMNetworkService(db)
+            closure_rows = network.rebuild()
+            result = network.rebuild_stats()
+        finally:
+            db.close()
+        mlm_tree_cache.invalidate()
+        print(f"✅ MLM closure rebuilt ({closure_rows} ancestor/descendant rows)")
+        print(f"✅ Network statistics recomputed for {result['partners']} partners ({result['updated']} changed)")
+        if result["unreachable"]:
+            print(f"⚠️  {result['unreachable']} partners are in a sponsor cycle and were left unchanged")
+    except Exception as e:
+        print(f"❌ Error rebuilding MLM network statistics: {e}")
+        sys.exit(1)
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""Rebuild the market_stats rollup.
+
+Property writes keep their own month's cell current; run this nightly (e.g. from
+cron) so days-on-market for open listings and any out-of-band edits are refreshed.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import text
+from app.core.database import engine, SessionLocal
+from app.models.property import MarketStat
+from app.services.market_stats import MarketStatsService
+
+def create_market_stats_table():
+    """Create the rollup table and the index used for per-cell refreshes"""
+    MarketStat.__table__.create(bind=engine, checkfirst=True)
+    with engine.connect() as connection:
+        connection.execute(text(
+            "CREATE INDEX IF NOT EXISTS idx_properties_city_type_created "
+            "ON properties (city, property_type, created_at)"
+        ))
+        connection.commit()
+
+if __name__ == "__main__":
+    try:
+        create_market_stats_table()
+        db = SessionLocal()
+        try:
+            cells = MarketStatsService(db).rebuild()
+        finally:
+            db.close()
+        print(f"✅ Market stats rebuilt ({cells} city/type/month cells)")
+    except Exception as e:
+        print(f"❌ Error rebuilding market stats: {e}")
+        sys.exit(1)
@@ -0,0 +1,24 @@
+#!/usr/bin/env python3
+"""Recompute denormalized property counters and latest valuations in bulk.
+
+Writes through PropertyService keep them current; run this after manual data
+fixes or on a schedule as a safety net.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.database import SessionLocal
+from app.services.property import PropertyService
+
+if __name__ == "__main__":
+    db = SessionLocal()
+    try:
+        updated = PropertyService(db).recompute_property_counters()
+        print(f"✅ Recomputed counters for {updated} properties")
+    except Exception as e:
+        print(f"❌ Error repairing property counters: {e}")
+        sys.exit(1)
+    finally:
+        db.close()
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""Recompute every client's lead score.
+
+Client and interaction writes rescore the affected client immediately; run this
+nightly (e.g. from cron) so scores decay as interactions age out of the
+30-day engagement window.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import text
+from app.core.database import engine, SessionLocal
+from app.models.client import LeadScoreHistory
+from app.services.lead_scoring import LeadScoringService
+
+def create_lead_scoring_tables():
+    """Create the history table and the index behind the recent-interaction counts"""
+    LeadScoreHistory.__table__.create(bind=engine, checkfirst=True)
+    with engine.connect() as connection:
+        connection.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_client_interactions_client_created "
+            "ON client_interactions (client_id, created_at)"
+        ))
+        connection.commit()
+
+if __name__ == "__main__":
+    try:
+        create_lead_scoring_tables()
+        db = SessionLocal()
+        try:
+            changed = LeadScoringService(db).score_clients()
+        finally:
+            db.close()
+        print(f"✅ Lead scores recomputed ({changed} clients changed)")
+    except Exception as e:
+        print(f"❌ Error recomputing lead scores: {e}")
+        sys.exit(1)
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""Create the payout-run schema and pay out a period's unpaid MLM commissions.
+
+    python run_commission_payouts.py               # the previous calendar month
+    python run_commission_payouts.py 2024 5        # a given month
+    python run_commission_payouts.py --schema-only # only create tables, columns and indexes
+
+Commissions and adjustments already included in a payout are never paid
+again, so re-running a period only pays what was added since.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import text
+from app.core.database import engine, SessionLocal
+from app.core.datetime_utils import utc_now
+from app.models.mlm import CommissionPayoutRun
+from app.services.mlm_payouts import PayoutRunService
+from app.services.mlm_simulator import month_bounds
+
+def create_payout_run_schema():
+    """Add the run table and the columns linking payouts, commissions and adjustments to it"""
+    CommissionPayoutRun.__table__.create(bind=engine, checkfirst=True)
+    alter_sql = """
+    ALTER TABLE commission_payouts ADD COLUMN IF NOT EXISTS run_id INTEGER REFERENCES commission_payout_runs(id);
+    ALTER TABLE mlm_commissions ADD COLUMN IF NOT EXISTS payout_id INTEGER REFERENCES commission_payouts(id);
+    ALTER TABLE commission_adjustments ADD COLUMN IF NOT EXISTS payout_id INTEGER REFERENCES commission_payouts(id);
+    CREATE UNIQUE INDEX IF NOT EXISTS ix_commission_payouts_run_partner ON commission_payouts (run_id, partner_id);
+    CREATE INDEX IF NOT EXISTS ix_mlm_commissions_payout_created ON mlm_commissions (payout_id, created_at);
+    CREATE INDEX IF NOT EXISTS ix_commission_adjustments_payout_id ON commission_adjustments (payout_id)
+    """
+    with engine.connect() as connection:
+        for statement in alter_sql.split(';'):
+            if statement.strip():
+                connection.execute(text(statement))
+        connection.commit()
+
+def previous_month():
+    today = utc_now()
+    return (today.year, today.month - 1) if today.month > 1 else (today.year - 1, 12)
+
+if __name__ == "__main__":
+    try:
+        create_payout_run_schema()
+        print("✅ Payout run schema ready")
+        if "--schema-only" in sys.argv:
+            sys.exit(0)
+
+        args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+        year, month = (int(args[0]), int(args[1])) if len(args) == 2 else previous_month()
+        period_start, period_end = month_bounds(year, month)
+        db = SessionLocal()
+        try:
+            service = PayoutRunService(db)
+            run = service.execute(service.start_run(period_start, period_end, created_by=None).id)
+            print(f"✅ Payout run {run.id} for {year}-{month:02d}: {run.payout_count} payouts, {run.total_amount:.2f} total")
+            print(f"   File: {run.file_path}")
+        finally:
+            db.close()
+    except Exception as e:
+        print(f"❌ Error running commission payouts: {e}")
+        sys.exit(1)
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""Evaluate monthly rank qualification for the whole MLM network.
+
+    python run_rank_qualification.py                   # the previous calendar month
+    python run_rank_qualification.py 2024 5            # a given month
+    python run_rank_qualification.py --apply           # also write the qualified ranks to the partners
+    python run_rank_qualification.py --apply --allow-demotion  # and lower ranks that were not re-qualified
+
+Re-running a month replaces its qualification results. Thresholds come from
+the rank_requirements table (see create_rank_requirements_table.py).
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import text
+from app.core.database import engine, SessionLocal
+from app.core.datetime_utils import utc_now
+from app.services.mlm_qualification import RankQualificationEngine
+
+def previous_month():
+    today = utc_now()
+    return (today.year, today.month - 1) if today.month > 1 else (today.year - 1, 12)
+
+if __name__ == "__main__":
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    year, month = (int(args[0]), int(args[1])) if len(args) == 2 else previous_month()
+    print(f"Running rank qualification for {year}-{month:02d}...")
+    try:
+        with engine.connect() as connection:
+            connection.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_commission_qualifications_period_partner "
+                "ON commission_qualifications (period_start, period_end, partner_id)"
+            ))
+            connection.commit()
+        db = SessionLocal()
+        try:
+            result = RankQualificationEngine(db).run(
+                year, month,
+                allow_demotion="--allow-demotion" in sys.argv,
+                apply_rank_changes="--apply" in sys.argv
+            )
+        finally:
+            db.close()
+        applied = "applied" if result["rank_changes_applied"] else "not applied, pass --apply to write them"
+        print(f"✅ Evaluated {result['evaluated']} partners ({result['promotions']} promotions, {result['demotions']} demotions, {applied})")
+        for rank, count in result["rank_distribution"].items():
+            print(f"   {rank}: {count}")
+        if result["unreachable"]:
+            print(f"⚠️  {result['unreachable']} partners are in a sponsor cycle and were skipped")
+    except Exception as e:
+        print(f"❌ Error running rank qualification: {e}")
+        sys.exit(1)
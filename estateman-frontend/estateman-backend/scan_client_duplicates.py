@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""Find duplicate clients across the whole client base.
+
+Adds the normalized match-key columns and their indexes if needed, lets
+merge records outlive the duplicate they name, backfills the keys and
+rebuilds the pending client_duplicates candidates.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import text
+from app.core.database import engine, SessionLocal
+from app.services.client_dedupe import ClientDedupeService
+
+def create_client_match_keys():
+    """Add the match-key columns, their btree indexes and the name trigram index"""
+    create_sql = """
+    CREATE EXTENSION IF NOT EXISTS pg_trgm;
+    ALTER TABLE clients ADD COLUMN IF NOT EXISTS email_key VARCHAR(255);
+    ALTER TABLE clients ADD COLUMN IF NOT EXISTS phone_key VARCHAR(20);
+    ALTER TABLE clients ADD COLUMN IF NOT EXISTS name_key VARCHAR(255);
+    CREATE INDEX IF NOT EXISTS ix_clients_email_key ON clients (email_key);
+    CREATE INDEX IF NOT EXISTS ix_clients_phone_key ON clients (phone_key);
+    CREATE INDEX IF NOT EXISTS ix_clients_name_key ON clients (name_key);
+    CREATE INDEX IF NOT EXISTS idx_clients_name_key_trgm ON clients USING GIN (name_key gin_trgm_ops);
+    CREATE INDEX IF NOT EXISTS ix_client_duplicates_pair ON client_duplicates (primary_client_id, duplicate_client_id);
+    ALTER TABLE client_duplicates ALTER COLUMN duplicate_client_id DROP NOT NULL;
+    ALTER TABLE client_duplicates DROP CONSTRAINT IF EXISTS client_duplicates_duplicate_client_id_fkey;
+    ALTER TABLE client_duplicates ADD CONSTRAINT client_duplicates_duplicate_client_id_fkey
+        FOREIGN KEY (duplicate_client_id) REFERENCES clients (id) ON DELETE SET NULL
+    """
+    with engine.connect() as connection:
+        for statement in create_sql.split(';'):
+            if statement.strip():
+                connection.execute(text(statement))
+        connection.commit()
+
+if __name__ == "__main__":
+    try:
+        create_client_match_keys()
+        db = SessionLocal()
+        try:
+            result = ClientDedupeService(db).scan()
+        finally:
+            db.close()
+        print(
+            f"✅ Compared {result['pairs_compared']} candidate pairs, "
+            f"{result['duplicates_found']} likely duplicates "
+            f"({result['keys_backfilled']} keys backfilled, {result['oversized_blocks_skipped']} oversized blocks skipped)"
+        )
+    except Exception as e:
+        print(f"❌ Error scanning for duplicate clients: {e}")
+        sys.exit(1)
@@ -0,0 +1,107 @@
+"""Client merges against SQLite with foreign keys enforced, as PostgreSQL always does"""
+import os
+import sys
+
+os.environ.setdefault("DB_HOST", "localhost")
+os.environ.setdefault("DB_PORT", "5432")
+os.environ.setdefault("DB_USER", "test")
+os.environ.setdefault("DB_PASSWORD", "test")
+os.environ.setdefault("DB_NAME", "test")
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import importlib
+import pkgutil
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+import app.models
+from app.core.database import Base
+from app.models.client import Client, ClientDuplicate, ClientInteraction, LoyaltyTier
+from app.models.user import User
+from app.services.client import CommunicationService
+from app.services.client_merge import ClientMergeService
+
+# Every table on Base.metadata, so create_all can resolve each foreign key
+for module in pkgutil.iter_modules(app.models.__path__):
+    importlib.import_module(f"app.models.{module.name}")
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+
+    @event.listens_for(engine, "connect")
+    def enforce_foreign_keys(connection, record):
+        connection.execute("PRAGMA foreign_keys=ON")
+
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+@pytest.fixture
+def agent(db):
+    user = User(email="agent@example.com", username="agent", hashed_password="x", first_name="A", last_name="Gent")
+    db.add(user)
+    db.commit()
+    return user
+
+def make_client(db, agent, number, points=0):
+    client = Client(
+        client_id=f"CL{number:04d}", first_name=f"Client{number}", last_name="Test",
+        email=f"client{number}@example.com", loyalty_points=points, total_spent=100.0
+    )
+    db.add(client)
+    db.flush()
+    db.add(ClientInteraction(client_id=client.id, agent_id=agent.id, type="email", subject="hello"))
+    db.commit()
+    return client
+
+def test_merge_clusters_deletes_duplicates_and_keeps_merge_records(db, agent):
+    clients = [make_client(db, agent, number, points=1500) for number in range(5)]
+    ids = [client.id for client in clients]
+    db.add(ClientDuplicate(primary_client_id=ids[0], duplicate_client_id=ids[1], similarity_score=80))
+    db.commit()
+
+    summary = ClientMergeService(db).merge_clusters([
+        {"primary_id": ids[0], "duplicate_ids": [ids[1], ids[2]]},
+        {"primary_id": ids[3], "duplicate_ids": [ids[4]]}
+    ], agent.id)
+
+    assert summary["duplicates_merged"] == 3
+    assert sorted(client_id for (client_id,) in db.query(Client.id)) == [ids[0], ids[3]]
+    assert {client_id for (client_id,) in db.query(ClientInteraction.client_id)} == {ids[0], ids[3]}
+
+    primary = db.query(Client).filter(Client.id == ids[0]).one()
+    assert primary.loyalty_points == 4500
+    assert primary.total_spent == 300.0
+    assert primary.loyalty_tier == LoyaltyTier.SILVER
+
+    records = db.query(ClientDuplicate).order_by(ClientDuplicate.id).all()
+    assert [record.status for record in records] == ["merged"] * 3
+    assert all(record.duplicate_client_id is None for record in records)
+    assert {record.match_criteria["duplicate_client_id"] for record in records} == {ids[1], ids[2], ids[4]}
+    assert {record.match_criteria["email"] for record in records} == {
+        "client1@example.com", "client2@example.com", "client4@example.com"
+    }
+
+def test_primary_merged_later_carries_its_merge_records(db, agent):
+    ids = [make_client(db, agent, number, points=100).id for number in range(3)]
+    service = ClientMergeService(db)
+    service.merge_clusters([{"primary_id": ids[1], "duplicate_ids": [ids[2]]}], agent.id)
+    service.merge_clusters([{"primary_id": ids[0], "duplicate_ids": [ids[1]]}], agent.id)
+
+    assert [client_id for (client_id,) in db.query(Client.id)] == [ids[0]]
+    # Only the second merge's duplicate is added; the first one was already folded into it
+    assert db.query(Client.loyalty_points).filter(Client.id == ids[0]).scalar() == 300
+    assert {record.primary_client_id for record in db.query(ClientDuplicate)} == {ids[0]}
+
+def test_pairwise_merge_delegates_to_bulk_merge(db, agent):
+    primary_id, duplicate_id = make_client(db, agent, 1).id, make_client(db, agent, 2).id
+    agent_id = agent.id
+
+    assert CommunicationService(db).merge_clients(primary_id, duplicate_id, agent_id) is True
+    assert db.query(Client).filter(Client.id == duplicate_id).first() is None
+    assert CommunicationService(db).merge_clients(primary_id, duplicate_id, agent_id) is False
@@ -0,0 +1,126 @@
+"""Multi-level commissions against SQLite with foreign keys enforced, as PostgreSQL always does"""
+import os
+import sys
+
+os.environ.setdefault("DB_HOST", "localhost")
+os.environ.setdefault("DB_PORT", "5432")
+os.environ.setdefault("DB_USER", "test")
+os.environ.setdefault("DB_PASSWORD", "test")
+os.environ.setdefault("DB_NAME", "test")
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import importlib
+import pkgutil
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+import app.models
+from app.core.database import Base
+from app.models.mlm import MLMCommission, MLMPartner
+from app.models.user import User
+from app.schemas.mlm import CommissionSale
+from app.services.mlm_commissions import COMMISSION_RATES, MLMCommissionEngine
+from app.services.mlm_network import MLMNetworkService
+
+# Every table on Base.metadata, so create_all can resolve each foreign key
+for module in pkgutil.iter_modules(app.models.__path__):
+    importlib.import_module(f"app.models.{module.name}")
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+
+    @event.listens_for(engine, "connect")
+    def enforce_foreign_keys(connection, record):
+        connection.execute("PRAGMA foreign_keys=ON")
+
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+@pytest.fixture
+def chain(db):
+    """Partner ids from the root down, each sponsored by the one before; one deeper than the plan pays"""
+    ids = []
+    for number in range(len(COMMISSION_RATES) + 2):
+        user = User(email=f"partner{number}@example.com", username=f"partner{number}", hashed_password="x",
+                    first_name=f"Partner{number}", last_name="Test")
+        db.add(user)
+        db.flush()
+        partner = MLMPartner(
+            user_id=user.id, referral_code=f"REF{number:04d}", sponsor_id=ids[-1] if ids else None,
+            monthly_commission=10.0, total_earnings=100.0
+        )
+        db.add(partner)
+        db.flush()
+        ids.append(partner.id)
+    db.commit()
+    MLMNetworkService(db).rebuild()
+    db.commit()
+    return ids
+
+def paid_by_partner(db):
+    """partner id -> (level, amount) of its commission"""
+    return {
+        partner_id: (level, round(amount, 6))
+        for partner_id, level, amount in db.query(MLMCommission.partner_id, MLMCommission.level, MLMCommission.amount)
+    }
+
+def test_each_level_is_paid_its_rate_up_to_the_last_level(db, chain):
+    seller = chain[-1]
+    result = MLMCommissionEngine(db).apply([CommissionSale(source_partner_id=seller, amount=1000.0, idempotency_key="sale-1")])
+
+    sponsors = list(reversed(chain[:-1]))
+    expected = {sponsors[level - 1]: (level, round(1000.0 * rate, 6)) for level, rate in COMMISSION_RATES.items()}
+    assert paid_by_partner(db) == expected
+    assert chain[0] not in paid_by_partner(db)
+    assert result["commissions_created"] == len(COMMISSION_RATES)
+    assert result["total_amount"] == pytest.approx(1000.0 * sum(COMMISSION_RATES.values()))
+
+def test_chain_stops_at_an_inactive_sponsor(db, chain):
+    sponsors = list(reversed(chain[:-1]))
+    db.get(MLMPartner, sponsors[2]).is_active = False
+    db.commit()
+
+    MLMCommissionEngine(db).apply([CommissionSale(source_partner_id=chain[-1], amount=1000.0, idempotency_key="sale-1")])
+
+    assert paid_by_partner(db) == {sponsors[0]: (1, 150.0), sponsors[1]: (2, 70.0)}
+
+def test_resubmitted_sale_is_skipped(db, chain):
+    engine = MLMCommissionEngine(db)
+    sale = CommissionSale(source_partner_id=chain[-1], amount=1000.0, reference_transaction_id=42)
+    engine.apply([sale])
+    result = engine.apply([sale])
+
+    assert result["commissions_created"] == 0
+    assert result["duplicates_skipped"] == len(COMMISSION_RATES)
+    assert result["partners_credited"] == 0
+    assert db.query(MLMCommission).count() == len(COMMISSION_RATES)
+    assert db.query(MLMCommission.idempotency_key).filter_by(level=1).scalar() == "txn:42:1"
+
+def test_unknown_sources_are_reported_and_pay_nothing(db, chain):
+    result = MLMCommissionEngine(db).apply([
+        CommissionSale(source_partner_id=chain[-1], amount=100.0, idempotency_key="known"),
+        CommissionSale(source_partner_id=99999, amount=100.0, idempotency_key="unknown")
+    ])
+
+    assert result["unknown_sources"] == [99999]
+    assert db.query(MLMCommission).filter_by(source_partner_id=99999).count() == 0
+    assert db.query(MLMCommission).count() == len(COMMISSION_RATES)
+
+def test_partner_credits_are_summed_across_sales(db, chain):
+    sponsor = chain[-2]
+    MLMCommissionEngine(db).apply([
+        CommissionSale(source_partner_id=chain[-1], amount=1000.0, idempotency_key="sale-1"),
+        CommissionSale(source_partner_id=chain[-1], amount=500.0, idempotency_key="sale-2")
+    ])
+    db.expire_all()
+
+    partner = db.get(MLMPartner, sponsor)
+    assert partner.monthly_commission == pytest.approx(10.0 + 225.0)
+    assert partner.total_earnings == pytest.approx(100.0 + 225.0)
+    assert db.get(MLMPartner, chain[0]).total_earnings == pytest.approx(100.0)
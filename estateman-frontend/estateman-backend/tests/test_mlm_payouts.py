@@ -0,0 +1,103 @@
+"""Payout runs against SQLite with foreign keys enforced, as PostgreSQL always does"""
+import os
+import sys
+
+os.environ.setdefault("DB_HOST", "localhost")
+os.environ.setdefault("DB_PORT", "5432")
+os.environ.setdefault("DB_USER", "test")
+os.environ.setdefault("DB_PASSWORD", "test")
+os.environ.setdefault("DB_NAME", "test")
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import importlib
+import pkgutil
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+import app.models
+from app.core.config import settings
+from app.core.database import Base
+from app.models.mlm import CommissionAdjustment, CommissionPayout, CommissionType, MLMCommission, MLMPartner
+from app.models.user import User
+from app.services.mlm_payouts import PayoutRunService
+
+# Every table on Base.metadata, so create_all can resolve each foreign key
+for module in pkgutil.iter_modules(app.models.__path__):
+    importlib.import_module(f"app.models.{module.name}")
+
+MAY = (datetime(2026, 5, 1, tzinfo=timezone.utc), datetime(2026, 6, 1, tzinfo=timezone.utc))
+JUNE = (datetime(2026, 6, 1, tzinfo=timezone.utc), datetime(2026, 7, 1, tzinfo=timezone.utc))
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "PAYOUT_FILE_DIR", str(tmp_path))
+    engine = create_engine("sqlite://")
+
+    @event.listens_for(engine, "connect")
+    def enforce_foreign_keys(connection, record):
+        connection.execute("PRAGMA foreign_keys=ON")
+
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+@pytest.fixture
+def partners(db):
+    users = [
+        User(email=f"partner{i}@example.com", username=f"partner{i}", hashed_password="x",
+             first_name=f"Partner{i}", last_name="Test")
+        for i in (1, 2)
+    ]
+    db.add_all(users)
+    db.flush()
+    rows = [MLMPartner(user_id=user.id, referral_code=f"REF{user.id}") for user in users]
+    db.add_all(rows)
+    db.commit()
+    return [partner.id for partner in rows]
+
+def add_commission(db, partner_id, amount, created_at):
+    commission = MLMCommission(
+        partner_id=partner_id, source_partner_id=partner_id, commission_type=CommissionType.LEVEL_BONUS,
+        level=1, percentage=10.0, amount=amount, created_at=created_at
+    )
+    db.add(commission)
+    db.commit()
+    return commission.id
+
+def run_period(db, period):
+    service = PayoutRunService(db)
+    run = service.execute(service.start_run(*period, created_by=None).id)
+    return {payout.partner_id: payout.total_amount for payout in db.query(CommissionPayout).filter_by(run_id=run.id)}
+
+def test_net_negative_partner_carries_chargeback_into_next_period(db, partners):
+    debtor, earner = partners
+    commission_id = add_commission(db, debtor, 100.0, datetime(2026, 5, 3))
+    add_commission(db, earner, 40.0, datetime(2026, 5, 4))
+    db.add(CommissionAdjustment(
+        commission_id=commission_id, adjustment_type="chargeback", amount=150.0,
+        reason="refund", created_by=db.get(MLMPartner, earner).user_id, created_at=datetime(2026, 5, 20)
+    ))
+    db.commit()
+
+    assert run_period(db, MAY) == {earner: 40.0}
+    assert db.query(MLMCommission).filter_by(partner_id=debtor, payout_id=None).count() == 1
+    assert db.query(CommissionAdjustment).filter_by(payout_id=None).count() == 1
+
+    add_commission(db, debtor, 80.0, datetime(2026, 6, 10))
+    assert run_period(db, JUNE) == {debtor: 30.0}
+    assert db.query(MLMCommission).filter_by(payout_id=None).count() == 0
+    assert db.query(CommissionAdjustment).filter_by(payout_id=None).count() == 0
+
+def test_rerunning_a_period_pays_only_new_rows(db, partners):
+    partner = partners[0]
+    add_commission(db, partner, 25.0, datetime(2026, 5, 3))
+    assert run_period(db, MAY) == {partner: 25.0}
+    assert run_period(db, MAY) == {}
+
+    add_commission(db, partner, 10.0, datetime(2026, 5, 30))
+    assert run_period(db, MAY) == {partner: 10.0}
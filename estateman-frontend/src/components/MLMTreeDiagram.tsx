@@ -15,8 +15,30 @@ interface TreeNode {
   monthly_commission: number
   children: TreeNode[]
   avatar?: string
+  child_count: number
+  expand_cursor?: string | null
+  total_network_size?: number | null
+  network_depth?: number | null
 }
 
+// Levels fetched per request; deeper nodes are loaded when expanded
+const TREE_PAGE_DEPTH = 3
+
+const convertNode = (node: APITreeNode): TreeNode => ({
+  id: node.id,
+  name: node.name,
+  level: node.level,
+  referral_id: node.referral_id,
+  direct_referrals: node.direct_referrals,
+  monthly_commission: node.monthly_commission,
+  children: node.children.map(convertNode),
+  avatar: node.avatar,
+  child_count: node.child_count,
+  expand_cursor: node.expand_cursor,
+  total_network_size: node.total_network_size,
+  network_depth: node.network_depth
+})
+
 
 
 interface MLMTreeDiagramProps {
@@ -27,7 +49,25 @@ interface MLMTreeDiagramProps {
 }
 
 const TreeNodeComponent = ({ node, level = 0 }: { node: TreeNode; level?: number }) => {
-  const [isExpanded, setIsExpanded] = useState(level < 2)
+  const [isExpanded, setIsExpanded] = useState(level < 2 && node.children.length > 0)
+  const [children, setChildren] = useState<TreeNode[]>(node.children)
+  const [loadingChildren, setLoadingChildren] = useState(false)
+
+  const toggleExpanded = async () => {
+    if (!isExpanded && children.length === 0 && node.expand_cursor) {
+      setLoadingChildren(true)
+      try {
+        const subtree = await mlmService.getMLMTree(node.expand_cursor, TREE_PAGE_DEPTH)
+        setChildren(subtree.children.map(convertNode))
+      } catch (error) {
+        console.error('Error fetching MLM subtree:', error)
+        return
+      } finally {
+        setLoadingChildren(false)
+      }
+    }
+    setIsExpanded(!isExpanded)
+  }
   
   const getLevelColor = (level: string) => {
     switch (level) {
@@ -61,11 +101,12 @@ const TreeNodeComponent = ({ node, level = 0 }: { node: TreeNode; level?: number
               <p className="text-xs text-muted-foreground">ID: {node.referral_id}</p>
             </div>
           </div>
-          {node.children.length > 0 && (
+          {node.child_count > 0 && (
             <Button
               variant="ghost"
               size="sm"
-              onClick={() => setIsExpanded(!isExpanded)}
+              onClick={toggleExpanded}
+              disabled={loadingChildren}
               className="h-6 w-6 p-0"
             >
               {isExpanded ? <Minus className="h-3 w-3" /> : <Plus className="h-3 w-3" />}
@@ -90,19 +131,19 @@ const TreeNodeComponent = ({ node, level = 0 }: { node: TreeNode; level?: number
       </div>
 
       {/* Connection Line */}
-      {node.children.length > 0 && isExpanded && (
+      {children.length > 0 && isExpanded && (
         <div className="w-1.5 h-6 bg-[hsl(var(--mlm-line))]" />
       )}
 
       {/* Children */}
-      {node.children.length > 0 && isExpanded && (
+      {children.length > 0 && isExpanded && (
         <div className="flex flex-col items-center">
           {/* Horizontal Line */}
           <div className="flex items-center">
-            <div className={`${node.children.length > 1 ? 'w-12' : 'w-0'} h-1.5 bg-[hsl(var(--mlm-line))]`} />
-            {node.children.length > 1 && (
+            <div className={`${children.length > 1 ? 'w-12' : 'w-0'} h-1.5 bg-[hsl(var(--mlm-line))]`} />
+            {children.length > 1 && (
               <>
-                {node.children.slice(1).map((_, index) => (
+                {children.slice(1).map((_, index) => (
                   <div key={index} className="w-24 h-1.5 bg-[hsl(var(--mlm-line))]" />
                 ))}
                 <div className="w-12 h-1.5 bg-[hsl(var(--mlm-line))]" />
@@ -112,7 +153,7 @@ const TreeNodeComponent = ({ node, level = 0 }: { node: TreeNode; level?: number
           
           {/* Children Nodes */}
           <div className="flex gap-8 pt-2">
-            {node.children.map((child) => (
+            {children.map((child) => (
               <div key={child.id} className="flex flex-col items-center">
                 <div className="w-1.5 h-4 bg-[hsl(var(--mlm-line))]" />
                 <TreeNodeComponent node={child} level={level + 1} />
@@ -140,18 +181,7 @@ export function MLMTreeDiagram({ isOpen, onClose, partnerId, partnerName }: MLMT
     
     setLoading(true)
     try {
-      const data = await mlmService.getMLMTree(parseInt(partnerId))
-      // Convert API response to component format
-      const convertNode = (node: APITreeNode): TreeNode => ({
-        id: node.id,
-        name: node.name,
-        level: node.level,
-        referral_id: node.referral_id,
-        direct_referrals: node.direct_referrals,
-        monthly_commission: node.monthly_commission,
-        children: node.children.map(convertNode),
-        avatar: node.avatar
-      })
+      const data = await mlmService.getMLMTree(parseInt(partnerId), TREE_PAGE_DEPTH)
       setTreeData(convertNode(data))
     } catch (error) {
       console.error('Error fetching MLM tree:', error)
@@ -177,7 +207,13 @@ export function MLMTreeDiagram({ isOpen, onClose, partnerId, partnerName }: MLMT
     }
 
     node.children.forEach(child => traverse(child, 1))
-    return { size, depth: maxDepth, totalCommission, totalEarnings }
+    // Only the top levels are loaded; the root carries the size and depth of the whole network
+    return {
+      size: node.total_network_size != null ? node.total_network_size + 1 : size,
+      depth: node.network_depth ?? maxDepth,
+      totalCommission,
+      totalEarnings
+    }
   }
 
   const stats = treeData ? calculateNetworkStats(treeData) : null
@@ -30,6 +30,7 @@ interface PropertyDetailModalProps {
 }
 
 export function PropertyDetailModal({ property, isOpen, onClose }: PropertyDetailModalProps) {
+  const [details, setDetails] = useState<Property | null>(null)
   const [images, setImages] = useState<PropertyImage[]>([])
   const [documents, setDocuments] = useState<PropertyDocument[]>([])
   const [showings, setShowings] = useState<any[]>([])
@@ -44,6 +45,7 @@ export function PropertyDetailModal({ property, isOpen, onClose }: PropertyDetai
   })
 
   useEffect(() => {
+    setDetails(null)
     if (property && isOpen) {
       fetchPropertyDetails()
     }
@@ -54,11 +56,14 @@ export function PropertyDetailModal({ property, isOpen, onClose }: PropertyDetai
     
     try {
       setLoading(true)
-      const [imagesData, documentsData, showingsData] = await Promise.all([
+      // list rows only carry card fields; load the full record for the detail view
+      const [propertyData, imagesData, documentsData, showingsData] = await Promise.all([
+        propertiesService.getProperty(property.id),
         propertiesService.getPropertyImages(property.id),
         propertiesService.getPropertyDocuments(property.id),
         propertiesService.getPropertyShowings(property.id)
       ])
+      setDetails(propertyData)
       setImages(imagesData)
       setDocuments(documentsData)
       setShowings(showingsData)
@@ -90,6 +95,11 @@ export function PropertyDetailModal({ property, isOpen, onClose }: PropertyDetai
 
   if (!property) return null
 
+  const listing: Property = details?.id === property.id ? { ...property, ...details } : property
+  const agentName = listing.agent_name
+    || (listing.agent ? `${listing.agent.first_name} ${listing.agent.last_name}` : "Unassigned")
+
+
   const getStatusColor = (status: string) => {
     switch (status.toLowerCase()) {
       case "available":
@@ -108,7 +118,7 @@ export function PropertyDetailModal({ property, isOpen, onClose }: PropertyDetai
       <DialogContent className="max-w-4xl max-h-[90vh] overflow-auto">
         <DialogHeader>
           <DialogTitle className="flex items-center justify-between">
-            <span>{property.address}</span>
+            <span>{listing.address}</span>
             <div className="flex items-center gap-2">
               <Button variant="outline" size="sm">
                 <Heart className="h-4 w-4" />
@@ -154,14 +164,14 @@ export function PropertyDetailModal({ property, isOpen, onClose }: PropertyDetai
               {/* Price and Status */}
               <div className="flex items-center justify-between">
                 <div>
-                  <h2 className="text-3xl font-bold">${property.price.toLocaleString()}</h2>
+                  <h2 className="text-3xl font-bold">${listing.price.toLocaleString()}</h2>
                   <p className="text-muted-foreground flex items-center gap-1 mt-1">
                     <MapPin className="h-4 w-4" />
-                    {property.address}
+                    {listing.address}
                   </p>
                 </div>
-                <Badge variant="outline" className={getStatusColor(property.status)}>
-                  {property.status}
+                <Badge variant="outline" className={getStatusColor(listing.status)}>
+                  {listing.status}
                 </Badge>
               </div>
 
@@ -170,28 +180,28 @@ export function PropertyDetailModal({ property, isOpen, onClose }: PropertyDetai
                 <div className="text-center">
                   <div className="flex items-center justify-center gap-1 mb-1">
                     <Bed className="h-4 w-4 text-primary" />
-                    <span className="font-semibold">{property.bedrooms || 0}</span>
+                    <span className="font-semibold">{listing.bedrooms || 0}</span>
                   </div>
                   <p className="text-xs text-muted-foreground">Bedrooms</p>
                 </div>
                 <div className="text-center">
                   <div className="flex items-center justify-center gap-1 mb-1">
                     <Bath className="h-4 w-4 text-primary" />
-                    <span className="font-semibold">{property.bathrooms || 0}</span>
+                    <span className="font-semibold">{listing.bathrooms || 0}</span>
                   </div>
                   <p className="text-xs text-muted-foreground">Bathrooms</p>
                 </div>
                 <div className="text-center">
                   <div className="flex items-center justify-center gap-1 mb-1">
                     <Square className="h-4 w-4 text-primary" />
-                    <span className="font-semibold">{property.square_feet?.toLocaleString() || 'N/A'}</span>
+                    <span className="font-semibold">{listing.square_feet?.toLocaleString() || 'N/A'}</span>
                   </div>
                   <p className="text-xs text-muted-foreground">Sq Ft</p>
                 </div>
                 <div className="text-center">
                   <div className="flex items-center justify-center gap-1 mb-1">
                     <Calendar className="h-4 w-4 text-primary" />
-                    <span className="font-semibold">{property.year_built || "N/A"}</span>
+                    <span className="font-semibold">{listing.year_built || "N/A"}</span>
                   </div>
                   <p className="text-xs text-muted-foreground">Year Built</p>
                 </div>
@@ -201,7 +211,7 @@ export function PropertyDetailModal({ property, isOpen, onClose }: PropertyDetai
               <div>
                 <h3 className="font-semibold mb-2">Description</h3>
                 <p className="text-muted-foreground">
-                  {property.description || "Beautiful property with modern amenities and stunning views. This home features an open floor plan, updated kitchen with stainless steel appliances, and spacious bedrooms. Located in a desirable neighborhood with easy access to schools, shopping, and entertainment."}
+                  {listing.description || (details ? "No description provided." : "Loading...")}
                 </p>
               </div>
 
@@ -209,7 +219,7 @@ export function PropertyDetailModal({ property, isOpen, onClose }: PropertyDetai
               <div>
                 <h3 className="font-semibold mb-2">Features & Amenities</h3>
                 <div className="grid grid-cols-2 gap-2">
-                  {(property.propertyFeatures || [
+                  {(listing.propertyFeatures || [
                     "Hardwood Floors",
                     "Granite Countertops", 
                     "Stainless Steel Appliances",
@@ -270,19 +280,19 @@ export function PropertyDetailModal({ property, isOpen, onClose }: PropertyDetai
               <div className="grid grid-cols-2 gap-4 text-sm">
                 <div>
                   <p className="font-medium">Property Type</p>
-                  <p className="text-muted-foreground">{property.property_type || "residential"}</p>
+                  <p className="text-muted-foreground">{listing.property_type || "residential"}</p>
                 </div>
                 <div>
                   <p className="font-medium">Lot Size</p>
-                  <p className="text-muted-foreground">{property.lot_size ? `${property.lot_size} sq ft` : "N/A"}</p>
+                  <p className="text-muted-foreground">{listing.lot_size ? `${listing.lot_size} sq ft` : "N/A"}</p>
                 </div>
                 <div>
                   <p className="font-medium">City</p>
-                  <p className="text-muted-foreground">{property.city}</p>
+                  <p className="text-muted-foreground">{listing.city}</p>
                 </div>
                 <div>
                   <p className="font-medium">Listed Date</p>
-                  <p className="text-muted-foreground">{new Date(property.created_at).toLocaleDateString()}</p>
+                  <p className="text-muted-foreground">{new Date(listing.created_at).toLocaleDateString()}</p>
                 </div>
               </div>
             </div>
@@ -292,10 +302,10 @@ export function PropertyDetailModal({ property, isOpen, onClose }: PropertyDetai
               <div className="p-4 border rounded-lg">
                 <div className="flex items-center gap-3 mb-4">
                   <div className="w-12 h-12 bg-primary rounded-full flex items-center justify-center text-white font-semibold">
-                    {(property.agent || "Sarah Johnson").split(' ').map(n => n[0]).join('')}
+                    {agentName.split(' ').map(n => n[0]).join('')}
                   </div>
                   <div>
-                    <h4 className="font-semibold">{property.agent || "Sarah Johnson"}</h4>
+                    <h4 className="font-semibold">{agentName}</h4>
                     <p className="text-sm text-muted-foreground">Licensed Agent</p>
                   </div>
                 </div>
@@ -362,7 +372,7 @@ export function PropertyDetailModal({ property, isOpen, onClose }: PropertyDetai
                 <div className="space-y-2 text-sm">
                   <div className="flex justify-between">
                     <span>Price per sq ft</span>
-                    <span className="font-medium">${property.square_feet ? (property.price / property.square_feet).toFixed(0) : 'N/A'}</span>
+                    <span className="font-medium">${listing.square_feet ? (listing.price / listing.square_feet).toFixed(0) : 'N/A'}</span>
                   </div>
                   <div className="flex justify-between">
                     <span>Days on market</span>
@@ -385,19 +395,19 @@ export function PropertyDetailModal({ property, isOpen, onClose }: PropertyDetai
                 <div className="space-y-2 text-sm">
                   <div className="flex justify-between">
                     <span>Est. Monthly Payment</span>
-                    <span className="font-medium">${Math.floor(property.price * 0.005).toLocaleString()}</span>
+                    <span className="font-medium">${Math.floor(listing.price * 0.005).toLocaleString()}</span>
                   </div>
                   <div className="flex justify-between">
                     <span>Principal & Interest</span>
-                    <span>${Math.floor(property.price * 0.004).toLocaleString()}</span>
+                    <span>${Math.floor(listing.price * 0.004).toLocaleString()}</span>
                   </div>
                   <div className="flex justify-between">
                     <span>Property Tax</span>
-                    <span>${Math.floor(property.price * 0.0008).toLocaleString()}</span>
+                    <span>${Math.floor(listing.price * 0.0008).toLocaleString()}</span>
                   </div>
                   <div className="flex justify-between">
                     <span>Insurance</span>
-                    <span>${Math.floor(property.price * 0.0002).toLocaleString()}</span>
+                    <span>${Math.floor(listing.price * 0.0002).toLocaleString()}</span>
                   </div>
                 </div>
                 <Button variant="outline" className="w-full mt-3 text-xs">
@@ -503,13 +503,13 @@ const Properties = () => {
                           </TableCell>
                           <TableCell className="font-medium">${property.price.toLocaleString()}</TableCell>
                           <TableCell>{getStatusBadge(property.status)}</TableCell>
-                          <TableCell>{property.agent?.first_name} {property.agent?.last_name}</TableCell>
+                          <TableCell>{property.agent_name ?? `${property.agent?.first_name ?? ''} ${property.agent?.last_name ?? ''}`}</TableCell>
                           <TableCell>{Math.floor((new Date().getTime() - new Date(property.created_at).getTime()) / (1000 * 60 * 60 * 24))} days</TableCell>
                           <TableCell>
                             <div className="text-sm">
                               <div className="flex items-center gap-1">
                                 <Camera className="w-3 h-3" />
-                                {property.images?.length || 0} photos
+                                {property.images_count ?? property.images?.length ?? 0} photos
                               </div>
                             </div>
                           </TableCell>
@@ -538,7 +538,7 @@ const Properties = () => {
                   <Card key={property.id} className="overflow-hidden hover:shadow-lg transition-shadow">
                     <div className="relative">
                       <img
-                        src={property.images?.[0]?.image_url || 'https://images.unsplash.com/photo-1469474968028-56623f02e42b?w=800&h=600&fit=crop'}
+                        src={property.primary_image_url || property.images?.[0]?.image_url || 'https://images.unsplash.com/photo-1469474968028-56623f02e42b?w=800&h=600&fit=crop'}
                         alt={property.address}
                         className="w-full h-48 object-cover"
                       />
@@ -547,7 +547,7 @@ const Properties = () => {
                       </div>
                     <div className="absolute top-2 right-2 bg-black/50 text-white px-2 py-1 rounded text-xs flex items-center gap-1">
                       <Camera className="w-3 h-3" />
-                      {property.images?.length || 0}
+                      {property.images_count ?? property.images?.length ?? 0}
                     </div>
 
                     </div>
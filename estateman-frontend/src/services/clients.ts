@@ -102,6 +102,41 @@ export interface LeadPipeline {
   value: number;
 }
 
+export interface ClientTimelineEvent {
+  type: 'interaction' | 'lead' | 'loyalty' | 'transaction' | 'document';
+  id: number;
+  occurred_at: string;
+  title?: string;
+  summary?: string;
+  subtype?: string;
+  [key: string]: any;
+}
+
+export interface ClientTimelinePage {
+  items: ClientTimelineEvent[];
+  next_cursor: string | null;
+}
+
+export interface ClientPropertyMatch {
+  property_id: number;
+  title: string;
+  address: string;
+  city: string;
+  price: number;
+  property_type: string;
+  status: string;
+  bedrooms?: number;
+  bathrooms?: number;
+  square_feet?: number;
+  score: number;
+  breakdown: {
+    budget: number;
+    location: number;
+    type: number;
+  };
+  computed_at: string;
+}
+
 export interface ClientCreateData {
   first_name: string;
   last_name: string;
@@ -252,8 +287,16 @@ class ClientsService {
     return response.data;
   }
 
-  async getClientTimeline(clientId: number): Promise<any[]> {
-    const response = await api.get(`/clients/${clientId}/timeline/`);
+  async getClientMatches(clientId: number, params?: { limit?: number; refresh?: boolean }): Promise<ClientPropertyMatch[]> {
+    const response = await api.get(`/clients/${clientId}/matches`, { params });
+    return response.data.matches;
+  }
+
+  async getClientTimeline(
+    clientId: number,
+    params?: { limit?: number; cursor?: string }
+  ): Promise<ClientTimelinePage> {
+    const response = await api.get(`/clients/${clientId}/timeline/`, { params });
     return response.data;
   }
 
@@ -333,18 +376,29 @@ class ClientsService {
     name: string;
     type: string;
     template_id: number;
+    segment_id?: number;
+    target_segment?: Record<string, any>;
   }): Promise<any> {
-    const response = await api.post('/clients/campaigns/', null, {
-      params: data
+    const { target_segment, ...params } = data;
+    const response = await api.post('/clients/campaigns/', target_segment ?? null, {
+      params
     });
     return response.data;
   }
 
-  async sendBulkCommunication(campaignId: number): Promise<any> {
+  async sendBulkCommunication(campaignId: number): Promise<{ campaign_id: number; status: string }> {
     const response = await api.post(`/clients/campaigns/${campaignId}/send`);
     return response.data;
   }
 
+  async getCampaignDeliveries(
+    campaignId: number,
+    params?: { status?: 'sent' | 'failed'; skip?: number; limit?: number }
+  ): Promise<any[]> {
+    const response = await api.get(`/clients/campaigns/${campaignId}/deliveries`, { params });
+    return response.data.deliveries;
+  }
+
   // Rewards
   async getRewards(): Promise<any[]> {
     const response = await api.get('/clients/rewards/');
@@ -25,6 +25,10 @@ export interface MLMTreeNode {
   monthly_commission: number
   children: MLMTreeNode[]
   avatar?: string
+  child_count: number
+  expand_cursor?: string | null
+  total_network_size?: number | null
+  network_depth?: number | null
 }
 
 export interface MLMAnalytics {
@@ -97,8 +101,8 @@ class MLMService {
     return response.data
   }
 
-  async getMLMTree(partnerId: number): Promise<MLMTreeNode> {
-    const response = await api.get(`/mlm/partners/${partnerId}/tree`)
+  async getMLMTree(partnerId: number | string, depth: number = 3): Promise<MLMTreeNode> {
+    const response = await api.get(`/mlm/partners/${partnerId}/tree`, { params: { depth } })
     return response.data
   }
 
@@ -25,6 +25,9 @@ export interface Property {
   images?: PropertyImage[]
   documents?: PropertyDocument[]
   agent?: any
+  agent_name?: string
+  primary_image_url?: string
+  images_count?: number
 }
 
 export interface PropertyImage {
@@ -45,6 +48,33 @@ export interface PropertyDocument {
   file_size?: number
 }
 
+export interface PropertyImportJob {
+  id: number
+  status: 'pending' | 'running' | 'completed' | 'failed'
+  file_name?: string
+  rows_processed: number
+  created_count: number
+  failed_count: number
+  error_message?: string
+}
+
+export interface SavedSearch {
+  id: number
+  name: string
+  user_id: number
+  client_id?: number
+  city?: string
+  property_type?: string
+  min_price?: number
+  max_price?: number
+  min_bedrooms?: number
+  is_active: boolean
+  last_alerted_at?: string
+  created_at: string
+}
+
+export type SavedSearchCreate = Pick<SavedSearch, 'name' | 'client_id' | 'city' | 'property_type' | 'min_price' | 'max_price' | 'min_bedrooms'>
+
 export interface PropertyFilters {
   status?: string
   property_type?: string
@@ -164,17 +194,39 @@ export const propertiesService = {
   },
 
   // Bulk Import
-  async bulkImportProperties(file: File): Promise<{ created_count: number; failed_count: number; errors: string[] }> {
-    // First upload the file
-    const uploadResult = await filesService.uploadFile(file, 'documents', 'imports')
-    
-    // Then process the import
-    const response = await api.post('/properties/bulk-import', {
-      file_path: uploadResult.file_path
+  async bulkImportProperties(file: File): Promise<PropertyImportJob> {
+    const formData = new FormData()
+    formData.append('file', file)
+
+    const response = await api.post<PropertyImportJob>('/properties/bulk-import', formData, {
+      headers: { 'Content-Type': 'multipart/form-data' }
     })
+
+    // The import runs in the background; poll until it finishes
+    let job = response.data
+    while (job.status === 'pending' || job.status === 'running') {
+      await new Promise(resolve => setTimeout(resolve, 1000))
+      job = (await api.get<PropertyImportJob>(`/properties/bulk-import/${job.id}`)).data
+    }
+    return job
+  },
+
+  // Saved Searches
+  async getSavedSearches(clientId?: number): Promise<SavedSearch[]> {
+    const params = clientId ? `?client_id=${clientId}` : ''
+    const response = await api.get<{ saved_searches: SavedSearch[] }>(`/properties/saved-searches${params}`)
+    return response.data.saved_searches
+  },
+
+  async createSavedSearch(searchData: SavedSearchCreate): Promise<SavedSearch> {
+    const response = await api.post<SavedSearch>('/properties/saved-searches', searchData)
     return response.data
   },
 
+  async deleteSavedSearch(searchId: number): Promise<void> {
+    await api.delete(`/properties/saved-searches/${searchId}`)
+  },
+
   // Property Comparison
   async compareProperties(propertyIds: number[]): Promise<{ properties: any[] }> {
     const response = await api.get<{ properties: any[] }>(`/properties/compare?property_ids=${propertyIds.join(',')}`)